@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : boq_import.py
+# @Author: Assistant
+# @Desc  : Lecture en flux de DQE (CSV, XLSX en lecture seule) par lots de lignes en colonnes
+
+import csv
+import zipfile
+from typing import Dict, Iterator, Optional
+
+from price_catalog import normalize, parse_number
+
+BOQ_FORMATS = ("csv", "xlsx")
+
+# En-têtes reconnus pour chaque champ (forme normalisée)
+BOQ_COLUMNS = {
+    "code": ("code", "reference", "ref", "code article"),
+    "name": ("name", "designation", "libelle", "description", "article", "materiau", "material", "ouvrage"),
+    "quantity": ("quantity", "quantite", "qte", "qty", "qt", "quantites"),
+    "unit": ("unit", "unite", "u"),
+    "lot": ("lot", "corps d etat", "chapitre"),
+    "category": ("category", "categorie", "famille"),
+    "location": ("location", "localisation"),
+}
+
+# Fichiers illisibles : CSV mal formé, XLSX corrompu ou incomplet
+BOQ_READ_ERRORS = (csv.Error, zipfile.BadZipFile, KeyError)
+
+# Lignes examinées pour trouver l'en-tête (titres et cartouches fréquents en tête des DQE Excel)
+HEADER_SEARCH_ROWS = 30
+
+# Octets lus pour détecter l'encodage et le séparateur d'un CSV
+SNIFF_BYTES = 64 * 1024
+
+
+def detect_format(path: str) -> str:
+    lower = path.lower()
+    if lower.endswith((".csv", ".txt")):
+        return "csv"
+    if lower.endswith((".xlsx", ".xlsm")):
+        return "xlsx"
+    raise ValueError(f"Format non reconnu pour '{path}' (extensions prises en charge : .csv, .txt, .xlsx, .xlsm)")
+
+
+def _csv_rows(path: str) -> Iterator[list]:
+    """Lignes d'un CSV, une à la fois ; encodage (UTF-8 ou Windows-1252) et séparateur détectés sur le début du fichier."""
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    encoding = "utf-8-sig"
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # Une erreur dans les derniers octets peut venir d'un caractère coupé par l'échantillon
+        if e.start < len(sample) - 3:
+            encoding = "cp1252"
+    lines = sample.decode(encoding, errors="replace").splitlines()[:HEADER_SEARCH_ROWS]
+    delimiter = max(";,\t", key=lambda d: sum(line.count(d) for line in lines))
+    with open(path, encoding=encoding, errors="replace", newline="") as f:
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def load_openpyxl():
+    """openpyxl est une dépendance optionnelle : chargée au premier import XLSX seulement."""
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError("Import XLSX indisponible : installer openpyxl (pip install openpyxl) ou exporter le DQE en CSV")
+    return openpyxl
+
+
+def _xlsx_rows(path: str, sheet: Optional[str] = None) -> Iterator[list]:
+    """Lignes d'une feuille XLSX ouverte en lecture seule (valeurs calculées, sans chargement du classeur)."""
+    openpyxl = load_openpyxl()
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet is not None and sheet not in workbook.sheetnames:
+            raise ValueError(f"Feuille inconnue : '{sheet}' (disponibles : {', '.join(workbook.sheetnames)})")
+        worksheet = workbook[sheet] if sheet is not None else workbook.active
+        for row in worksheet.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def _header_mapping(row: list, columns: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    """Champ -> index de colonne, d'après `columns` ({champ: en-tête}) ou les en-têtes reconnus."""
+    headers = [normalize(cell) if cell is not None else "" for cell in row]
+    mapping = {}
+    if columns:
+        for field, header in columns.items():
+            if field not in BOQ_COLUMNS:
+                raise ValueError(f"Champ inconnu : '{field}' (disponibles : {', '.join(BOQ_COLUMNS)})")
+            key = normalize(header)
+            if key in headers:
+                mapping[field] = headers.index(key)
+    for index, key in enumerate(headers):
+        for field, aliases in BOQ_COLUMNS.items():
+            if key in aliases and field not in mapping:
+                mapping[field] = index
+    return mapping
+
+
+class BoqReader:
+    """
+    DQE lu en flux : l'en-tête est cherché dans les premières lignes, puis les lignes
+    sont regroupées par lots de `chunk_size` en colonnes (désignation en minuscules,
+    code, quantité, unité, lot, catégorie, localisation, numéro de ligne source). Les lignes sans
+    désignation ni code, ou sans quantité numérique (titres, sous-totaux), sont
+    comptées et ignorées. La mémoire utilisée ne dépend que de `chunk_size`.
+    """
+
+    def __init__(self, path: str, file_format: Optional[str] = None, sheet: Optional[str] = None,
+                 columns: Optional[Dict[str, str]] = None):
+        self.file_format = file_format or detect_format(path)
+        if self.file_format not in BOQ_FORMATS:
+            raise ValueError(f"Format inconnu : '{self.file_format}' (disponibles : {', '.join(BOQ_FORMATS)})")
+        self.path = path
+        self.sheet = sheet
+        self.columns = columns
+        self.mapping: Dict[str, int] = {}
+        self.header_row = None
+        self.rows = 0
+        self.skipped_rows = 0
+        self.invalid_quantities = 0
+
+    def _rows(self) -> Iterator[list]:
+        if self.file_format == "csv":
+            return _csv_rows(self.path)
+        return _xlsx_rows(self.path, self.sheet)
+
+    def chunks(self, chunk_size: int = 50_000) -> Iterator[Dict[str, list]]:
+        rows = self._rows()
+        for number, row in enumerate(rows, start=1):
+            mapping = _header_mapping(row, self.columns)
+            if ("name" in mapping or "code" in mapping) and "quantity" in mapping:
+                self.mapping, self.header_row = mapping, number
+                break
+            if number >= HEADER_SEARCH_ROWS:
+                break
+        if self.header_row is None:
+            raise ValueError(
+                "En-tête du DQE introuvable : colonnes désignation (ou code) et quantité attendues "
+                f"dans les {HEADER_SEARCH_ROWS} premières lignes (paramètre columns pour les nommer)"
+            )
+
+        fields = [field for field in ("code", "unit", "lot", "category", "location") if field in self.mapping]
+        name_index = self.mapping.get("name")
+        quantity_index = self.mapping["quantity"]
+        width = max(self.mapping.values()) + 1
+
+        def empty() -> Dict[str, list]:
+            return {"name": [], "quantity": [], "row": [], **{field: [] for field in fields}}
+
+        chunk = empty()
+        for number, row in enumerate(rows, start=self.header_row + 1):
+            self.rows += 1
+            if len(row) < width:
+                row = list(row) + [None] * (width - len(row))
+            name = row[name_index] if name_index is not None else None
+            name = str(name).strip().lower() if name is not None else ""
+            code = row[self.mapping["code"]] if "code" in self.mapping else None
+            raw_quantity = row[quantity_index]
+            if (not name and code in (None, "")) or raw_quantity in (None, ""):
+                self.skipped_rows += 1
+                continue
+            quantity = parse_number(raw_quantity)
+            if quantity is None:
+                self.invalid_quantities += 1
+                continue
+            chunk["name"].append(name)
+            chunk["quantity"].append(quantity)
+            chunk["row"].append(number)
+            for field in fields:
+                value = row[self.mapping[field]]
+                chunk[field].append(str(value).strip() if value is not None else None)
+            if len(chunk["name"]) >= chunk_size:
+                yield chunk
+                chunk = empty()
+        if chunk["name"]:
+            yield chunk
+
+    def info(self) -> dict:
+        return {
+            "format": self.file_format,
+            "header_row": self.header_row,
+            "columns": sorted(self.mapping, key=self.mapping.get),
+            "rows_read": self.rows,
+            "skipped_rows": self.skipped_rows,
+            "invalid_quantity_rows": self.invalid_quantities
+        }
@@ -0,0 +1,446 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : bulk_pricing.py
+# @Author: Assistant
+# @Desc  : Chiffrage en masse d'un DQE (colonnes NumPy) avec synthèses par lot et par catégorie
+
+import csv
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from price_catalog import CatalogIndex, Match, normalize, parse_number
+
+UNASSIGNED_LOT = "Non affecté"
+UNCLASSIFIED = "Non classé"
+
+# Nombre maximal de matériaux cités individuellement dans les avertissements
+MAX_LISTED = 20
+
+# Unités usuelles des DQE (forme normalisée -> unité canonique) et conversions au sein d'une même grandeur
+UNIT_ALIASES = {
+    "m3": "m3", "mc": "m3", "metre cube": "m3", "metres cubes": "m3",
+    "m2": "m2", "metre carre": "m2", "metres carres": "m2",
+    "m": "m", "ml": "m", "metre": "m", "metres": "m", "metre lineaire": "m",
+    "kg": "kg", "kilo": "kg", "kilogramme": "kg",
+    "t": "t", "to": "t", "tonne": "t", "tonnes": "t",
+    "l": "l", "lt": "l", "litre": "l", "litres": "l",
+    "u": "u", "un": "u", "unite": "u", "unites": "u", "pce": "u", "piece": "u", "pieces": "u",
+    "ens": "u", "ensemble": "u", "ft": "ft", "forfait": "ft",
+}
+UNIT_SCALES = {"kg": ("masse", 1.0), "t": ("masse", 1000.0), "l": ("volume", 0.001), "m3": ("volume", 1.0)}
+
+LINE_COLUMNS = (
+    "line", "material", "catalog_code", "catalog_item", "lot", "category", "quantity", "unit",
+    "unit_price_euro", "base_cost_euro", "transport_cost_euro", "total_cost_euro"
+)
+
+
+def factorize(values: Sequence) -> Tuple[np.ndarray, List]:
+    """Codes entiers (ordre de première apparition) et libellés distincts d'une colonne."""
+    codes: Dict = {}
+    array = np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype=np.int64, count=len(values))
+    return array, list(codes)
+
+
+def canonical_unit(unit) -> str:
+    key = normalize(unit) if unit else ""
+    return UNIT_ALIASES.get(key, key)
+
+
+def unit_factor(boq_unit, catalog_unit) -> Optional[float]:
+    """
+    Coefficient de conversion d'une quantité de DQE vers l'unité de prix de la bibliothèque :
+    1 si l'une des unités est absente ou si elles coïncident, rapport d'échelle dans une même
+    grandeur (kg / t, l / m³), None si elles sont incompatibles.
+    """
+    source, target = canonical_unit(boq_unit), canonical_unit(catalog_unit)
+    if not source or not target or source == target:
+        return 1.0
+    if source in UNIT_SCALES and target in UNIT_SCALES:
+        (source_kind, source_scale), (target_kind, target_scale) = UNIT_SCALES[source], UNIT_SCALES[target]
+        if source_kind == target_kind:
+            return source_scale / target_scale
+    return None
+
+
+_TEXT_TYPES = {str, type(None)}
+
+
+def _text_column(values: list, field: str) -> list:
+    """Colonne texte : textes ou nombres (code, lot numéroté) convertis, sinon ValueError sur la première ligne fautive."""
+    if set(map(type, values)) <= _TEXT_TYPES:
+        return values
+    column = []
+    for line, value in enumerate(values, start=1):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        elif value is not None and not isinstance(value, str):
+            raise ValueError(f"Ligne {line} : {field} invalide ({value!r}), texte attendu")
+        column.append(value)
+    return column
+
+
+def _quantity_column(values: list) -> list:
+    """Quantités numériques ; les textes (« 12,5 ») sont convertis, sinon ValueError sur la première ligne fautive."""
+    values = [value or 0 for value in values]
+    if set(map(type, values)) <= {int, float}:
+        return values
+    column = []
+    for line, value in enumerate(values, start=1):
+        quantity = None
+        if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+            quantity = parse_number(value)
+        if quantity is None:
+            raise ValueError(f"Ligne {line} : quantité invalide ({value!r})")
+        column.append(quantity)
+    return column
+
+
+def columns_from_materials(materials: list) -> Dict[str, list]:
+    """
+    Lignes {name, quantity, unit, lot, category, location, family} -> colonnes (champs absents à None).
+    Une ligne mal formée (quantité non numérique, champ texte de type liste...) lève ValueError.
+    """
+    if not all(isinstance(m, dict) for m in materials):
+        raise ValueError("Chaque matériau doit être un dict {name, quantity, ...}")
+    columns = {
+        "name": [(name or "").lower() for name in _text_column([m.get("name") for m in materials], "name")],
+        "quantity": _quantity_column([m.get("quantity") for m in materials]),
+    }
+    for field in ("unit", "lot", "category", "location", "family"):
+        values = [m.get(field) for m in materials]
+        if any(values):
+            columns[field] = _text_column(values, field)
+    return columns
+
+
+class BoqPricing:
+    """
+    Chiffrage d'un DQE en colonnes.
+
+    Chaque libellé distinct n'est recherché qu'une fois dans la bibliothèque de prix ;
+    les lignes ne portent ensuite que l'index de leur article, leur quantité et leur
+    coefficient de transport, et les coûts de base, de transport et totaux sont
+    calculés en une passe NumPy. Les synthèses par lot et catégorie sont des
+    `bincount` pondérés sur les codes de groupe.
+
+    Si les lignes portent une unité, la quantité est convertie dans l'unité de prix
+    de l'article ; une unité incompatible laisse la ligne non chiffrée.
+    """
+
+    def __init__(
+        self,
+        catalog: CatalogIndex,
+        names: Sequence[str],
+        quantities: Sequence[float],
+        lots: Optional[Sequence] = None,
+        categories: Optional[Sequence] = None,
+        locations: Optional[Sequence] = None,
+        transport_coefficients: Optional[Dict[str, float]] = None,
+        project_location: str = "urbain",
+        include_transport: bool = True,
+        region: Optional[str] = None,
+        default_coefficient: float = 1.10,
+        units: Optional[Sequence] = None,
+        resolved: Optional[Dict] = None,
+        codes: Optional[Sequence] = None
+    ):
+        n = len(names)
+        self.catalog = catalog
+        self.names = names
+        self.quantities = np.asarray(quantities, dtype=np.float64).reshape(n)
+
+        # Résolution des libellés distincts : un appel à la bibliothèque par article
+        # (`resolved` conserve les résolutions d'un lot de lignes à l'autre). Avec `codes`,
+        # le code article est cherché d'abord, la désignation ensuite.
+        keys = names if codes is None else list(zip(codes, names))
+        name_codes, distinct = factorize(keys)
+        if resolved is None:
+            resolved = {}
+        for key in distinct:
+            if key not in resolved:
+                resolved[key] = self._resolve(catalog, key, region)
+        self.matches = [resolved[key] for key in distinct]
+        if codes is not None:
+            distinct = [name or code for code, name in distinct]
+        slot_price = np.array([m.item.price if m else 0.0 for m in self.matches], dtype=np.float64)
+        self.priced = np.array([m is not None for m in self.matches], dtype=bool)[name_codes]
+        self.name_codes = name_codes
+        self.distinct = distinct
+        self.unit_price = slot_price[name_codes]
+        self.mismatches: Dict[Tuple[str, str], str] = {}
+        self.units = units
+        if units is not None:
+            self._convert_units(units)
+
+        # Coefficient de transport par ligne (localisation de la ligne, sinon du projet)
+        transport_coefficients = transport_coefficients or {}
+        if not include_transport:
+            coefficient = np.ones(n)
+        elif locations is None:
+            coefficient = np.full(n, transport_coefficients.get(project_location, default_coefficient))
+        else:
+            location_codes, labels = factorize([location or project_location for location in locations])
+            table = np.array([transport_coefficients.get(label, default_coefficient) for label in labels])
+            coefficient = table[location_codes]
+
+        self.base = self.unit_price * self.quantities
+        self.transport = self.base * (coefficient - 1)
+        self.total = self.base + self.transport
+
+        self.lot_codes, self.lot_labels = factorize(
+            [lot or UNASSIGNED_LOT for lot in lots] if lots is not None else [UNASSIGNED_LOT] * n
+        )
+        if categories is None:
+            # Catégorie de l'article dans la bibliothèque
+            slot_category, labels = factorize([
+                (m.item.category if m else "") or UNCLASSIFIED for m in self.matches
+            ])
+            self.category_codes = slot_category[name_codes]
+            self.category_labels = labels
+        else:
+            slot_category = [(m.item.category if m else "") or UNCLASSIFIED for m in self.matches]
+            self.category_codes, self.category_labels = factorize([
+                category or slot_category[code] for category, code in zip(categories, name_codes.tolist())
+            ])
+
+    @staticmethod
+    def _resolve(catalog: CatalogIndex, key, region: Optional[str]) -> Optional[Match]:
+        if isinstance(key, tuple):
+            code, name = key
+            match = catalog.lookup(code, region) if code else None
+            return match or (catalog.lookup(name, region) if name else None)
+        return catalog.lookup(key, region) if key else None
+
+    def _convert_units(self, units: Sequence):
+        """Quantités exprimées dans l'unité de prix des articles ; lignes d'unité incompatible non chiffrées."""
+        unit_codes, unit_labels = factorize(units)
+        pairs = self.name_codes * len(unit_labels) + unit_codes
+        distinct_pairs, inverse = np.unique(pairs, return_inverse=True)
+        factors = np.ones(len(distinct_pairs))
+        for k, pair in enumerate(distinct_pairs.tolist()):
+            match = self.matches[pair // len(unit_labels)]
+            if match is None:
+                continue
+            unit = unit_labels[pair % len(unit_labels)]
+            factor = unit_factor(unit, match.item.unit)
+            if factor is None:
+                factors[k] = np.nan
+                self.mismatches[(self.distinct[pair // len(unit_labels)], str(unit))] = match.item.unit
+            else:
+                factors[k] = factor
+        line_factor = factors[inverse.reshape(-1)]
+        compatible = ~np.isnan(line_factor)
+        self.priced &= compatible
+        self.unit_price = np.where(compatible, self.unit_price, 0.0)
+        self.quantities = np.where(compatible, self.quantities * np.nan_to_num(line_factor, nan=1.0), self.quantities)
+
+    def __len__(self) -> int:
+        return len(self.quantities)
+
+    @property
+    def totals(self) -> Dict[str, float]:
+        return {
+            "base_cost_euro": float(self.base.sum()),
+            "transport_cost_euro": float(self.transport.sum()),
+            "total_cost_euro": float(self.total.sum()),
+        }
+
+    def rollup(self, codes: np.ndarray, labels: List[str]) -> Dict[str, Dict[str, float]]:
+        """Nombre de lignes et coûts par groupe (valeurs non arrondies, cumulables entre lots de lignes)."""
+        size = len(labels)
+        lines = np.bincount(codes, minlength=size)
+        unpriced = np.bincount(codes, weights=(~self.priced).astype(np.float64), minlength=size)
+        sums = {
+            field: np.bincount(codes, weights=values, minlength=size)
+            for field, values in (("base_cost_euro", self.base), ("transport_cost_euro", self.transport),
+                                  ("total_cost_euro", self.total))
+        }
+        return {
+            label: {
+                "lines": int(lines[k]),
+                "unpriced_lines": int(unpriced[k]),
+                **{field: float(values[k]) for field, values in sums.items()}
+            }
+            for k, label in enumerate(labels)
+        }
+
+    def by_lot(self) -> Dict[str, Dict[str, float]]:
+        return self.rollup(self.lot_codes, self.lot_labels)
+
+    def by_category(self) -> Dict[str, Dict[str, float]]:
+        return self.rollup(self.category_codes, self.category_labels)
+
+    def unmatched(self) -> List[str]:
+        return [name for name, match in zip(self.distinct, self.matches) if match is None]
+
+    def fallback_regions(self) -> Dict[str, str]:
+        """Articles chiffrés au prix d'une autre région, faute de prix demandé ou national {libellé: région}."""
+        return {
+            name: match.item.region
+            for name, match in zip(self.distinct, self.matches)
+            if match is not None and match.fallback
+        }
+
+    def suggestions(self, names: Sequence[str]) -> Dict[str, Tuple[str, float]]:
+        """Article le plus proche de libellés non trouvés {libellé: (article, score)}, non chiffré."""
+        suggestions = {}
+        for name in names:
+            suggestion = self.catalog.suggest(name)
+            if suggestion is not None:
+                item, score = suggestion
+                suggestions[name] = (item.name, score)
+        return suggestions
+
+    def high_variance(self, threshold: float = 0.15) -> Dict[str, float]:
+        """Articles utilisés à forte variabilité de prix, par libellé saisi."""
+        return {
+            name: match.item.variance
+            for name, match in zip(self.distinct, self.matches)
+            if match is not None and match.item.variance > threshold
+        }
+
+    def write_lines(self, writer, first_line: int = 1, line_numbers: Optional[Sequence[int]] = None):
+        """
+        Écrit les lignes chiffrées (LINE_COLUMNS, sans en-tête) dans un `csv.writer`.
+        Quantité et unité sont celles de la bibliothèque pour les lignes chiffrées, celles
+        du DQE sinon.
+        """
+        slot_code = [m.item.code if m else "" for m in self.matches]
+        slot_item = [m.item.name if m else "" for m in self.matches]
+        slot_unit = [m.item.unit if m else "" for m in self.matches]
+        codes = self.name_codes.tolist()
+        units = [slot_unit[k] for k in codes]
+        if self.units is not None:
+            units = [
+                unit if priced else (boq_unit or "")
+                for unit, boq_unit, priced in zip(units, self.units, self.priced.tolist())
+            ]
+        writer.writerows(zip(
+            line_numbers if line_numbers is not None else range(first_line, first_line + len(self)),
+            self.names,
+            [slot_code[k] for k in codes],
+            [slot_item[k] for k in codes],
+            [self.lot_labels[k] for k in self.lot_codes.tolist()],
+            [self.category_labels[k] for k in self.category_codes.tolist()],
+            self.quantities.tolist(),
+            units,
+            self.unit_price.tolist(),
+            np.round(self.base, 2).tolist(),
+            np.round(self.transport, 2).tolist(),
+            np.round(self.total, 2).tolist(),
+        ))
+
+
+class BoqTotals:
+    """
+    Cumul des chiffrages de plusieurs lots de lignes (import en flux) : totaux, synthèses
+    par lot et catégorie, et matériaux à signaler, chacun cité une seule fois.
+    """
+
+    def __init__(self):
+        self.lines = 0
+        self.priced_lines = 0
+        self.base = self.transport = self.total = 0.0
+        self.by_lot: Dict[str, Dict[str, float]] = {}
+        self.by_category: Dict[str, Dict[str, float]] = {}
+        self.unmatched: Dict[str, None] = {}
+        self.suggestions: Dict[str, Tuple[str, float]] = {}
+        self.fallback_regions: Dict[str, str] = {}
+        self.high_variance: Dict[str, float] = {}
+        self.mismatches: Dict[Tuple[str, str], str] = {}
+
+    def add(self, pricing: BoqPricing) -> "BoqTotals":
+        self.lines += len(pricing)
+        self.priced_lines += int(pricing.priced.sum())
+        totals = pricing.totals
+        self.base += totals["base_cost_euro"]
+        self.transport += totals["transport_cost_euro"]
+        self.total += totals["total_cost_euro"]
+        merge_rollups(self.by_lot, pricing.by_lot())
+        merge_rollups(self.by_category, pricing.by_category())
+        # Propositions calculées pour les seuls libellés cités dans les avertissements
+        listed = MAX_LISTED - len(self.unmatched)
+        unmatched = [name for name in pricing.unmatched() if name not in self.unmatched]
+        self.suggestions.update(pricing.suggestions(unmatched[:max(listed, 0)]))
+        self.unmatched.update(dict.fromkeys(unmatched))
+        self.fallback_regions.update(pricing.fallback_regions())
+        self.high_variance.update(pricing.high_variance())
+        self.mismatches.update(pricing.mismatches)
+        return self
+
+    def warnings(self) -> List[str]:
+        """Avertissements par matériau distinct (et non par ligne), listes tronquées à MAX_LISTED."""
+        warnings = []
+        if self.unmatched:
+            warnings.append(
+                f"{len(self.unmatched)} matériau(x) non trouvé(s) dans la base de prix, non chiffré(s) : "
+                + _listed([
+                    f"'{name}' (proche : '{self.suggestions[name][0]}', {self.suggestions[name][1]:.0%})"
+                    if name in self.suggestions else f"'{name}'"
+                    for name in self.unmatched
+                ])
+            )
+        if self.fallback_regions:
+            warnings.append(
+                f"{len(self.fallback_regions)} matériau(x) sans prix pour la région demandée ni prix national, "
+                "chiffré(s) au prix d'une autre région : "
+                + _listed([f"'{name}' ({region})" for name, region in self.fallback_regions.items()])
+            )
+        if self.mismatches:
+            warnings.append(
+                f"{len(self.mismatches)} matériau(x) non chiffré(s), unité incompatible avec la bibliothèque : "
+                + _listed([f"'{name}' en '{unit}' (unité de prix : {catalog_unit})"
+                           for (name, unit), catalog_unit in self.mismatches.items()])
+            )
+        for name, variance in list(self.high_variance.items())[:MAX_LISTED]:
+            warnings.append(f"{name}: Forte variabilité de prix ({int(variance*100)}%), vérifier les prix actuels du marché")
+        return warnings
+
+
+def _listed(entries: List[str]) -> str:
+    shown = ", ".join(entries[:MAX_LISTED])
+    return shown + (f" et {len(entries) - MAX_LISTED} autres" if len(entries) > MAX_LISTED else "")
+
+
+def merge_rollups(into: Dict[str, Dict[str, float]], rollup: Dict[str, Dict[str, float]]):
+    """Cumule une synthèse par groupe dans une autre (chiffrage par lots de lignes)."""
+    for label, values in rollup.items():
+        target = into.setdefault(label, dict.fromkeys(values, 0))
+        for field, value in values.items():
+            target[field] += value
+
+
+def format_rollup(rollup: Dict[str, Dict[str, float]], key: str) -> List[dict]:
+    """Synthèse arrondie, triée par coût total décroissant, avec la part de chaque groupe."""
+    grand_total = sum(values["total_cost_euro"] for values in rollup.values())
+    rows = [
+        {
+            key: label,
+            "lines": values["lines"],
+            "unpriced_lines": values["unpriced_lines"],
+            "base_cost_euro": round(values["base_cost_euro"], 2),
+            "transport_cost_euro": round(values["transport_cost_euro"], 2),
+            "total_cost_euro": round(values["total_cost_euro"], 2),
+            "share_percent": round(values["total_cost_euro"] / grand_total * 100, 1) if grand_total > 0 else 0.0
+        }
+        for label, values in rollup.items()
+    ]
+    rows.sort(key=lambda row: (-row["total_cost_euro"], str(row[key])))
+    return rows
+
+
+def open_lines_file(path: str):
+    """Fichier CSV des lignes chiffrées (écrit sous un nom temporaire, voir `close_lines_file`)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handle = open(path + ".tmp", "w", encoding="utf-8", newline="")
+    writer = csv.writer(handle, delimiter=";")
+    writer.writerow(LINE_COLUMNS)
+    return handle, writer
+
+
+def close_lines_file(handle, path: str):
+    handle.close()
+    os.replace(path + ".tmp", path)
@@ -6,27 +6,37 @@
 
 from fastmcp import FastMCP
 import json
+import os
 from datetime import datetime
+from typing import Dict
+
+import numpy as np
+
+from boq_import import BOQ_READ_ERRORS, BoqReader
+from bulk_pricing import BoqPricing, BoqTotals, close_lines_file, columns_from_materials, format_rollup, open_lines_file
+from cost_risk import CostRiskModel, percentiles
+from price_catalog import LABOR, MATERIAL, PriceCatalog, PriceItem, region_label
+from wbs_tree import COST_TYPES, ROOT, WbsCostTree, parse_path
 
 mcp = FastMCP("Outils Estimation Coûts BTP")
 
 # Base de données simplifiée des prix (€/unité) - Prix indicatifs 2025
 MATERIAL_PRICES = {
-    "béton": {"unit": "m³", "price": 120, "variance": 0.15},
-    "parpaing": {"unit": "unité", "price": 1.2, "variance": 0.10},
-    "brique": {"unit": "unité", "price": 0.8, "variance": 0.12},
-    "ciment": {"unit": "sac 25kg", "price": 8, "variance": 0.20},
-    "sable": {"unit": "tonne", "price": 35, "variance": 0.10},
-    "gravier": {"unit": "tonne", "price": 40, "variance": 0.10},
-    "acier": {"unit": "kg", "price": 2.5, "variance": 0.25},
-    "bois_charpente": {"unit": "m³", "price": 450, "variance": 0.15},
-    "plaque_platre": {"unit": "m²", "price": 8, "variance": 0.08},
-    "tuile": {"unit": "m²", "price": 35, "variance": 0.12},
-    "isolation_laine": {"unit": "m²", "price": 15, "variance": 0.10},
-    "peinture": {"unit": "litre", "price": 25, "variance": 0.15},
-    "carrelage": {"unit": "m²", "price": 30, "variance": 0.20},
-    "fenetre_pvc": {"unit": "unité", "price": 350, "variance": 0.15},
-    "porte": {"unit": "unité", "price": 200, "variance": 0.18}
+    "béton": {"unit": "m³", "price": 120, "variance": 0.15, "category": "gros œuvre"},
+    "parpaing": {"unit": "unité", "price": 1.2, "variance": 0.10, "category": "gros œuvre"},
+    "brique": {"unit": "unité", "price": 0.8, "variance": 0.12, "category": "gros œuvre"},
+    "ciment": {"unit": "sac 25kg", "price": 8, "variance": 0.20, "category": "gros œuvre"},
+    "sable": {"unit": "tonne", "price": 35, "variance": 0.10, "category": "gros œuvre"},
+    "gravier": {"unit": "tonne", "price": 40, "variance": 0.10, "category": "gros œuvre"},
+    "acier": {"unit": "kg", "price": 2.5, "variance": 0.25, "category": "gros œuvre"},
+    "bois_charpente": {"unit": "m³", "price": 450, "variance": 0.15, "category": "charpente couverture"},
+    "plaque_platre": {"unit": "m²", "price": 8, "variance": 0.08, "category": "second œuvre"},
+    "tuile": {"unit": "m²", "price": 35, "variance": 0.12, "category": "charpente couverture"},
+    "isolation_laine": {"unit": "m²", "price": 15, "variance": 0.10, "category": "second œuvre"},
+    "peinture": {"unit": "litre", "price": 25, "variance": 0.15, "category": "second œuvre"},
+    "carrelage": {"unit": "m²", "price": 30, "variance": 0.20, "category": "second œuvre"},
+    "fenetre_pvc": {"unit": "unité", "price": 350, "variance": 0.15, "category": "menuiseries"},
+    "porte": {"unit": "unité", "price": 200, "variance": 0.18, "category": "menuiseries"}
 }
 
 # Tarifs horaires main d'œuvre (€/heure)
@@ -44,42 +54,94 @@ LABOR_RATES = {
     "manœuvre": 35
 }
 
+# Coefficient de transport selon localisation
+TRANSPORT_COEFFICIENTS = {
+    "urbain": 1.05,
+    "péri-urbain": 1.10,
+    "rural": 1.20
+}
+
+PRICING_MODES = ("detailed", "bulk")
+CONTINGENCY_RATE = 0.12
+MATERIAL_NOTES = [
+    "Prix basés sur indices BT01 2025",
+    "Variabilité selon fournisseurs et volumes",
+    "Marge d'imprévus de 12% recommandée",
+    "Valider les prix avec devis fournisseurs"
+]
+
+# Fichiers produits côté serveur (lignes de DQE chiffrées)
+OUTPUT_DIR = os.environ.get(
+    "COST_OUTPUT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "exports")
+)
+
+# Arbres de coûts WBS ouverts pour modifications incrémentales, par identifiant
+COST_TREES: Dict[str, WbsCostTree] = {}
+
+# Bibliothèque de prix externe (CSV ou SQLite), rechargée à chaud ; les prix ci-dessus restent
+# disponibles pour les articles qu'elle ne redéfinit pas
+CATALOG_PATH = os.environ.get("COST_CATALOG_PATH") or None
+CATALOG_TABLE = os.environ.get("COST_CATALOG_TABLE", "prices")
+
+price_catalog = PriceCatalog(
+    CATALOG_PATH,
+    builtin=[
+        PriceItem("", name, data["unit"], data["price"], data["variance"], "", data["category"], MATERIAL)
+        for name, data in MATERIAL_PRICES.items()
+    ] + [
+        PriceItem("", trade, "heure", rate, 0.0, "", "", LABOR)
+        for trade, rate in LABOR_RATES.items()
+    ],
+    table=CATALOG_TABLE
+)
+
 
 @mcp.tool()
 def estimateMaterialCost(
     materials: list,
     include_transport: bool = True,
-    project_location: str = "urbain"
+    project_location: str = "urbain",
+    region: str = None,
+    pricing_mode: str = "detailed",
+    export_lines: bool = False
 ) -> dict:
     """
     Estime le coût total des matériaux pour un projet de construction.
 
-    :param materials: Liste de dicts avec {name, quantity, unit}
+    Les matériaux sont recherchés dans la bibliothèque de prix par code ou par nom
+    (sans tenir compte des accents ni de la casse). Un matériau introuvable n'est pas
+    chiffré : l'article le plus proche est seulement proposé dans les avertissements.
+
+    :param materials: Liste de dicts avec {name, quantity, unit} (name peut être un code article) ;
+                      en mode bulk, champs optionnels lot, category et location (localisation de la ligne)
     :param include_transport: Inclure les frais de transport
     :param project_location: Localisation (urbain, péri-urbain, rural)
+    :param region: Région des prix (prix nationaux à défaut)
+    :param pricing_mode: "detailed" (détail par ligne) ou "bulk" (DQE volumineux : synthèses par lot et catégorie)
+    :param export_lines: En mode bulk, écrire les lignes chiffrées dans un fichier CSV côté serveur
     :return: Estimation détaillée des coûts
     """
+    if pricing_mode not in PRICING_MODES:
+        return {"error": f"Mode de chiffrage inconnu : '{pricing_mode}' (disponibles : {', '.join(PRICING_MODES)})"}
+    if pricing_mode == "bulk":
+        return _estimate_bulk(materials, include_transport, project_location, region, export_lines)
+
     total_cost = 0
     material_breakdown = []
     warnings = []
 
-    # Coefficient de transport selon localisation
-    transport_coeff = {
-        "urbain": 1.05,
-        "péri-urbain": 1.10,
-        "rural": 1.20
-    }
-
-    location_multiplier = transport_coeff.get(project_location, 1.10)
+    location_multiplier = TRANSPORT_COEFFICIENTS.get(project_location, 1.10)
+    catalog = price_catalog.current()
 
     for material in materials:
         material_name = material.get("name", "").lower()
         quantity = material.get("quantity", 0)
+        match = catalog.lookup(material_name, region)
 
-        if material_name in MATERIAL_PRICES:
-            price_data = MATERIAL_PRICES[material_name]
-            unit_price = price_data["price"]
-            variance = price_data["variance"]
+        if match is not None:
+            price_data = match.item
+            unit_price = price_data.price
+            variance = price_data.variance
 
             # Calcul du coût avec variabilité de marché
             base_cost = unit_price * quantity
@@ -92,16 +154,28 @@ def estimateMaterialCost(
                 transport_cost = 0
                 total_item_cost = base_cost
 
-            material_breakdown.append({
+            detail = {
                 "material": material_name,
                 "quantity": quantity,
-                "unit": price_data["unit"],
+                "unit": price_data.unit,
                 "unit_price_euro": unit_price,
                 "base_cost_euro": round(base_cost, 2),
                 "transport_cost_euro": round(transport_cost, 2) if include_transport else 0,
                 "total_cost_euro": round(total_item_cost, 2),
                 "price_variance": f"±{int(variance * 100)}%"
-            })
+            }
+            if price_data.code:
+                detail["catalog_code"] = price_data.code
+            if match.method != "name":
+                detail["catalog_item"] = price_data.name
+            if region or match.fallback:
+                detail["price_region"] = region_label(price_data)
+            if match.fallback:
+                warnings.append(
+                    f"Matériau '{material_name}' : pas de prix {'pour la région ' + region if region else 'national'}, "
+                    f"prix de la région '{price_data.region}' appliqué"
+                )
+            material_breakdown.append(detail)
 
             total_cost += total_item_cost
 
@@ -110,11 +184,18 @@ def estimateMaterialCost(
                 warnings.append(f"{material_name}: Forte variabilité de prix ({int(variance*100)}%), vérifier les prix actuels du marché")
 
         else:
-            warnings.append(f"Matériau '{material_name}' non trouvé dans la base de prix")
+            suggestion = catalog.suggest(material_name)
+            if suggestion is not None:
+                item, score = suggestion
+                warnings.append(
+                    f"Matériau '{material_name}' non trouvé dans la base de prix, non chiffré "
+                    f"(article proche : '{item.name}', similarité {score:.0%}, à confirmer par son nom ou son code)"
+                )
+            else:
+                warnings.append(f"Matériau '{material_name}' non trouvé dans la base de prix")
 
     # Marge d'imprévus recommandée
-    contingency_rate = 0.12
-    contingency_amount = total_cost * contingency_rate
+    contingency_amount = total_cost * CONTINGENCY_RATE
 
     return {
         "estimation_date": datetime.now().strftime("%Y-%m-%d"),
@@ -126,11 +207,255 @@ def estimateMaterialCost(
             "estimated_total_euro": round(total_cost + contingency_amount, 2)
         },
         "warnings": warnings,
-        "notes": [
-            "Prix basés sur indices BT01 2025",
-            "Variabilité selon fournisseurs et volumes",
-            "Marge d'imprévus de 12% recommandée",
-            "Valider les prix avec devis fournisseurs"
+        "notes": list(MATERIAL_NOTES)
+    }
+
+
+def bulk_summary(totals: BoqTotals, project_location: str) -> dict:
+    """Résultat d'un chiffrage en masse : synthèses par lot et catégorie, totaux et avertissements."""
+    contingency_amount = totals.total * CONTINGENCY_RATE
+    return {
+        "estimation_date": datetime.now().strftime("%Y-%m-%d"),
+        "project_location": project_location,
+        "pricing_mode": "bulk",
+        "lines": totals.lines,
+        "priced_lines": totals.priced_lines,
+        "unpriced_lines": totals.lines - totals.priced_lines,
+        "by_lot": format_rollup(totals.by_lot, "lot"),
+        "by_category": format_rollup(totals.by_category, "category"),
+        "cost_summary": {
+            "base_materials_euro": round(totals.base, 2),
+            "transport_euro": round(totals.transport, 2),
+            "subtotal_materials_euro": round(totals.total, 2),
+            "contingency_12_percent_euro": round(contingency_amount, 2),
+            "estimated_total_euro": round(totals.total + contingency_amount, 2)
+        },
+        "warnings": totals.warnings(),
+        "notes": list(MATERIAL_NOTES)
+    }
+
+
+def _estimate_bulk(materials: list, include_transport: bool, project_location: str, region, export_lines: bool) -> dict:
+    """Chiffrage en colonnes : synthèses par lot et catégorie, lignes éventuellement écrites sur disque."""
+    try:
+        columns = columns_from_materials(materials)
+    except ValueError as e:
+        return {"error": str(e)}
+    pricing = BoqPricing(
+        price_catalog.current(), columns["name"], columns["quantity"],
+        lots=columns.get("lot"), categories=columns.get("category"), locations=columns.get("location"),
+        transport_coefficients=TRANSPORT_COEFFICIENTS, project_location=project_location,
+        include_transport=include_transport, region=region, units=columns.get("unit")
+    )
+    result = bulk_summary(BoqTotals().add(pricing), project_location)
+    if export_lines:
+        path = os.path.join(OUTPUT_DIR, f"dqe-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}.csv")
+        try:
+            handle, writer = open_lines_file(path)
+            pricing.write_lines(writer)
+            close_lines_file(handle, path)
+        except OSError as e:
+            return {"error": f"Écriture des lignes chiffrées impossible : {e}"}
+        result["lines_file"] = os.path.abspath(path)
+    return result
+
+
+@mcp.tool()
+def importBillOfQuantities(
+    file_path: str,
+    file_format: str = None,
+    sheet: str = None,
+    columns: dict = None,
+    include_transport: bool = True,
+    project_location: str = "urbain",
+    region: str = None,
+    chunk_size: int = 50000
+) -> dict:
+    """
+    Importe et chiffre un DQE (CSV ou XLSX) lu en flux côté serveur, par lots de lignes. Les lignes chiffrées
+    sont écrites dans un fichier CSV ; seuls son chemin et la synthèse sont renvoyés.
+
+    :param file_path: Chemin du fichier sur le serveur
+    :param file_format: "csv" ou "xlsx" (défaut : selon l'extension)
+    :param sheet: Feuille du classeur XLSX (défaut : feuille active)
+    :param columns: En-têtes des colonnes si non reconnus {name, code, quantity, unit, lot, category, location: en-tête}
+    :param include_transport: Inclure les frais de transport
+    :param project_location: Localisation (urbain, péri-urbain, rural)
+    :param region: Région des prix (prix nationaux à défaut)
+    :param chunk_size: Nombre de lignes chiffrées par lot
+    :return: Chemin du DQE chiffré, synthèses par lot et catégorie, totaux et avertissements
+    """
+    import_root = os.environ.get("COST_IMPORT_DIR")
+    path = os.path.realpath(file_path)
+    if import_root and os.path.commonpath([path, os.path.realpath(import_root)]) != os.path.realpath(import_root):
+        return {"error": f"Import limité au répertoire {import_root}"}
+    if not os.path.isfile(path):
+        return {"error": f"Fichier introuvable : '{file_path}'"}
+    if chunk_size <= 0:
+        return {"error": "chunk_size doit être positif"}
+
+    # Un seul instantané de la bibliothèque pour tout le fichier, même si elle est rechargée entre-temps
+    catalog = price_catalog.current()
+    resolved = {}
+    totals = BoqTotals()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    output = os.path.join(
+        OUTPUT_DIR, f"{stem}-chiffre-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}.csv"
+    )
+    handle = None
+    try:
+        reader = BoqReader(path, file_format, sheet, columns)
+        handle, writer = open_lines_file(output)
+        for chunk in reader.chunks(chunk_size):
+            pricing = BoqPricing(
+                catalog, chunk["name"], chunk["quantity"],
+                lots=chunk.get("lot"), categories=chunk.get("category"), locations=chunk.get("location"),
+                transport_coefficients=TRANSPORT_COEFFICIENTS, project_location=project_location,
+                include_transport=include_transport, region=region, units=chunk.get("unit"),
+                resolved=resolved, codes=chunk.get("code")
+            )
+            pricing.write_lines(writer, line_numbers=chunk["row"])
+            totals.add(pricing)
+        close_lines_file(handle, output)
+        handle = None
+    except (ValueError, OSError) as e:
+        return {"error": str(e)}
+    except BOQ_READ_ERRORS as e:
+        return {"error": f"Lecture du DQE impossible : {e}"}
+    finally:
+        if handle is not None:
+            handle.close()
+            os.remove(output + ".tmp")
+
+    result = bulk_summary(totals, project_location)
+    result["source"] = {"file": os.path.basename(path), **reader.info()}
+    result["priced_file"] = os.path.abspath(output)
+    return result
+
+
+@mcp.tool()
+def simulateCostRisk(
+    materials: list,
+    iterations: int = 100000,
+    seed: int = None,
+    correlation: float = 0.6,
+    include_transport: bool = True,
+    project_location: str = "urbain",
+    region: str = None
+) -> dict:
+    """
+    Coût à risque d'un DQE par simulation Monte Carlo de la variabilité des prix de la bibliothèque.
+
+    :param materials: Liste de dicts avec {name, quantity} et optionnellement lot, family (famille de prix
+                      corrélés, par défaut la catégorie de la bibliothèque : gros œuvre, second œuvre...),
+                      location
+    :param iterations: Nombre d'itérations (défaut 100000)
+    :param seed: Graine aléatoire pour des résultats reproductibles
+    :param correlation: Corrélation des écarts de prix entre articles d'une même famille (0 à 1)
+    :param include_transport: Inclure les frais de transport
+    :param project_location: Localisation (urbain, péri-urbain, rural)
+    :param region: Région des prix (prix nationaux à défaut)
+    :return: Percentiles P50/P80/P95 du coût, marge d'imprévus équivalente et classements tornade
+             des lignes et des articles (part de la variance du coût total)
+    """
+    if iterations <= 0:
+        return {"error": "Le nombre d'itérations doit être positif"}
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        return {"error": f"Graine invalide : {seed!r} (entier positif ou nul attendu)"}
+
+    try:
+        columns = columns_from_materials(materials)
+    except ValueError as e:
+        return {"error": str(e)}
+    pricing = BoqPricing(
+        price_catalog.current(), columns["name"], columns["quantity"],
+        lots=columns.get("lot"), locations=columns.get("location"),
+        transport_coefficients=TRANSPORT_COEFFICIENTS, project_location=project_location,
+        include_transport=include_transport, region=region, units=columns.get("unit")
+    )
+    try:
+        model = CostRiskModel(pricing, correlation, columns.get("family"))
+    except ValueError as e:
+        return {"error": str(e)}
+
+    deterministic = model.deterministic_total
+    simulation = model.simulate(iterations, seed)
+    total = simulation["total"]
+    p50, p80, p95 = percentiles(total)
+    flat_total = deterministic * (1 + CONTINGENCY_RATE)
+
+    # Tornade par ligne : part de variance et écart de total (article au P10 / P90) au prorata de la ligne
+    item_base = model.base[model.line_item]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        line_weight = np.where(item_base != 0, pricing.total / item_base, 0.0)
+    line_share = simulation["contribution"][model.line_item] * line_weight
+    swing = model.swing()
+    low = deterministic + (swing[model.line_item, 0] - deterministic) * line_weight
+    high = deterministic + (swing[model.line_item, 1] - deterministic) * line_weight
+    ranked = np.argsort(-line_share, kind="stable")[:20]
+    item_lines = np.bincount(model.line_item, minlength=len(model.items))
+    ranked_items = np.argsort(-simulation["contribution"], kind="stable")[:20]
+
+    def relative(value: float) -> float:
+        return round((value / deterministic - 1) * 100, 1) if deterministic > 0 else 0.0
+
+    return {
+        "simulation": {
+            "iterations": iterations,
+            "seed": seed,
+            "correlation": correlation,
+            "lines": len(pricing),
+            "priced_lines": int(pricing.priced.sum()),
+            "catalog_items": sum(1 for item in model.items if item is not None),
+            "price_families": len(set(model.family_codes[model.base != 0].tolist()))
+        },
+        "cost_euro": {
+            "deterministic": round(deterministic, 2),
+            "mean": round(float(total.mean()), 2),
+            "std": round(float(total.std()), 2),
+            "p50": round(p50, 2),
+            "p80": round(p80, 2),
+            "p95": round(p95, 2),
+            "flat_contingency_12_percent": round(flat_total, 2)
+        },
+        "contingency_percent": {
+            "p50": relative(p50),
+            "p80": relative(p80),
+            "p95": relative(p95)
+        },
+        "probability_within_flat_contingency_percent": round(float((total <= flat_total).mean() * 100), 1),
+        "tornado": [
+            {
+                "line": int(i) + 1,
+                "material": pricing.names[i],
+                "lot": pricing.lot_labels[pricing.lot_codes[i]],
+                "cost_euro": round(float(pricing.total[i]), 2),
+                "variance_share_percent": round(float(line_share[i] * 100), 3),
+                "total_at_p10_price_euro": round(float(low[i]), 2),
+                "total_at_p90_price_euro": round(float(high[i]), 2)
+            }
+            for i in ranked.tolist()
+            if line_share[i] > 0
+        ],
+        "tornado_by_item": [
+            {
+                "catalog_item": model.items[k].name,
+                "catalog_code": model.items[k].code,
+                "lines": int(item_lines[k]),
+                "cost_euro": round(float(model.base[k]), 2),
+                "price_variance": f"±{int(model.items[k].variance * 100)}%",
+                "variance_share_percent": round(float(simulation["contribution"][k] * 100), 1),
+                "total_at_p10_price_euro": round(float(swing[k, 0]), 2),
+                "total_at_p90_price_euro": round(float(swing[k, 1]), 2)
+            }
+            for k in ranked_items.tolist()
+            if simulation["contribution"][k] > 0
+        ],
+        "warnings": BoqTotals().add(pricing).warnings(),
+        "recommendations": [
+            f"Retenir une marge d'imprévus prix de {relative(p80)}% (P80) plutôt que la marge forfaitaire de 12%",
+            "Consulter les fournisseurs en priorité pour les lignes en tête du classement tornade",
+            "Les écarts de prix d'une même famille sont corrélés : négocier les familles dominantes en un seul marché"
         ]
     }
 
@@ -138,18 +463,27 @@ def estimateMaterialCost(
 @mcp.tool()
 def calculateLaborHours(
     tasks: list,
-    team_composition: dict
+    team_composition: dict,
+    region: str = None
 ) -> dict:
     """
     Calcule les heures de main-d'œuvre et les coûts associés.
 
     :param tasks: Liste de tâches avec {task_name, trade, estimated_hours}
     :param team_composition: Composition de l'équipe {trade: num_workers}
+    :param region: Région des taux horaires de la bibliothèque de prix (taux nationaux à défaut)
     :return: Calcul détaillé des heures et coûts
     """
     labor_breakdown = []
     total_hours_by_trade = {}
     total_cost = 0
+    catalog = price_catalog.current()
+
+    # Effectifs et heures regroupés par corps de métier de la bibliothèque : « macon » et « maçon » ne font qu'un
+    workers_by_trade = {}
+    for trade, num_workers in (team_composition or {}).items():
+        match = catalog.lookup(trade, kind=LABOR)
+        workers_by_trade[match.item.name if match is not None else str(trade).lower()] = num_workers
 
     # Traiter chaque tâche
     for task in tasks:
@@ -157,8 +491,9 @@ def calculateLaborHours(
         trade = task.get("trade", "").lower()
         estimated_hours = task.get("estimated_hours", 0)
 
-        if trade in LABOR_RATES:
-            hourly_rate = LABOR_RATES[trade]
+        match = catalog.lookup(trade, region, kind=LABOR)
+        if match is not None:
+            hourly_rate = match.item.price
             task_cost = hourly_rate * estimated_hours
 
             labor_breakdown.append({
@@ -170,15 +505,16 @@ def calculateLaborHours(
             })
 
             # Accumulation par corps de métier
-            if trade not in total_hours_by_trade:
-                total_hours_by_trade[trade] = {
+            catalog_trade = match.item.name
+            if catalog_trade not in total_hours_by_trade:
+                total_hours_by_trade[catalog_trade] = {
                     "hours": 0,
                     "cost": 0,
                     "rate": hourly_rate
                 }
 
-            total_hours_by_trade[trade]["hours"] += estimated_hours
-            total_hours_by_trade[trade]["cost"] += task_cost
+            total_hours_by_trade[catalog_trade]["hours"] += estimated_hours
+            total_hours_by_trade[catalog_trade]["cost"] += task_cost
             total_cost += task_cost
 
     # Calcul durée projet selon composition équipe
@@ -186,7 +522,7 @@ def calculateLaborHours(
     duration_details = []
 
     for trade, data in total_hours_by_trade.items():
-        num_workers = team_composition.get(trade, 1)
+        num_workers = workers_by_trade.get(trade, 1)
         hours_per_worker = data["hours"] / num_workers if num_workers > 0 else data["hours"]
         days_per_worker = hours_per_worker / 8  # 8h par jour
 
@@ -324,9 +660,10 @@ def trackBudgetDeviation(
 @mcp.tool()
 def generateCostBreakdown(
     project_name: str,
-    material_costs: dict,
-    labor_costs: dict,
-    other_costs: dict
+    material_costs: dict = None,
+    labor_costs: dict = None,
+    other_costs: dict = None,
+    cost_tree_id: str = None
 ) -> dict:
     """
     Génère un devis détaillé complet du projet.
@@ -335,12 +672,25 @@ def generateCostBreakdown(
     :param material_costs: Coûts matériaux {category: amount}
     :param labor_costs: Coûts main-d'œuvre {category: amount}
     :param other_costs: Autres coûts {category: amount}
+    :param cost_tree_id: Identifiant d'un arbre WBS (openCostTree), à la place des trois dictionnaires :
+                         détail par lot et totaux lus sur l'arbre
     :return: Devis détaillé formaté
     """
-    # Totaux par catégorie
-    total_materials = sum(material_costs.values())
-    total_labor = sum(labor_costs.values())
-    total_other = sum(other_costs.values())
+    if cost_tree_id is not None:
+        tree = COST_TREES.get(cost_tree_id)
+        if tree is None:
+            return {"error": f"Arbre de coûts inconnu : '{cost_tree_id}'"}
+        details = tree.breakdown(level=1)
+        material_costs, labor_costs, other_costs = (details[kind] for kind in COST_TYPES)
+        total_materials, total_labor, total_other = (float(value) for value in tree.totals[ROOT])
+    else:
+        material_costs = material_costs or {}
+        labor_costs = labor_costs or {}
+        other_costs = other_costs or {}
+        # Totaux par catégorie
+        total_materials = sum(material_costs.values())
+        total_labor = sum(labor_costs.values())
+        total_other = sum(other_costs.values())
 
     subtotal = total_materials + total_labor + total_other
 
@@ -395,6 +745,130 @@ def generateCostBreakdown(
     return breakdown
 
 
+@mcp.tool()
+def openCostTree(
+    lines: list,
+    project_name: str = None,
+    separator: str = "."
+) -> dict:
+    """
+    Ouvre côté serveur un estimatif structuré en WBS (lot -> sous-lot -> ouvrage -> ligne), dont les totaux
+    de chaque poste sont maintenus à chaque modification de ligne (updateCostTree).
+
+    :param lines: Lignes chiffrées avec {path: [lot, sous-lot, ..., ligne]} ou {wbs_code: "02.01.003"},
+                  et amount ou quantity + unit_price, cost_type (material, labor, other ; défaut material)
+    :param project_name: Nom du projet (optionnel)
+    :param separator: Séparateur des niveaux de wbs_code
+    :return: Identifiant de l'arbre, total du projet et totaux par lot
+    """
+    try:
+        tree = WbsCostTree(lines, separator, project_name)
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}
+    tree_id = f"wbs-{datetime.now().strftime('%Y%m%d%H%M%S')}-{os.urandom(3).hex()}"
+    COST_TREES[tree_id] = tree
+    root = tree.node_summary(ROOT)
+    return {
+        "cost_tree_id": tree_id,
+        "project_name": project_name,
+        "lines": tree.leaves,
+        "nodes": len(tree) - 1,
+        "max_depth": max(tree.depth),
+        "total": root,
+        "lots": tree.view(ROOT, max_depth=1, limit=201)[1:]
+    }
+
+
+@mcp.tool()
+def updateCostTree(
+    cost_tree_id: str,
+    updates: list
+) -> dict:
+    """
+    Modifie, ajoute ou supprime des lignes d'un arbre WBS ouvert ; seuls les totaux des postes parents
+    de chaque ligne sont mis à jour (coût proportionnel à la profondeur, pas à la taille de l'estimatif).
+
+    :param cost_tree_id: Identifiant renvoyé par openCostTree
+    :param updates: Liste de {path | wbs_code, amount | quantity | unit_price, cost_type} ;
+                    {path | wbs_code, remove: true} supprime la ligne ou le poste
+    :return: Postes dont le total a changé (de la ligne vers le projet) et nouveau total du projet
+    """
+    tree = COST_TREES.get(cost_tree_id)
+    if tree is None:
+        return {"error": f"Arbre de coûts inconnu : '{cost_tree_id}'"}
+
+    changed = {}
+    errors = []
+    for update in updates:
+        try:
+            path = parse_path(update, tree.separator)
+            chain = tree.remove(path) if update.get("remove") else tree.update(path, update)
+        except (ValueError, TypeError) as e:
+            errors.append({"update": update, "error": str(e)})
+            continue
+        for node in chain:
+            changed[node] = True
+
+    result = {
+        "cost_tree_id": cost_tree_id,
+        "applied": len(updates) - len(errors),
+        "changed_nodes": [tree.node_summary(node) for node in list(changed)[:200] if node != ROOT],
+        "total": tree.node_summary(ROOT)
+    }
+    if errors:
+        result["errors"] = errors[:50]
+    return result
+
+
+@mcp.tool()
+def getCostTree(
+    cost_tree_id: str,
+    path: list = None,
+    wbs_code: str = None,
+    max_depth: int = 1,
+    limit: int = 200
+) -> dict:
+    """
+    Consulte un poste d'un arbre WBS ouvert et ses sous-postes, avec leurs totaux par type de coût.
+
+    :param cost_tree_id: Identifiant renvoyé par openCostTree
+    :param path: Chemin du poste [lot, sous-lot, ...] (défaut : projet entier)
+    :param wbs_code: Code WBS du poste, à la place de path
+    :param max_depth: Nombre de niveaux de sous-postes affichés
+    :param limit: Nombre maximal de postes renvoyés
+    :return: Postes en ordre WBS
+    """
+    tree = COST_TREES.get(cost_tree_id)
+    if tree is None:
+        return {"error": f"Arbre de coûts inconnu : '{cost_tree_id}'"}
+    node = ROOT
+    if path or wbs_code:
+        node = tree.find(parse_path({"path": path, "wbs_code": wbs_code}, tree.separator))
+        if node is None:
+            return {"error": f"Poste introuvable : {path or wbs_code}"}
+    return {
+        "cost_tree_id": cost_tree_id,
+        "project_name": tree.project_name,
+        "nodes": tree.view(node, max_depth=max(0, max_depth), limit=max(1, limit))
+    }
+
+
+@mcp.tool()
+def closeCostTree(
+    cost_tree_id: str
+) -> dict:
+    """
+    Ferme un arbre WBS ouvert et libère sa mémoire.
+
+    :param cost_tree_id: Identifiant renvoyé par openCostTree
+    :return: Confirmation et total final
+    """
+    tree = COST_TREES.pop(cost_tree_id, None)
+    if tree is None:
+        return {"error": f"Arbre de coûts inconnu : '{cost_tree_id}'"}
+    return {"cost_tree_id": cost_tree_id, "closed": True, "total": tree.node_summary(ROOT)}
+
+
 @mcp.tool()
 def comparePriceAlternatives(
     base_option: dict,
@@ -444,6 +918,56 @@ def comparePriceAlternatives(
     }
 
 
+@mcp.tool()
+def searchPriceCatalog(
+    query: str = "",
+    region: str = None,
+    kind: str = "material",
+    limit: int = 10
+) -> dict:
+    """
+    Recherche des articles dans la bibliothèque de prix par similarité de nom (insensible
+    aux accents et à la casse) ou par code. Sans requête, décrit la bibliothèque chargée.
+
+    :param query: Nom ou code de l'article recherché
+    :param region: Région des prix (prix nationaux à défaut)
+    :param kind: Nature des articles : material (matériaux) ou labor (taux horaires)
+    :param limit: Nombre maximal de résultats
+    :return: Articles trouvés avec prix, unité et score de similarité
+    """
+    if kind not in (MATERIAL, LABOR):
+        return {"error": f"Nature inconnue : '{kind}' (disponibles : {MATERIAL}, {LABOR})"}
+    catalog = price_catalog.current()
+    result = {"catalog": price_catalog.info()}
+    if not query:
+        return result
+
+    matches = []
+    exact = catalog.lookup(query, region, kind=kind)
+    if exact is not None:
+        matches.append(exact)
+    for name, score in catalog.search(query, kind, limit=max(1, min(limit, 100))):
+        match = catalog.lookup(name, region, kind=kind)
+        if exact is None or match.item != exact.item:
+            matches.append(match._replace(method="fuzzy", score=score))
+
+    result["results"] = [
+        {
+            "code": match.item.code,
+            "name": match.item.name,
+            "unit": match.item.unit,
+            "unit_price_euro": match.item.price,
+            "price_variance": f"±{int(match.item.variance * 100)}%",
+            "category": match.item.category,
+            "region": region_label(match.item),
+            "match": match.method,
+            "score": match.score
+        }
+        for match in matches[:limit]
+    ]
+    return result
+
+
 if __name__ == '__main__':
     # Tests
     print("=== Test Estimation Matériaux ===")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : cost_risk.py
+# @Author: Assistant
+# @Desc  : Coût à risque d'un DQE par Monte Carlo vectorisé sur la variabilité des prix de la bibliothèque
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from bulk_pricing import BoqPricing, factorize
+from price_catalog import normalize
+
+# La variabilité « ±v » de la bibliothèque est lue comme un intervalle à 95 % autour du prix
+Z95 = 1.959964
+Z10 = 1.281552
+
+# Nombre d'éléments (articles x itérations) simulés par bloc : borne la mémoire
+# et fixe un découpage indépendant de la taille du DQE (reproductibilité)
+CHUNK_ELEMENTS = 4_000_000
+
+
+class CostRiskModel:
+    """
+    Modèle d'incertitude des prix d'un DQE chiffré.
+
+    Les lignes d'un même article partagent son prix : elles sont regroupées par
+    article (montant de base, transport compris). Chaque article suit un facteur de
+    prix lognormal de moyenne 1 et d'écart-type logarithmique variance / 1,96 ; les
+    articles d'une même famille (champ `family` des lignes, sinon catégorie de la
+    bibliothèque, sinon l'article seul) sont corrélés par un facteur commun :
+    z = √ρ · z_famille + √(1 - ρ) · z_article.
+    """
+
+    def __init__(self, pricing: BoqPricing, correlation: float = 0.6, families: Optional[Sequence] = None):
+        if not 0 <= correlation <= 1:
+            raise ValueError("La corrélation intra-famille doit être comprise entre 0 et 1")
+        self.pricing = pricing
+        self.correlation = correlation
+
+        # Articles distincts de la bibliothèque (plusieurs libellés peuvent désigner le même article)
+        slot_item, items = factorize([m.item if m else None for m in pricing.matches])
+        self.items = items
+        self.line_item = slot_item[pricing.name_codes]
+        priced = np.array([item is not None for item in items], dtype=bool)
+        self.base = np.bincount(self.line_item, weights=pricing.total, minlength=len(items)) * priced
+        self.sigma = np.array([item.variance / Z95 if item else 0.0 for item in items], dtype=np.float64)
+
+        # Famille de chaque article : première famille saisie sur ses lignes, sinon sa catégorie, sinon lui-même
+        labels: List[Optional[str]] = [None] * len(items)
+        if families is not None:
+            for family, k in zip(families, self.line_item.tolist()):
+                if family and labels[k] is None:
+                    labels[k] = normalize(family)
+        labels = [
+            label or (normalize(item.category) if item and item.category else None) or f"article:{k}"
+            for k, (label, item) in enumerate(zip(labels, items))
+        ]
+        self.family_codes, self.families = factorize(labels)
+
+    @property
+    def deterministic_total(self) -> float:
+        return float(self.base.sum())
+
+    def simulate(self, iterations: int, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Totaux simulés et moments par article, par blocs de taille fixe dont les graines
+        dérivent de `seed` (SeedSequence.spawn).
+        """
+        active = np.flatnonzero((self.sigma > 0) & (self.base != 0))
+        fixed_total = float(self.base.sum() - self.base[active].sum())
+        m = len(active)
+        chunk = max(1, min(iterations, CHUNK_ELEMENTS // max(m, 1)))
+        sizes = [chunk] * (iterations // chunk)
+        if iterations % chunk:
+            sizes.append(iterations % chunk)
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+        family_codes, families = factorize(self.family_codes[active].tolist())
+        sigma = self.sigma[active, None]
+        drift = sigma ** 2 / 2
+        base = self.base[active]
+        shared, own = np.sqrt(self.correlation), np.sqrt(1 - self.correlation)
+
+        totals = []
+        sum_f = np.zeros(m)
+        sum_ft = np.zeros(m)
+        for size, child in zip(sizes, seeds):
+            rng = np.random.default_rng(child)
+            z = rng.standard_normal((m, size))
+            z *= own
+            z += shared * rng.standard_normal((len(families), size))[family_codes]
+            z *= sigma
+            z -= drift
+            factor = np.exp(z, out=z)
+            total = base @ factor + fixed_total
+            totals.append(total)
+            sum_f += factor.sum(axis=1)
+            sum_ft += factor @ total
+
+        total = np.concatenate(totals) if totals else np.zeros(0)
+        # Part de variance de chaque article : cov(base·f, T) / var(T), de somme 1
+        variance = total.var()
+        contribution = np.zeros(len(self.items))
+        if variance > 0:
+            cov = sum_ft / iterations - (sum_f / iterations) * total.mean()
+            contribution[active] = base * cov / variance
+        return {"total": total, "contribution": contribution}
+
+    def swing(self) -> np.ndarray:
+        """Total du DQE avec chaque article à son prix P10 puis P90, les autres à leur prix de base."""
+        drift = self.sigma ** 2 / 2
+        low = self.base * (np.exp(-Z10 * self.sigma - drift) - 1)
+        high = self.base * (np.exp(Z10 * self.sigma - drift) - 1)
+        total = self.deterministic_total
+        return np.stack([total + low, total + high], axis=1)
+
+
+def percentiles(total: np.ndarray, levels: Sequence[int] = (50, 80, 95)) -> List[float]:
+    return [float(v) for v in np.percentile(total, levels)] if len(total) else [0.0] * len(levels)
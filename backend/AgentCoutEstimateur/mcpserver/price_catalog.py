@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : price_catalog.py
+# @Author: Assistant
+# @Desc  : Bibliothèque de prix indexée (CSV / SQLite) avec recherche approchée par trigrammes et rechargement à chaud
+
+import csv
+import heapq
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Région des prix nationaux (utilisés quand la région demandée n'a pas de prix propre)
+NATIONAL = ""
+NATIONAL_LABEL = "national"
+MATERIAL, LABOR = "material", "labor"
+
+# Score minimal (coefficient de Dice sur les trigrammes) pour proposer un article proche ; une
+# proposition n'est jamais chiffrée d'office (« porte fenêtre » -> « porte » obtient 0,60)
+FUZZY_THRESHOLD = 0.55
+
+# Intervalle minimal entre deux vérifications de la date de modification du fichier source
+CHECK_INTERVAL = 2.0
+
+_LIGATURES = str.maketrans({"œ": "oe", "Œ": "oe", "æ": "ae", "Æ": "ae", "ß": "ss"})
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# En-têtes acceptés pour chaque champ (après normalisation)
+_COLUMNS = {
+    "code": ("code", "reference", "ref", "article"),
+    "name": ("name", "designation", "libelle", "nom", "material", "materiau"),
+    "unit": ("unit", "unite", "u"),
+    "price": ("price", "prix", "prix unitaire", "unit price", "pu", "prix ht"),
+    "variance": ("variance", "variabilite", "ecart"),
+    "region": ("region", "zone"),
+    "category": ("category", "categorie", "famille", "lot"),
+    "kind": ("kind", "type", "nature"),
+}
+
+
+def normalize(text) -> str:
+    """Minuscules, sans accents ni ponctuation : « Béton C25/30 » -> « beton c25 30 »."""
+    text = unicodedata.normalize("NFKD", str(text).translate(_LIGATURES).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def trigrams(normalized: str) -> set:
+    """Trigrammes d'un texte normalisé, bordés d'espaces pour pondérer les débuts de mots."""
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_number(value) -> Optional[float]:
+    """Nombre saisi à la française ou non : « 1 234,50 », « 1234.5 », « 12 € »."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace(" ", "").replace(" ", "").replace("€", "").replace("%", "")
+    if "," in text and "." in text:
+        # Le dernier séparateur est le séparateur décimal : « 1.234,50 » ou « 1,234.50 »
+        thousands = "." if text.rfind(",") > text.rfind(".") else ","
+        text = text.replace(thousands, "")
+    text = text.replace(",", ".")
+    try:
+        return float(text) if text else None
+    except ValueError:
+        return None
+
+
+class PriceItem(NamedTuple):
+    code: str
+    name: str
+    unit: str
+    price: float
+    variance: float
+    region: str
+    category: str
+    kind: str
+
+
+class Match(NamedTuple):
+    item: PriceItem
+    method: str       # "code" ou "name" ("fuzzy" pour les résultats de recherche)
+    score: float
+    fallback: bool    # prix d'une autre région, faute de prix pour la région demandée ou national
+
+
+def region_label(item: PriceItem) -> str:
+    """Région d'où provient le prix d'un article (« national » pour les prix nationaux)."""
+    return item.region or NATIONAL_LABEL
+
+
+class CatalogIndex:
+    """
+    Instantané immuable d'une bibliothèque de prix : index de hachage par code et par
+    nom normalisé (puis par région), et index inversé trigramme -> noms pour la
+    recherche approchée insensible aux accents. Une fois construit, il n'est plus
+    modifié : un rechargement en construit un autre, substitué d'un bloc.
+    """
+
+    def __init__(self, items: Iterable[PriceItem], source: str = "intégrée"):
+        self.source = source
+        self.loaded_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.by_code: Dict[Tuple[str, str], Dict[str, PriceItem]] = {}
+        self.by_name: Dict[Tuple[str, str], Dict[str, PriceItem]] = {}
+        self.names: Dict[str, List[str]] = {MATERIAL: [], LABOR: []}
+        self.regions = set()
+        postings: Dict[str, Dict[str, List[int]]] = {MATERIAL: defaultdict(list), LABOR: defaultdict(list)}
+        sizes: Dict[str, List[int]] = {MATERIAL: [], LABOR: []}
+
+        for item in items:
+            self.regions.add(item.region)
+            if item.code:
+                self.by_code.setdefault((item.kind, normalize(item.code)), {})[item.region] = item
+            key = normalize(item.name)
+            regional = self.by_name.setdefault((item.kind, key), {})
+            if not regional:
+                grams = trigrams(key)
+                name_id = len(self.names[item.kind])
+                self.names[item.kind].append(key)
+                sizes[item.kind].append(len(grams))
+                for gram in grams:
+                    postings[item.kind][gram].append(name_id)
+            regional[item.region] = item
+
+        self.postings = {kind: dict(grams) for kind, grams in postings.items()}
+        self.sizes = sizes
+        # Un article repris à l'identique (même nature, nom et région) remplace le précédent
+        self.count = sum(len(regional) for regional in self.by_name.values())
+
+    def __len__(self) -> int:
+        return self.count
+
+    @staticmethod
+    def _in_region(regional: Dict[str, PriceItem], region: str) -> Tuple[PriceItem, bool]:
+        """
+        Prix de la région, sinon national, sinon celui d'une autre région (ordre stable) ;
+        le booléen signale ce dernier cas, la région du prix étant celle de l'article.
+        """
+        if region in regional:
+            return regional[region], False
+        if NATIONAL in regional:
+            return regional[NATIONAL], False
+        return regional[min(regional)], True
+
+    def search(self, query: str, kind: str = MATERIAL, limit: int = 10, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """Noms normalisés les plus proches de `query` (coefficient de Dice sur les trigrammes)."""
+        grams = trigrams(normalize(query))
+        postings = self.postings.get(kind, {})
+        common = Counter(chain.from_iterable(postings.get(gram, ()) for gram in grams))
+        sizes = self.sizes[kind]
+        names = self.names[kind]
+        total = len(grams)
+        scored = (
+            (2 * shared / (total + sizes[name_id]), name_id) for name_id, shared in common.items()
+        )
+        best = heapq.nsmallest(
+            limit, ((-score, names[name_id]) for score, name_id in scored if score >= min_score)
+        )
+        return [(name, round(-score, 3)) for score, name in best]
+
+    def lookup(self, query: str, region: Optional[str] = None, kind: str = MATERIAL) -> Optional[Match]:
+        """Prix d'un article par code, puis par nom normalisé (O(1)) ; aucun rapprochement approché."""
+        region = normalize(region) if region else NATIONAL
+        key = normalize(query)
+        if not key:
+            return None
+        regional = self.by_code.get((kind, key))
+        method = "code"
+        if regional is None:
+            regional = self.by_name.get((kind, key))
+            method = "name"
+        if regional is not None:
+            item, fallback = self._in_region(regional, region)
+            return Match(item, method, 1.0, fallback)
+        return None
+
+    def suggest(self, query: str, kind: str = MATERIAL) -> Optional[Tuple[PriceItem, float]]:
+        """Article le plus proche d'un libellé introuvable (au-delà de FUZZY_THRESHOLD), à faire confirmer."""
+        best = self.search(query, kind, limit=1, min_score=FUZZY_THRESHOLD)
+        if not best:
+            return None
+        name, score = best[0]
+        item, _ = self._in_region(self.by_name[(kind, name)], NATIONAL)
+        return item, score
+
+
+def _header_map(fieldnames: List[str]) -> Dict[str, str]:
+    """Champ canonique -> en-tête du fichier."""
+    mapping = {}
+    for header in fieldnames:
+        key = normalize(header).replace("_", " ")
+        for field, aliases in _COLUMNS.items():
+            if key in aliases and field not in mapping:
+                mapping[field] = header
+    missing = [field for field in ("name", "price") if field not in mapping]
+    if missing:
+        raise ValueError(f"Colonnes manquantes dans la bibliothèque de prix : {', '.join(missing)}")
+    return mapping
+
+
+def _item(row: dict, mapping: Dict[str, str]) -> Optional[PriceItem]:
+    def field(name: str, default=""):
+        header = mapping.get(name)
+        value = row.get(header) if header else None
+        return default if value is None else str(value).strip()
+
+    name = field("name")
+    price = parse_number(row.get(mapping["price"]))
+    if not name or price is None:
+        return None
+    variance = parse_number(field("variance", None)) if "variance" in mapping else None
+    if variance is not None and variance > 1:
+        variance /= 100  # variabilité saisie en pourcentage
+    kind = normalize(field("kind", MATERIAL))
+    return PriceItem(
+        code=field("code"),
+        name=name,
+        unit=field("unit", "unité") or "unité",
+        price=price,
+        variance=variance if variance is not None else 0.10,
+        region=normalize(field("region")),
+        category=field("category"),
+        kind=LABOR if kind in ("labor", "main d oeuvre", "mo", "main oeuvre") else MATERIAL
+    )
+
+
+def read_csv(path: str) -> List[PriceItem]:
+    """Bibliothèque CSV (séparateur ; , ou tabulation détecté), encodage UTF-8 ou Windows-1252."""
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            text = f.read()
+    except UnicodeDecodeError:
+        with open(path, encoding="cp1252", newline="") as f:
+            text = f.read()
+    first_line = text.split("\n", 1)[0]
+    delimiter = max(";,\t", key=first_line.count)
+    reader = csv.DictReader(text.splitlines(), delimiter=delimiter)
+    mapping = _header_map(reader.fieldnames or [])
+    return [item for item in (_item(row, mapping) for row in reader) if item is not None]
+
+
+def read_sqlite(path: str, table: str = "prices") -> List[PriceItem]:
+    """Bibliothèque SQLite : table `table` avec les mêmes colonnes que le CSV."""
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", table):
+        raise ValueError(f"Nom de table invalide : '{table}'")
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = connection.execute(f"SELECT * FROM {table}")
+        headers = [column[0] for column in cursor.description]
+        mapping = _header_map(headers)
+        return [item for item in (_item(dict(zip(headers, row)), mapping) for row in cursor) if item is not None]
+    except sqlite3.Error as e:
+        raise ValueError(f"Lecture de la bibliothèque SQLite impossible : {e}")
+    finally:
+        connection.close()
+
+
+def read_catalog_file(path: str, table: str = "prices") -> List[PriceItem]:
+    if os.path.splitext(path)[1].lower() in (".db", ".sqlite", ".sqlite3"):
+        return read_sqlite(path, table)
+    return read_csv(path)
+
+
+class PriceCatalog:
+    """
+    Bibliothèque de prix rechargée à chaud.
+
+    Les lectures passent par `current()`, qui renvoie l'index courant sans verrou.
+    Au plus toutes les CHECK_INTERVAL secondes, la date de modification et la taille
+    du fichier source sont comparées à celles de l'index chargé ; en cas de
+    changement, un nouvel index est construit dans un thread d'arrière-plan puis
+    substitué par une simple affectation : les recherches en cours continuent sur
+    l'ancien index, sans pause. Un fichier invalide laisse l'index précédent en place.
+    """
+
+    def __init__(self, path: Optional[str], builtin: Iterable[PriceItem] = (), table: str = "prices"):
+        self.path = path
+        self.table = table
+        self.builtin = list(builtin)
+        self.last_error: Optional[str] = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._reloading = threading.Lock()
+        self._index = CatalogIndex(self.builtin)
+        if path:
+            self._reload(self._file_signature())
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload(self, signature):
+        try:
+            items = read_catalog_file(self.path, self.table)
+            # Les prix intégrés restent disponibles sauf s'ils sont redéfinis par le fichier
+            index = CatalogIndex(self.builtin + items, source=os.path.basename(self.path))
+        except (OSError, ValueError, csv.Error) as e:
+            self.last_error = f"Bibliothèque de prix non rechargée ({e}) : index précédent conservé"
+        else:
+            self._index = index
+            self.last_error = None
+        self._signature = signature
+
+    def _reload_in_background(self, signature):
+        if not self._reloading.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self._reload(signature)
+            finally:
+                self._reloading.release()
+        threading.Thread(target=run, name="price-catalog-reload", daemon=True).start()
+
+    def current(self) -> CatalogIndex:
+        if self.path:
+            now = time.monotonic()
+            if now - self._checked_at >= CHECK_INTERVAL:
+                self._checked_at = now
+                signature = self._file_signature()
+                if signature is not None and signature != self._signature:
+                    self._reload_in_background(signature)
+        return self._index
+
+    def info(self) -> dict:
+        index = self._index
+        info = {
+            "source": index.source,
+            "items": len(index),
+            "materials": len(index.names[MATERIAL]),
+            "labor_trades": len(index.names[LABOR]),
+            "regions": sorted(region for region in index.regions if region),
+            "loaded_at": index.loaded_at,
+        }
+        if self.last_error:
+            info["error"] = self.last_error
+        return info
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : wbs_tree.py
+# @Author: Assistant
+# @Desc  : Arbre de coûts WBS (lot -> sous-lot -> ouvrage -> ligne) à totaux maintenus, mise à jour en O(profondeur)
+
+import math
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+COST_TYPES = ("material", "labor", "other")
+ROOT = 0
+
+
+def parse_path(line: dict, separator: str = ".") -> Tuple[str, ...]:
+    """
+    Chemin d'une ligne : `path` (liste de libellés, de la racine vers la ligne) ou
+    `wbs_code` (« 02.01.003 » -> « 02 », « 02.01 », « 02.01.003 »).
+    """
+    if not isinstance(line, dict):
+        raise ValueError(f"Ligne invalide : {line!r} (attendu : {{path | wbs_code, amount | quantity, unit_price}})")
+    if line.get("path"):
+        path = tuple(str(label).strip() for label in line["path"])
+    elif line.get("wbs_code"):
+        parts = str(line["wbs_code"]).strip().split(separator)
+        path = tuple(separator.join(parts[:k]) for k in range(1, len(parts) + 1))
+    else:
+        raise ValueError("Chaque ligne doit porter 'path' (liste de libellés) ou 'wbs_code'")
+    if not all(path):
+        raise ValueError(f"Chemin WBS avec un niveau vide : {list(path)}")
+    return path
+
+
+class WbsCostTree:
+    """
+    Arbre WBS aplati : les nœuds sont des index, le parent de chaque nœud est stocké
+    dans un tableau compact et les totaux de chaque nœud (un par type de coût) dans
+    une matrice NumPy à capacité doublée au besoin.
+
+    Les totaux des nœuds intermédiaires sont maintenus en permanence : la
+    construction les agrège niveau par niveau (une addition vectorisée par
+    profondeur), puis modifier une ligne n'ajoute l'écart qu'à ses ancêtres, en
+    O(profondeur), sans ressommer l'arbre. La lecture d'un total est en O(1).
+    """
+
+    def __init__(self, lines: list, separator: str = ".", project_name: Optional[str] = None):
+        self.parent = array("i", [-1])
+        self.depth = array("i", [0])
+        self.labels: List[str] = [""]
+        self.children: List[List[int]] = [[]]
+        self.child_index: Dict[Tuple[int, str], int] = {}
+        self.cost_type = array("b", [-1])       # -1 pour un nœud intermédiaire
+        self.quantity = array("d", [math.nan])
+        self.unit_price = array("d", [math.nan])
+        self.totals = np.zeros((max(16, 2 * len(lines) + 1), len(COST_TYPES)))
+        self.separator = separator
+        self.project_name = project_name
+        self.leaves = 0
+
+        for line in lines:
+            path = parse_path(line, separator)
+            node = self._insert(path)
+            if self.cost_type[node] >= 0:
+                raise ValueError(f"Ligne en double dans le WBS : '{self.path_label(node)}'")
+            self._set_leaf(node, self._line_values(node, line))
+
+        # Agrégation ascendante, profondeur par profondeur
+        parents = np.frombuffer(self.parent, dtype=np.int32)
+        depths = np.frombuffer(self.depth, dtype=np.int32)
+        for level in range(int(depths.max()), 0, -1):
+            nodes = np.flatnonzero(depths == level)
+            np.add.at(self.totals, parents[nodes], self.totals[nodes])
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    # ------------------------------------------------------------------
+    # Structure
+    # ------------------------------------------------------------------
+    def _new_node(self, parent: int, label: str) -> int:
+        if self.cost_type[parent] >= 0:
+            raise ValueError(f"'{self.path_label(parent)}' est une ligne chiffrée : elle ne peut pas avoir d'enfants")
+        node = len(self.parent)
+        if node >= len(self.totals):
+            grown = np.zeros((2 * len(self.totals), len(COST_TYPES)))
+            grown[:len(self.totals)] = self.totals
+            self.totals = grown
+        self.parent.append(parent)
+        self.depth.append(self.depth[parent] + 1)
+        self.labels.append(label)
+        self.children.append([])
+        self.children[parent].append(node)
+        self.child_index[(parent, label)] = node
+        self.cost_type.append(-1)
+        self.quantity.append(math.nan)
+        self.unit_price.append(math.nan)
+        return node
+
+    def _insert(self, path: Sequence[str]) -> int:
+        node = ROOT
+        for label in path:
+            child = self.child_index.get((node, label))
+            node = child if child is not None else self._new_node(node, label)
+        if self.children[node]:
+            raise ValueError(f"'{self.path_label(node)}' regroupe d'autres postes : ce n'est pas une ligne chiffrée")
+        return node
+
+    def find(self, path: Sequence[str]) -> Optional[int]:
+        node = ROOT
+        for label in path:
+            node = self.child_index.get((node, label))
+            if node is None:
+                return None
+        return node
+
+    def ancestors(self, node: int) -> List[int]:
+        """Nœud, ses parents successifs et la racine."""
+        chain = []
+        while node >= 0:
+            chain.append(node)
+            node = self.parent[node]
+        return chain
+
+    def path(self, node: int) -> List[str]:
+        return [self.labels[i] for i in reversed(self.ancestors(node)[:-1])]
+
+    def path_label(self, node: int) -> str:
+        return " > ".join(self.path(node)) or "Projet"
+
+    # ------------------------------------------------------------------
+    # Lignes chiffrées
+    # ------------------------------------------------------------------
+    def _line_values(self, node: Optional[int], line: dict, label: str = "") -> Tuple[int, float, float, float]:
+        """
+        Type de coût, quantité, prix unitaire et montant d'une ligne (champs absents : valeurs
+        actuelles du nœud, ou aucune pour une ligne pas encore créée, `node` None).
+        """
+        current = self.cost_type[node] if node is not None else -1
+        cost_type = line.get("cost_type") or (COST_TYPES[current] if current >= 0 else "material")
+        if cost_type not in COST_TYPES:
+            raise ValueError(f"Type de coût inconnu : '{cost_type}' (disponibles : {', '.join(COST_TYPES)})")
+        quantity = line.get("quantity", self.quantity[node] if node is not None else math.nan)
+        unit_price = line.get("unit_price", self.unit_price[node] if node is not None else math.nan)
+        try:
+            quantity = math.nan if quantity is None else float(quantity)
+            unit_price = math.nan if unit_price is None else float(unit_price)
+            amount = float(line["amount"]) if line.get("amount") is not None else None
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"Ligne '{label or self.path_label(node)}' : amount, quantity et unit_price doivent être numériques"
+            )
+        if amount is not None:
+            if "quantity" not in line and "unit_price" not in line:
+                quantity = unit_price = math.nan
+        elif not math.isnan(quantity) and not math.isnan(unit_price):
+            amount = quantity * unit_price
+        elif current >= 0 and "quantity" not in line and "unit_price" not in line:
+            amount = float(self.totals[node].sum())
+        else:
+            raise ValueError(f"Ligne '{label or self.path_label(node)}' : fournir amount, ou quantity et unit_price")
+        return COST_TYPES.index(cost_type), quantity, unit_price, amount
+
+    def _set_leaf(self, node: int, values: Tuple[int, float, float, float]) -> np.ndarray:
+        """Affecte la ligne et renvoie l'écart de totaux (par type de coût) à reporter sur les ancêtres."""
+        kind, quantity, unit_price, amount = values
+        row = np.zeros(len(COST_TYPES))
+        row[kind] = amount
+        delta = row - self.totals[node]
+        self.totals[node] = row
+        if self.cost_type[node] < 0:
+            self.leaves += 1
+        self.cost_type[node] = kind
+        self.quantity[node] = quantity
+        self.unit_price[node] = unit_price
+        return delta
+
+    def update(self, path: Sequence[str], line: dict) -> List[int]:
+        """
+        Modifie (ou ajoute) une ligne et reporte l'écart sur chacun de ses ancêtres. La ligne
+        est contrôlée avant toute création de poste : une mise à jour refusée laisse l'arbre inchangé.
+
+        :return: nœuds dont le total a changé, de la ligne vers la racine
+        """
+        node = self.find(path)
+        if node is None:
+            values = self._line_values(None, line, " > ".join(path))
+            node = self._insert(path)
+        elif self.children[node]:
+            raise ValueError(f"'{self.path_label(node)}' regroupe d'autres postes : ce n'est pas une ligne chiffrée")
+        else:
+            values = self._line_values(node, line)
+        delta = self._set_leaf(node, values)
+        chain = self.ancestors(node)
+        if delta.any():
+            for ancestor in chain[1:]:
+                self.totals[ancestor] += delta
+        return chain
+
+    def remove(self, path: Sequence[str]) -> List[int]:
+        """Supprime une ligne (ou un poste et tout son contenu) ; renvoie les ancêtres mis à jour."""
+        node = self.find(path)
+        if node is None or node == ROOT:
+            raise ValueError(f"Poste introuvable : {list(path)}")
+        delta = -self.totals[node]
+        parent = self.parent[node]
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            self.leaves -= self.cost_type[current] >= 0
+            stack.extend(self.children[current])
+        self.children[parent].remove(node)
+        self.child_index.pop((parent, self.labels[node]))
+        # Le nœud et ses descendants restent dans les tableaux, détachés de l'arbre
+        chain = self.ancestors(parent)
+        for ancestor in chain:
+            self.totals[ancestor] += delta
+        return chain
+
+    def recompute(self) -> float:
+        """Recalcule les totaux depuis les lignes ; renvoie l'écart maximal constaté (dérive d'arrondi)."""
+        before = self.totals[:len(self)].copy()
+        leaf = np.frombuffer(self.cost_type, dtype=np.int8) >= 0
+        self.totals[:len(self)][~leaf] = 0
+        reachable = np.zeros(len(self), dtype=bool)
+        stack = [ROOT]
+        while stack:
+            node = stack.pop()
+            reachable[node] = True
+            stack.extend(self.children[node])
+        self.totals[:len(self)][~reachable] = 0
+        parents = np.frombuffer(self.parent, dtype=np.int32)
+        depths = np.frombuffer(self.depth, dtype=np.int32)
+        for level in range(int(depths.max()), 0, -1):
+            nodes = np.flatnonzero((depths == level) & reachable)
+            np.add.at(self.totals, parents[nodes], self.totals[nodes])
+        return float(np.abs(self.totals[:len(self)][reachable] - before[reachable]).max(initial=0))
+
+    # ------------------------------------------------------------------
+    # Lectures
+    # ------------------------------------------------------------------
+    def node_summary(self, node: int) -> dict:
+        totals = self.totals[node]
+        summary = {
+            "node_id": node,
+            "path": self.path(node),
+            "label": self.labels[node] or "Projet",
+            "depth": self.depth[node],
+            **{f"{kind}_euro": round(float(totals[k]), 2) for k, kind in enumerate(COST_TYPES)},
+            "total_euro": round(float(totals.sum()), 2),
+        }
+        if self.cost_type[node] >= 0:
+            summary["cost_type"] = COST_TYPES[self.cost_type[node]]
+            if not math.isnan(self.quantity[node]):
+                summary["quantity"] = self.quantity[node]
+                summary["unit_price_euro"] = self.unit_price[node]
+        else:
+            summary["children"] = len(self.children[node])
+        return summary
+
+    def view(self, node: int = ROOT, max_depth: int = 1, limit: int = 200) -> List[dict]:
+        """Nœud et ses descendants jusqu'à `max_depth` niveaux, en ordre WBS (parcours en profondeur)."""
+        rows = []
+        stack = [(node, 0)]
+        while stack and len(rows) < limit:
+            current, level = stack.pop()
+            rows.append(self.node_summary(current))
+            if level < max_depth:
+                stack.extend((child, level + 1) for child in reversed(self.children[current]))
+        return rows
+
+    def breakdown(self, level: int = 1) -> Dict[str, Dict[str, float]]:
+        """Montants {type de coût: {poste: montant}} des postes de niveau `level` (lots par défaut)."""
+        nodes = [ROOT]
+        for _ in range(level):
+            nodes = [child for node in nodes for child in self.children[node]]
+        return {
+            kind: {
+                self.path_label(node): round(float(self.totals[node, k]), 2)
+                for node in nodes
+                if self.totals[node, k]
+            }
+            for k, kind in enumerate(COST_TYPES)
+        }
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : bench_gantt.py
+# @Author: Assistant
+# @Desc  : Benchmark de createGanttChart sur des DAG en couches de 10k tâches
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mcpserver"))
+
+from planning_tools import createGanttChart  # noqa: E402
+
+
+def layered_dag(num_tasks: int, width: int, fan_in: int = 3, seed: int = 42) -> list:
+    """DAG en couches : chaque tâche dépend de `fan_in` tâches de la couche précédente."""
+    rng = random.Random(seed)
+    tasks = []
+    previous_layer = []
+    for layer_start in range(0, num_tasks, width):
+        layer = []
+        for i in range(layer_start, min(layer_start + width, num_tasks)):
+            name = f"T{i}"
+            dependencies = rng.sample(previous_layer, min(fan_in, len(previous_layer)))
+            tasks.append({
+                "name": name,
+                "duration_days": rng.randint(1, 20),
+                "dependencies": dependencies,
+                "trade": rng.choice(["maçon", "électricien", "plombier", "plâtrier", "peintre"])
+            })
+            layer.append(name)
+        previous_layer = layer
+    return tasks
+
+
+if __name__ == '__main__':
+    print(f"{'tâches':>8} {'largeur':>8} {'liens':>8} {'temps (s)':>10}")
+    for width in (10, 100, 1000):
+        tasks = layered_dag(10_000, width)
+        links = sum(len(t["dependencies"]) for t in tasks)
+        t0 = time.perf_counter()
+        result = createGanttChart("Benchmark", "2025-03-03", tasks)
+        elapsed = time.perf_counter() - t0
+        assert len(result["gantt_chart"]) == len(tasks)
+        print(f"{len(tasks):>8} {width:>8} {links:>8} {elapsed:>10.3f}")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : bench_leveling.py
+# @Author: Assistant
+# @Desc  : Benchmark du lissage de ressources (SSGS) sur des instances de taille PSPLIB et de grande taille
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mcpserver"))
+
+from leveling import PRIORITY_RULES, serial_schedule  # noqa: E402
+from scheduling import CriticalPathAnalysis, TaskGraph  # noqa: E402
+
+
+def psplib_like_instance(num_jobs: int, num_resources: int = 4, strength: float = 0.3, seed: int = 1):
+    """
+    Instance aléatoire au format RCPSP de PSPLIB (J30/J60/J90/J120) : au plus 3
+    successeurs par activité, durées 1-10, demandes 0-10 sur chaque ressource,
+    capacité fixée par la force de ressource `strength` entre la demande
+    unitaire maximale et le pic du planning au plus tôt.
+    """
+    rng = random.Random(seed)
+    trades = [f"R{k + 1}" for k in range(num_resources)]
+    tasks = []
+    for i in range(num_jobs):
+        candidates = list(range(max(0, i - 15), i))
+        dependencies = [f"J{j}" for j in rng.sample(candidates, min(len(candidates), rng.randint(1, 3)))] if i >= 3 else []
+        used = rng.sample(trades, rng.randint(1, num_resources))
+        tasks.append({
+            "name": f"J{i}",
+            "duration_days": rng.randint(1, 10),
+            "dependencies": dependencies,
+            "required_resources": {trade: rng.randint(1, 10) for trade in used}
+        })
+
+    cpm = CriticalPathAnalysis(TaskGraph(tasks))
+    capacities = {}
+    for trade in trades:
+        profile = np.zeros(cpm.project_duration + 1)
+        for i, task in enumerate(tasks):
+            profile[cpm.earliest_start[i]:cpm.earliest_finish[i]] += task["required_resources"].get(trade, 0)
+        max_demand = max(t["required_resources"].get(trade, 0) for t in tasks)
+        capacities[trade] = max_demand + round(strength * (profile.max() - max_demand))
+    return tasks, capacities
+
+
+def check_schedule(graph, requirements, capacities, result):
+    """Vérifie précédences et capacités du planning lissé."""
+    start, finish = result["start"], result["finish"]
+    for i in range(len(graph)):
+        for p in graph.preds[i]:
+            assert start[i] >= finish[p], "précédence violée"
+    for trade, capacity in capacities.items():
+        assert result["peak_usage"][trade] <= capacity + 1e-9, f"capacité dépassée ({trade})"
+
+
+if __name__ == '__main__':
+    instances = [
+        ("J30", *psplib_like_instance(30)),
+        ("J60", *psplib_like_instance(60)),
+        ("J90", *psplib_like_instance(90)),
+        ("J120", *psplib_like_instance(120)),
+        ("10k x 20 métiers", *psplib_like_instance(10_000, num_resources=20)),
+    ]
+    print(f"{'instance':>18} {'règle':>15} {'CPM':>7} {'lissé':>7} {'temps (s)':>10}")
+    for label, tasks, capacities in instances:
+        graph = TaskGraph(tasks)
+        requirements = [t["required_resources"] for t in tasks]
+        for rule in PRIORITY_RULES:
+            t0 = time.perf_counter()
+            result = serial_schedule(graph, requirements, capacities, rule)
+            elapsed = time.perf_counter() - t0
+            check_schedule(graph, requirements, capacities, result)
+            print(f"{label:>18} {rule:>15} {result['cpm'].project_duration:>7} {result['makespan']:>7} {elapsed:>10.3f}")
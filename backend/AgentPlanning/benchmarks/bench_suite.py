@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : bench_suite.py
+# @Author: Assistant
+# @Desc  : Suite de benchmarks des outils de planning sur DAG synthétiques, avec référence enregistrée
+
+"""
+Mesure, pour chaque outil, forme de réseau et taille : le temps (meilleur de
+--repeat exécutions, caches de calcul vidés à chaque fois), le pic mémoire
+Python (tracemalloc, exécution séparée) et la taille du résultat JSON.
+
+    python bench_suite.py                         # tailles 10², 10³, 10⁴
+    python bench_suite.py --sizes 100 100000      # jusqu'à 10⁵
+    python bench_suite.py --update-baseline       # enregistre baselines.json
+    python bench_suite.py --check                 # code de sortie 1 si régression
+
+Une mesure est signalée en régression lorsqu'elle dépasse la référence de plus
+de --tolerance (relative) et d'un seuil absolu (10 ms, 1 Mo, 1 Ko de résultat), pour ne pas
+signaler le bruit des petites tailles.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mcpserver"))
+
+from generators import SHAPES, capacities_for  # noqa: E402
+from planning_tools import (  # noqa: E402
+    ARTIFACT_CACHE, RESULT_CACHE, buildResourceHistograms, calculate_end_date, createGanttChart, detectCriticalPath,
+    optimizeResourceAllocation
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_SIZES = (100, 1_000, 10_000)
+START_DATE = "2025-03-03"
+
+# Seuils absolus en deçà desquels un écart n'est pas une régression
+MIN_TIME_DELTA = 0.010
+MIN_MEMORY_DELTA = 1024 * 1024
+MIN_RESULT_DELTA = 1024
+
+
+def _gantt(tasks: list):
+    return createGanttChart("Benchmark", START_DATE, tasks)
+
+
+def _critical_path(tasks: list):
+    return detectCriticalPath(tasks, start_date=START_DATE)
+
+
+def _resources(tasks: list):
+    return optimizeResourceAllocation(tasks, capacities_for(tasks), START_DATE)
+
+
+def _histograms(tasks: list):
+    rates = {trade: 40 for trade in capacities_for(tasks)}
+    return buildResourceHistograms(tasks, START_DATE, hourly_rates=rates, periods=["week", "month"])
+
+
+def _end_dates(tasks: list):
+    """calculate_end_date sur un décalage par tâche (conversion jours ouvrés -> dates d'un Gantt)."""
+    start = datetime.strptime(START_DATE, "%Y-%m-%d")
+    rng = random.Random(len(tasks))
+    return [calculate_end_date(start, rng.randint(0, 5 * len(tasks) // 10 + 10)).toordinal() for _ in tasks]
+
+
+TOOLS: Dict[str, Callable[[list], object]] = {
+    "createGanttChart": _gantt,
+    "detectCriticalPath": _critical_path,
+    "optimizeResourceAllocation": _resources,
+    "buildResourceHistograms": _histograms,
+    "calculate_end_date": _end_dates,
+}
+
+
+def _clear_caches():
+    RESULT_CACHE.clear()
+    ARTIFACT_CACHE.clear()
+    gc.collect()
+
+
+def measure(tool: Callable[[list], object], tasks: list, repeat: int) -> dict:
+    """Temps (meilleur de `repeat`), pic mémoire tracemalloc et taille JSON du résultat."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        _clear_caches()
+        t0 = time.perf_counter()
+        result = tool(tasks)
+        best = min(best, time.perf_counter() - t0)
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(result["error"])
+    size = len(json.dumps(result, ensure_ascii=False, default=str).encode("utf-8"))
+
+    # Exécution séparée : tracemalloc ralentit fortement les allocations
+    _clear_caches()
+    tracemalloc.start()
+    tool(tasks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(best, 4), "peak_bytes": peak, "result_bytes": size}
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "recorded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def compare(key: str, current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Libellés des régressions de `current` par rapport à `baseline`."""
+    regressions = []
+    checks = (
+        ("seconds", MIN_TIME_DELTA, "temps"),
+        ("peak_bytes", MIN_MEMORY_DELTA, "mémoire"),
+        ("result_bytes", MIN_RESULT_DELTA, "taille du résultat")
+    )
+    for metric, min_delta, label in checks:
+        before, after = baseline.get(metric), current[metric]
+        if before is None:
+            continue
+        if after > before * (1 + tolerance) and after - before > min_delta:
+            regressions.append(f"{key} : {label} {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run(sizes, shapes, tools, repeat: int) -> Dict[str, dict]:
+    results = {}
+    print(f"{'outil':>27} {'forme':>13} {'tâches':>8} {'temps (s)':>10} {'pic (Mo)':>9} {'résultat (Ko)':>14}")
+    for size in sizes:
+        for shape in shapes:
+            tasks = SHAPES[shape](size)
+            for tool in tools:
+                metrics = measure(TOOLS[tool], tasks, repeat)
+                results[f"{tool}/{shape}/{size}"] = metrics
+                print(
+                    f"{tool:>27} {shape:>13} {size:>8} {metrics['seconds']:>10.4f} "
+                    f"{metrics['peak_bytes'] / 1e6:>9.1f} {metrics['result_bytes'] / 1e3:>14.1f}"
+                )
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks des outils de planning sur DAG synthétiques")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=list(SHAPES))
+    parser.add_argument("--tools", nargs="+", choices=sorted(TOOLS), default=list(TOOLS))
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre d'exécutions chronométrées (meilleur temps retenu)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Fichier de référence JSON")
+    parser.add_argument("--update-baseline", action="store_true", help="Enregistrer les mesures comme référence")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Écart relatif toléré avant régression")
+    parser.add_argument("--check", action="store_true", help="Code de sortie 1 en cas de régression")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.shapes, args.tools, args.repeat)
+
+    stored = {"environment": {}, "results": {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+
+    if args.update_baseline:
+        stored["environment"] = environment()
+        stored["results"].update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nRéférence enregistrée : {len(results)} mesure(s) dans {args.baseline}")
+        return 0
+
+    regressions = []
+    compared = 0
+    for key, metrics in results.items():
+        if key in stored["results"]:
+            compared += 1
+            regressions.extend(compare(key, metrics, stored["results"][key], args.tolerance))
+    print(f"\n{compared} mesure(s) comparée(s) à la référence ({stored['environment'].get('recorded_at', 'aucune')})")
+    if stored["environment"] and stored["environment"].get("cpu_count") != os.cpu_count():
+        print("Attention : référence enregistrée sur une autre machine, comparer les temps avec prudence")
+    for line in regressions:
+        print(f"⚠️ {line}")
+    if not regressions:
+        print("✅ Aucune régression")
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
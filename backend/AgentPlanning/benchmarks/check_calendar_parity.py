@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : check_calendar_parity.py
+# @Author: Assistant
+# @Desc  : Contrôle de parité entre CalendarSchedule (toutes les tâches sur un calendrier) et CriticalPathAnalysis
+
+"""
+Avec un seul calendrier pour toutes les tâches, l'analyse multi-calendrier doit
+donner exactement les dates au plus tôt, les marges totales et les marges
+libres de l'analyse CPM en jours ouvrés. Le contrôle tire des réseaux
+aléatoires (liens FS/SS/FF, décalages éventuellement négatifs, jalons) et des
+débuts de projet sur chaque jour ouvré de la semaine.
+
+    python check_calendar_parity.py                # 500 réseaux
+    python check_calendar_parity.py --graphs 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mcpserver"))
+
+from calendars import get_calendar  # noqa: E402
+from multi_calendar import CalendarSchedule  # noqa: E402
+from scheduling import CriticalPathAnalysis, TaskGraph  # noqa: E402
+
+# Premier lundi de l'horizon de test : les débuts de projet couvrent le lundi au vendredi
+FIRST_MONDAY = date(2025, 3, 3)
+
+
+def random_network(rng: random.Random, max_tasks: int = 25) -> list:
+    """Réseau aléatoire de jalons et de tâches liés par FS/SS/FF avec décalages de -1 à 2 jours."""
+    tasks = []
+    for i in range(rng.randint(2, max_tasks)):
+        dependencies = [
+            {"task": f"T{j}", "type": rng.choice(["FS", "FS", "SS", "FF"]), "lag": rng.choice([0, 0, 1, 2, -1])}
+            for j in rng.sample(range(i), min(i, rng.randint(0, 3)))
+        ]
+        tasks.append({"name": f"T{i}", "duration_days": rng.choice([0, 1, 2, 3, 5, 8]), "dependencies": dependencies})
+    return tasks
+
+
+def mismatches(tasks: list, origin: int) -> list:
+    """Tâches dont les dates ou marges diffèrent entre les deux analyses."""
+    calendar = get_calendar()
+    graph = TaskGraph(tasks)
+    reference = CriticalPathAnalysis(graph)
+    schedule = CalendarSchedule(graph, [calendar] * len(graph), origin)
+    differences = []
+    for i, name in enumerate(graph.names):
+        start = calendar.count(origin, schedule.start_ordinals[i])
+        current = (start, schedule.total_float[i], schedule.free_float[i])
+        expected = (reference.earliest_start[i], reference.total_float[i], reference.free_float[i])
+        if current != expected:
+            differences.append({"task": name, "multi_calendar": current, "cpm": expected})
+    return differences
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Parité CalendarSchedule / CriticalPathAnalysis sur un seul calendrier")
+    parser.add_argument("--graphs", type=int, default=500, help="Nombre de réseaux aléatoires")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for k in range(args.graphs):
+        rng = random.Random(args.seed + k)
+        tasks = random_network(rng)
+        origin = FIRST_MONDAY.toordinal() + k % 5
+        differences = mismatches(tasks, origin)
+        if differences:
+            failures += 1
+            if failures <= 3:
+                print(f"Réseau {k} (début {date.fromordinal(origin)}) : (début, marge totale, marge libre)")
+                for difference in differences[:5]:
+                    print(f"  {difference}")
+    print(f"{args.graphs - failures}/{args.graphs} réseau(x) identique(s)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
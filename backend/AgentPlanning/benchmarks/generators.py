@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : generators.py
+# @Author: Assistant
+# @Desc  : Générateurs de réseaux de tâches synthétiques (chaînes, couches, losanges, DAG aléatoires, chantiers)
+
+import random
+from typing import Callable, Dict, List
+
+TRADES = ["maçon", "électricien", "plombier", "plâtrier", "peintre", "charpentier", "couvreur", "carreleur"]
+
+
+def _task(name: str, duration: int, dependencies: list, trade: str, crew: int = 1) -> dict:
+    return {
+        "name": name,
+        "duration_days": duration,
+        "dependencies": dependencies,
+        "trade": trade,
+        "required_resources": {trade: crew}
+    }
+
+
+def chain(num_tasks: int, seed: int = 42) -> list:
+    """
+    Chaîne unique : chaque tâche dépend de la précédente (profondeur maximale, tout est critique).
+    Durées courtes pour que 10⁵ tâches restent dans l'horizon des dates du calendrier.
+    """
+    rng = random.Random(seed)
+    return [
+        _task(f"T{i}", rng.randint(1, 3), [f"T{i - 1}"] if i else [], rng.choice(TRADES))
+        for i in range(num_tasks)
+    ]
+
+
+def wide_layers(num_tasks: int, seed: int = 42, width: int = 1000, fan_in: int = 3) -> list:
+    """Couches larges : chaque tâche dépend de `fan_in` tâches de la couche précédente."""
+    rng = random.Random(seed)
+    tasks = []
+    previous = []
+    for layer_start in range(0, num_tasks, width):
+        layer = []
+        for i in range(layer_start, min(layer_start + width, num_tasks)):
+            dependencies = rng.sample(previous, min(fan_in, len(previous)))
+            tasks.append(_task(f"T{i}", rng.randint(1, 20), dependencies, rng.choice(TRADES)))
+            layer.append(f"T{i}")
+        previous = layer
+    return tasks
+
+
+def diamonds(num_tasks: int, seed: int = 42, branches: int = 8) -> list:
+    """
+    Suite de losanges : une tâche d'ouverture, `branches` tâches parallèles, une tâche
+    de fermeture qui attend toutes les branches, et ainsi de suite.
+    """
+    rng = random.Random(seed)
+    tasks = []
+    join = None
+    i = 0
+    while i < num_tasks:
+        fork = f"T{i}"
+        tasks.append(_task(fork, rng.randint(1, 5), [join] if join else [], rng.choice(TRADES)))
+        i += 1
+        parallel = []
+        for _ in range(branches):
+            if i >= num_tasks:
+                break
+            tasks.append(_task(f"T{i}", rng.randint(1, 15), [fork], rng.choice(TRADES)))
+            parallel.append(f"T{i}")
+            i += 1
+        if i >= num_tasks:
+            break
+        join = f"T{i}"
+        tasks.append(_task(join, rng.randint(1, 5), parallel or [fork], rng.choice(TRADES)))
+        i += 1
+    return tasks
+
+
+def random_dag(num_tasks: int, seed: int = 42, max_fan_in: int = 4, reach: int = 200) -> list:
+    """DAG aléatoire : chaque tâche dépend de 0 à `max_fan_in` tâches parmi les `reach` précédentes."""
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(num_tasks):
+        candidates = range(max(0, i - reach), i)
+        count = min(len(candidates), rng.randint(0, max_fan_in))
+        dependencies = [f"T{j}" for j in rng.sample(candidates, count)]
+        tasks.append(_task(f"T{i}", rng.randint(1, 10), dependencies, rng.choice(TRADES), rng.randint(1, 3)))
+    return tasks
+
+
+def construction_network(num_tasks: int, seed: int = 42) -> list:
+    """
+    Réseau de forme « chantier » : des bâtiments de plusieurs niveaux, chacun avec
+    terrassement, fondations, gros œuvre niveau par niveau, charpente et couverture,
+    puis les lots de second œuvre par niveau enchaînés en début-début décalé
+    (électricité -> plomberie -> plâtrerie -> carrelage -> peinture) et une réception.
+    Les bâtiments successifs partagent les équipes de gros œuvre (fin-début décalé).
+    """
+    rng = random.Random(seed)
+    finishing = [("Électricité", "électricien"), ("Plomberie", "plombier"), ("Plâtrerie", "plâtrier"),
+                 ("Carrelage", "carreleur"), ("Peinture", "peintre")]
+    tasks: List[dict] = []
+    previous_shell = None
+    building = 0
+    while len(tasks) < num_tasks:
+        b = f"B{building}"
+        floors = rng.randint(2, 8)
+        earthwork = f"{b} Terrassement"
+        tasks.append(_task(earthwork, rng.randint(3, 10), [], "maçon", 2))
+        foundations = f"{b} Fondations"
+        tasks.append(_task(foundations, rng.randint(5, 15), [earthwork], "maçon", 3))
+        structure = foundations
+        floor_shells = []
+        for f in range(floors):
+            shell = f"{b} Gros œuvre N{f}"
+            dependencies = [structure]
+            if previous_shell and f == 0:
+                dependencies.append({"task": previous_shell, "type": "FS", "lag": 2})
+            tasks.append(_task(shell, rng.randint(8, 20), dependencies, "maçon", 4))
+            floor_shells.append(shell)
+            structure = shell
+        previous_shell = structure
+        roof = f"{b} Charpente"
+        tasks.append(_task(roof, rng.randint(5, 10), [structure], "charpentier", 2))
+        cover = f"{b} Couverture"
+        tasks.append(_task(cover, rng.randint(4, 8), [roof], "couvreur", 2))
+        last_lots = []
+        for f, shell in enumerate(floor_shells):
+            previous_lot = None
+            for label, trade in finishing:
+                lot = f"{b} {label} N{f}"
+                dependencies = [shell, cover] if previous_lot is None else [
+                    {"task": previous_lot, "type": "SS", "lag": rng.randint(2, 5)},
+                    {"task": previous_lot, "type": "FF", "lag": 1}
+                ]
+                tasks.append(_task(lot, rng.randint(3, 12), dependencies, trade, rng.randint(1, 3)))
+                previous_lot = lot
+            last_lots.append(previous_lot)
+        tasks.append(_task(f"{b} Réception", 2, last_lots, "maçon"))
+        building += 1
+    return _trim(tasks, num_tasks)
+
+
+def _trim(tasks: list, num_tasks: int) -> list:
+    """Tronque à `num_tasks` tâches en retirant les dépendances vers les tâches supprimées."""
+    kept = tasks[:num_tasks]
+    names = {task["name"] for task in kept}
+    for task in kept:
+        task["dependencies"] = [
+            dep for dep in task["dependencies"]
+            if (dep if isinstance(dep, str) else dep["task"]) in names
+        ]
+    return kept
+
+
+SHAPES: Dict[str, Callable[..., list]] = {
+    "chain": chain,
+    "wide_layers": wide_layers,
+    "diamonds": diamonds,
+    "random_dag": random_dag,
+    "construction": construction_network,
+}
+
+
+def capacities_for(tasks: list, crew: float = 6) -> Dict[str, float]:
+    """Effectifs disponibles par corps de métier : `crew`, relevé à la plus forte demande unitaire."""
+    capacities: Dict[str, float] = {}
+    for task in tasks:
+        for trade, count in task.get("required_resources", {}).items():
+            capacities[trade] = max(capacities.get(trade, crew), count)
+    return capacities
@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : calendars.py
+# @Author: Assistant
+# @Desc  : Calendriers de jours ouvrés en bitsets (décalages et écarts par cumul de popcount) pour le planning BTP
+
+import math
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def easter_sunday(year: int) -> date:
+    """Date du dimanche de Pâques (algorithme de Meeus/Jones/Butcher)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def french_public_holidays(year: int) -> List[date]:
+    """Jours fériés légaux en France métropolitaine."""
+    easter = easter_sunday(year)
+    return [
+        date(year, 1, 1),                # Jour de l'an
+        easter + timedelta(days=1),      # Lundi de Pâques
+        date(year, 5, 1),                # Fête du travail
+        date(year, 5, 8),                # Victoire 1945
+        easter + timedelta(days=39),     # Ascension
+        easter + timedelta(days=50),     # Lundi de Pentecôte
+        date(year, 7, 14),               # Fête nationale
+        date(year, 8, 15),               # Assomption
+        date(year, 11, 1),               # Toussaint
+        date(year, 11, 11),              # Armistice
+        date(year, 12, 25),              # Noël
+    ]
+
+
+def august_shutdown(year: int) -> List[date]:
+    """Fermeture estivale des chantiers : trois semaines à partir du premier lundi d'août."""
+    first = date(year, 8, 1)
+    first_monday = first + timedelta(days=(7 - first.weekday()) % 7)
+    return [first_monday + timedelta(days=k) for k in range(21)]
+
+
+# Jeux de jours non travaillés disponibles par nom (un générateur par année)
+HOLIDAY_SETS: Dict[str, Callable[[int], List[date]]] = {
+    "jours_feries_fr": french_public_holidays,
+    "conges_aout_btp": august_shutdown,
+}
+
+
+# Calendriers nommés prédéfinis : semaine de travail du lundi au dimanche
+CALENDAR_PRESETS: Dict[str, str] = {
+    "standard": "1111100",
+    "samedi": "1111110",
+    "continu": "1111111",
+}
+DEFAULT_CALENDAR = "standard"
+
+# Tables d'octets : nombre de bits à 1, masque des bits 0..j inclus, position du r-ième bit à 1
+_POPCOUNT_TABLE = np.array([bin(b).count("1") for b in range(256)], dtype=np.int32)
+_POPCOUNT = _POPCOUNT_TABLE.tolist()
+_UPTO = [(2 << j) - 1 for j in range(8)]
+_SELECT = [tuple(j for j in range(8) if b >> j & 1) for b in range(256)]
+
+
+class _WorkingBitset:
+    """
+    Jours ouvrés d'un horizon, un bit par jour (np.packbits, bit j de l'octet b = jour 8b + j),
+    avec le nombre cumulé de jours ouvrés avant chaque octet (int32) et l'octet de
+    chaque 8e jour ouvré : rang = cumul + popcount de l'octet masqué ; k-ième jour
+    ouvré = octet indiqué pour k // 8, quelques pas en avant sur les cumuls, puis
+    table de sélection dans l'octet. Environ 8 bits par jour au lieu de 17 octets.
+
+    Les tableaux sont gardés en `bytes` / `array('i')` : les lectures unitaires des
+    passes de planification y sont bien plus rapides que sur des scalaires NumPy.
+    """
+
+    __slots__ = ("origin", "size", "bits", "before", "hint")
+
+    def __init__(self, origin: int, working: np.ndarray):
+        packed = np.packbits(working, bitorder="little")
+        before = np.zeros(len(packed), dtype=np.int32)
+        np.cumsum(_POPCOUNT_TABLE[packed[:-1]], out=before[1:])
+        self.origin = origin
+        self.size = len(working)
+        self.bits = packed.tobytes()
+        self.before = array("i", before.tobytes())
+        self.hint = array("i", (np.flatnonzero(working)[::8] >> 3).astype(np.int32).tobytes())
+
+    def covers(self, lo: int, hi: int) -> bool:
+        return self.origin <= lo and hi < self.origin + self.size
+
+    def working(self, i: int) -> int:
+        return self.bits[i >> 3] >> (i & 7) & 1
+
+    def select(self, k: int) -> int:
+        """Ordinal du (k+1)-ième jour ouvré de l'horizon."""
+        before = self.before
+        b = self.hint[k >> 3]
+        last = len(before) - 1
+        while b < last and before[b + 1] <= k:
+            b += 1
+        return self.origin + 8 * b + _SELECT[self.bits[b]][k - before[b]]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits) + self.before.itemsize * len(self.before) + self.hint.itemsize * len(self.hint)
+
+
+def _to_ordinal(value) -> int:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, datetime):
+        return value.toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return datetime.strptime(value, "%Y-%m-%d").toordinal()
+
+
+class WorkingCalendar:
+    """
+    Calendrier de jours ouvrés précalculé sur un horizon glissant.
+
+    Les jours ouvrés sont rangés en bitset (`_WorkingBitset`) : le rang d'un
+    jour (jours ouvrés cumulés) est un cumul par octet plus un popcount, et le
+    k-ième jour ouvré se retrouve par un index d'octets creux. Les décalages
+    (`offset`) et écarts (`count`) coûtent ainsi quelques lectures de tableau,
+    avec une empreinte mémoire assez faible pour tenir un calendrier par corps
+    de métier. L'horizon est étendu automatiquement (par années entières)
+    quand une requête en sort.
+
+    `weekmask` (lundi -> dimanche) fixe la semaine travaillée ; `closures` liste
+    des périodes d'arrêt [début, fin] incluses (intempéries, gel...).
+    """
+
+    def __init__(
+        self,
+        holiday_sets: Iterable[str] = (),
+        holidays: Iterable = (),
+        weekmask: str = "1111100",
+        closures: Iterable[Tuple] = ()
+    ):
+        self.holiday_sets = tuple(holiday_sets)
+        for name in self.holiday_sets:
+            if name not in HOLIDAY_SETS:
+                raise ValueError(
+                    f"Jeu de jours fériés inconnu : '{name}' (disponibles : {', '.join(HOLIDAY_SETS)})"
+                )
+        if len(weekmask) != 7 or set(weekmask) - {"0", "1"} or "1" not in weekmask:
+            raise ValueError("weekmask doit contenir 7 caractères '0'/'1' (lundi à dimanche) dont au moins un '1'")
+
+        self.weekmask = np.array([c == "1" for c in weekmask], dtype=bool)
+        self.extra_holidays = frozenset(_to_ordinal(h) for h in holidays)
+        self.closures = tuple(sorted((_to_ordinal(a), _to_ordinal(b)) for a, b in closures))
+        for a, b in self.closures:
+            if b < a:
+                raise ValueError("Période d'arrêt invalide : la fin précède le début")
+        self._closed_days = sum(b - a + 1 for a, b in self.closures)
+        self._lock = threading.Lock()
+        # Remplacé d'un bloc lors d'une extension de l'horizon
+        self._tables: Optional[_WorkingBitset] = None
+
+    # ------------------------------------------------------------------
+    # Construction de l'horizon
+    # ------------------------------------------------------------------
+    def _build(self, first_year: int, last_year: int) -> _WorkingBitset:
+        origin = date(first_year, 1, 1).toordinal()
+        end = date(last_year + 1, 1, 1).toordinal()
+        ordinals = np.arange(origin, end, dtype=np.int64)
+
+        # date.fromordinal(1) est un lundi
+        working = self.weekmask[(ordinals - 1) % 7]
+
+        closed = set(o for o in self.extra_holidays if origin <= o < end)
+        for name in self.holiday_sets:
+            rule = HOLIDAY_SETS[name]
+            for year in range(first_year, last_year + 1):
+                closed.update(d.toordinal() for d in rule(year))
+        if closed:
+            closed_idx = np.fromiter((o - origin for o in closed if origin <= o < end), dtype=np.int64)
+            working[closed_idx] = False
+        for a, b in self.closures:
+            a, b = max(a, origin), min(b, end - 1)
+            if a <= b:
+                working[a - origin:b - origin + 1] = False
+
+        return _WorkingBitset(origin, working)
+
+    def _tables_for(self, lo: int, hi: int) -> _WorkingBitset:
+        """Bitset couvrant au moins les ordinaux [lo, hi] (avec marge)."""
+        tables = self._tables
+        if tables is not None and tables.covers(lo, hi):
+            return tables
+
+        with self._lock:
+            tables = self._tables
+            first_year = date.fromordinal(lo).year - 1
+            last_year = date.fromordinal(hi).year + 5
+            if tables is not None:
+                if tables.covers(lo, hi):
+                    return tables
+                first_year = min(first_year, date.fromordinal(tables.origin).year)
+                last_year = max(last_year, date.fromordinal(tables.origin + tables.size - 1).year)
+            tables = self._build(first_year, last_year)
+            self._tables = tables
+            return tables
+
+    # ------------------------------------------------------------------
+    # Requêtes
+    # ------------------------------------------------------------------
+    def is_working_day(self, day) -> bool:
+        o = _to_ordinal(day)
+        tables = self._tables_for(o, o)
+        return bool(tables.working(o - tables.origin))
+
+    def offset_ordinal(self, start: int, n: int) -> int:
+        """Ordinal du n-ième jour ouvré strictement après `start` (avant si n < 0)."""
+        if n.__class__ is not int:
+            n = math.ceil(n)
+        if n == 0:
+            return start
+        # Marge large : au moins un jour ouvré par semaine sur l'horizon, plus les périodes d'arrêt
+        span = abs(n) * 7 + 7 + self._closed_days
+        lo, hi = (start, start + span) if n > 0 else (start - span, start)
+        tables = self._tables
+        if tables is None or not tables.covers(lo, hi):
+            tables = self._tables_for(lo, hi)
+        # Rang de `start` (inclus) lu en ligne : chemin le plus sollicité des passes de planification
+        i = start - tables.origin
+        byte = tables.bits[i >> 3]
+        k = tables.before[i >> 3] + _POPCOUNT[byte & _UPTO[i & 7]]
+        return tables.select(k + n - 1 if n > 0 else k - (byte >> (i & 7) & 1) + n)
+
+    def next_working_ordinal(self, day: int) -> int:
+        """Premier jour ouvré à partir de `day` inclus."""
+        tables = self._tables_for(day, day)
+        return day if tables.working(day - tables.origin) else self.offset_ordinal(day, 1)
+
+    def previous_working_ordinal(self, day: int) -> int:
+        """Dernier jour ouvré jusqu'à `day` inclus."""
+        tables = self._tables_for(day, day)
+        return day if tables.working(day - tables.origin) else self.offset_ordinal(day, -1)
+
+    def offset(self, start: datetime, n: int) -> datetime:
+        """Date du n-ième jour ouvré après `start` ; `start` est renvoyée si n == 0."""
+        if n == 0:
+            return start
+        return datetime.fromordinal(self.offset_ordinal(start.toordinal(), n))
+
+    def count(self, start, end) -> int:
+        """Nombre de jours ouvrés dans l'intervalle ]start, end] (négatif si end < start)."""
+        a, b = _to_ordinal(start), _to_ordinal(end)
+        tables = self._tables_for(min(a, b), max(a, b))
+        bits, before = tables.bits, tables.before
+        a -= tables.origin
+        b -= tables.origin
+        return (
+            before[b >> 3] + _POPCOUNT[bits[b >> 3] & _UPTO[b & 7]]
+            - before[a >> 3] - _POPCOUNT[bits[a >> 3] & _UPTO[a & 7]]
+        )
+
+    def working_mask(self, start: int, end: int) -> np.ndarray:
+        """Masque booléen des jours ouvrés des ordinaux [start, end[ (dépliage du bitset)."""
+        if end <= start:
+            return np.zeros(0, dtype=bool)
+        tables = self._tables_for(start, end - 1)
+        lo, hi = start - tables.origin, end - tables.origin
+        packed = np.frombuffer(tables.bits, dtype=np.uint8, offset=lo >> 3, count=((hi - 1) >> 3) - (lo >> 3) + 1)
+        skip = lo & 7
+        return np.unpackbits(packed, bitorder="little")[skip:skip + hi - lo].astype(bool)
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._tables.nbytes if self._tables is not None else 0
+
+
+# Calendriers partagés, les moins récemment utilisés évincés au-delà de CALENDAR_CACHE_SIZE :
+# chaque liste de jours fériés distincte en crée un, avec son bitset
+CALENDAR_CACHE_SIZE = 64
+_CALENDARS: "OrderedDict[Tuple, WorkingCalendar]" = OrderedDict()
+_CALENDARS_LOCK = threading.Lock()
+
+
+def get_calendar(
+    holiday_sets: Iterable[str] = (),
+    holidays: Iterable = (),
+    weekmask: str = "1111100",
+    closures: Iterable[Tuple] = ()
+) -> WorkingCalendar:
+    """Calendrier partagé (cache LRU) pour une combinaison de jeux de jours fériés, semaine et arrêts."""
+    key = (
+        tuple(sorted(set(holiday_sets))),
+        frozenset(_to_ordinal(h) for h in holidays),
+        weekmask,
+        tuple(sorted((_to_ordinal(a), _to_ordinal(b)) for a, b in closures))
+    )
+    with _CALENDARS_LOCK:
+        calendar = _CALENDARS.get(key)
+        if calendar is not None:
+            _CALENDARS.move_to_end(key)
+            return calendar
+        calendar = WorkingCalendar(*key)
+        _CALENDARS[key] = calendar
+        if len(_CALENDARS) > CALENDAR_CACHE_SIZE:
+            _CALENDARS.popitem(last=False)
+    return calendar
+
+
+def _closure(period) -> Tuple:
+    if isinstance(period, dict):
+        if "start" not in period or "end" not in period:
+            raise ValueError(f"Période d'arrêt invalide : {period!r} (attendu : {{start, end}})")
+        return period["start"], period["end"]
+    start, end = period
+    return start, end
+
+
+def named_calendars(
+    definitions: Optional[Dict[str, dict]],
+    holiday_sets: Iterable[str] = (),
+    holidays: Iterable = ()
+) -> Dict[str, WorkingCalendar]:
+    """
+    Calendriers nommés d'un projet : les préréglages de CALENDAR_PRESETS, puis les
+    définitions {nom: {base | weekmask, holiday_sets, holidays, closures: [{start, end}]}}.
+    Les jours fériés du projet s'appliquent à tous les calendriers ; `holiday_sets`
+    d'une définition les remplace, ses `holidays` s'y ajoutent.
+    """
+    holiday_sets = list(holiday_sets)
+    holidays = list(holidays)
+    calendars = {
+        name: get_calendar(holiday_sets, holidays, weekmask)
+        for name, weekmask in CALENDAR_PRESETS.items()
+    }
+    for name, definition in (definitions or {}).items():
+        if not isinstance(definition, dict):
+            raise ValueError(f"Définition de calendrier invalide pour '{name}'")
+        base = definition.get("base", DEFAULT_CALENDAR)
+        if base not in CALENDAR_PRESETS:
+            raise ValueError(f"Calendrier de base inconnu : '{base}' (disponibles : {', '.join(CALENDAR_PRESETS)})")
+        calendars[name] = get_calendar(
+            definition.get("holiday_sets", holiday_sets),
+            holidays + list(definition.get("holidays", [])),
+            definition.get("weekmask", CALENDAR_PRESETS[base]),
+            [_closure(period) for period in definition.get("closures", [])]
+        )
+    return calendars
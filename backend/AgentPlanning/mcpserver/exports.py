@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : exports.py
+# @Author: Assistant
+# @Desc  : Export en colonnes (Arrow IPC / Parquet) des plannings, analyses CPM et profils de ressources
+
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+EXPORT_FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+EXPORT_CONTENTS = ("schedule", "resources", "histogram")
+
+# Colonnes texte à forte répétition, encodées en dictionnaire (codes entiers + table des libellés)
+DICTIONARY_COLUMNS = ("trade", "calendar", "priority")
+
+# Jours depuis l'époque NumPy (1970-01-01) -> ordinal Python
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+def load_pyarrow():
+    """pyarrow est une dépendance optionnelle : chargée au premier export seulement."""
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ValueError("Export Arrow/Parquet indisponible : installer pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def ordinal_dates(ordinals) -> np.ndarray:
+    """Ordinaux Python -> datetime64[D] (colonne date32 côté Arrow)."""
+    return (np.asarray(ordinals, dtype=np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def schedule_columns(graph, cpm, calendar=None, origin: Optional[int] = None, calendar_names=None) -> Dict:
+    """
+    Une ligne par tâche : durée, dates au plus tôt / au plus tard (en jours depuis le début,
+    et en dates si `origin` est fourni), marges, criticité et prédécesseurs (index de tâches).
+    """
+    n = len(graph)
+    columns = {
+        "task_index": np.arange(n, dtype=np.int32),
+        "task_name": list(graph.names),
+        "trade": [task.get("trade") or "Non spécifié" for task in graph.tasks],
+        "duration_days": np.asarray(graph.durations, dtype=np.float64),
+    }
+    for field in ("earliest_start", "earliest_finish", "latest_start", "latest_finish"):
+        columns[field] = np.asarray(getattr(cpm, field), dtype=np.float64)
+    columns["total_float_days"] = np.asarray(cpm.total_float, dtype=np.float64)
+    columns["free_float_days"] = np.asarray(cpm.free_float, dtype=np.float64)
+    columns["is_critical"] = np.array([cpm.is_critical(i) for i in range(n)], dtype=bool)
+    columns["predecessors"] = [list(preds) for preds in graph.preds]
+    if calendar_names is not None:
+        columns["calendar"] = list(calendar_names)
+    if origin is not None:
+        for field, label in (("earliest_start", "start_date"), ("earliest_finish", "end_date"),
+                             ("latest_start", "latest_start_date"), ("latest_finish", "latest_finish_date")):
+            columns[label] = ordinal_dates([calendar.offset_ordinal(origin, day) for day in getattr(cpm, field)])
+    return columns
+
+
+def profile_columns(profile, capacities: Optional[Dict[str, float]] = None) -> Dict:
+    """Profil de charge en format long : un segment constant par (intervalle, corps de métier)."""
+    capacities = capacities or {}
+    starts, ends, trades, usage = [], [], [], []
+    for trade in profile.trades:
+        for start, end, value in profile.trade_intervals(trade):
+            starts.append(start)
+            ends.append(end)
+            trades.append(trade)
+            usage.append(value)
+    usage = np.asarray(usage, dtype=np.float64)
+    available = np.array([capacities.get(trade, np.nan) for trade in trades], dtype=np.float64)
+    return {
+        "start_date": ordinal_dates(starts),
+        "end_date": ordinal_dates(ends),
+        "days": np.asarray(ends, dtype=np.int32) - np.asarray(starts, dtype=np.int32),
+        "trade": trades,
+        "usage": usage,
+        "available": available,
+        "overflow": np.where(usage > available, usage - available, 0.0),
+    }
+
+
+def histogram_columns(histogram) -> Dict:
+    """Charge et coût journaliers en format long (date, corps de métier), jours sans charge ni coût omis."""
+    trade_ids, day_ids = np.nonzero((histogram.labor != 0) | (histogram.cost != 0))
+    return {
+        "date": ordinal_dates(histogram.days[day_ids]),
+        "trade": [histogram.trades[k] for k in trade_ids.tolist()],
+        "workers": histogram.labor[trade_ids, day_ids],
+        "cost": histogram.cost[trade_ids, day_ids],
+    }
+
+
+def _arrow_column(pa, name: str, values):
+    if isinstance(values, np.ndarray):
+        return pa.array(values)
+    if values and isinstance(values[0], list):
+        return pa.array(values, type=pa.list_(pa.int32()))
+    array = pa.array(values, type=pa.string())
+    return array.dictionary_encode() if name in DICTIONARY_COLUMNS else array
+
+
+def write_table(path: str, columns: Dict[str, Sequence], file_format: str, metadata: Optional[dict] = None) -> List[dict]:
+    """
+    Écrit les colonnes dans un fichier Arrow IPC (non compressé, lisible par memory-map
+    sans copie) ou Parquet (compressé zstd), via un fichier temporaire renommé.
+
+    :return: schéma écrit [{name, type}]
+    """
+    pa = load_pyarrow()
+    table = pa.table(
+        {name: _arrow_column(pa, name, values) for name, values in columns.items()},
+        metadata={key: str(value) for key, value in (metadata or {}).items()}
+    )
+    tmp = path + ".tmp"
+    if file_format == "arrow":
+        with pa.OSFile(tmp, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+    return [{"name": field.name, "type": str(field.type)} for field in table.schema]
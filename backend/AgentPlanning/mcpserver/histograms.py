@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : histograms.py
+# @Author: Assistant
+# @Desc  : Histogrammes de charge et courbes en S de coût par corps de métier (tableaux de différences NumPy)
+
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from calendars import WorkingCalendar
+
+PERIODS = ("day", "week", "month")
+UNSPECIFIED_TRADE = "Non spécifié"
+
+# Jours depuis l'époque NumPy (1970-01-01) -> ordinal Python
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+class LoadingHistogram:
+    """
+    Charge journalière (ouvriers présents) et coût journalier par corps de métier.
+
+    Chaque couple (tâche, corps de métier) ajoute son effectif au début de la tâche
+    et le retire à sa fin dans un tableau de différences par ligne (corps de métier,
+    calendrier) ; une somme cumulée donne l'effectif présent chaque jour, multiplié
+    ensuite par le masque des jours ouvrés du calendrier de la ligne. Les coûts
+    suivent le même chemin : main-d'œuvre (effectif × heures × taux horaire) et
+    coût direct de la tâche (`cost`) réparti sur ses jours travaillés.
+
+    Les jours sont des ordinaux ; une tâche occupe [start, end[. Le coût est
+    O(n + corps de métier × calendriers × jours), quelle que soit la durée des tâches.
+    """
+
+    def __init__(
+        self,
+        tasks: list,
+        starts: Sequence[int],
+        ends: Sequence[int],
+        task_calendars: Sequence[WorkingCalendar],
+        hourly_rates: Optional[Dict[str, float]] = None,
+        hours_per_day: float = 8
+    ):
+        hourly_rates = hourly_rates or {}
+        n = len(tasks)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.maximum(np.asarray(ends, dtype=np.int64), starts)
+        self.horizon_start = int(starts.min()) if n else 0
+        # Les jalons (start == end) restent dans l'horizon pour y imputer leur coût
+        self.horizon_end = max(int(ends.max()) if n else 0, int(starts.max()) + 1 if n else 0, self.horizon_start + 1)
+        lo, days = self.horizon_start, self.horizon_end - self.horizon_start
+
+        # Calendriers distincts (objets partagés par get_calendar) et masques de jours ouvrés
+        calendar_index: Dict[int, int] = {}
+        unique_calendars: List[WorkingCalendar] = []
+        cal_code = np.empty(n, dtype=np.int64)
+        for i, cal in enumerate(task_calendars):
+            code = calendar_index.get(id(cal))
+            if code is None:
+                code = calendar_index[id(cal)] = len(unique_calendars)
+                unique_calendars.append(cal)
+            cal_code[i] = code
+        masks = np.array([cal.working_mask(lo, lo + days) for cal in unique_calendars], dtype=np.float64)
+        masks = masks.reshape(len(unique_calendars), days)
+        cumulative = np.zeros((len(unique_calendars), days + 1), dtype=np.int64)
+        np.cumsum(masks, axis=1, out=cumulative[:, 1:])
+        worked_days = cumulative[cal_code, ends - lo] - cumulative[cal_code, starts - lo]
+
+        # Couples (tâche, corps de métier) à plat
+        self.trades: List[str] = []
+        trade_index: Dict[str, int] = {}
+
+        def code_of(trade: str) -> int:
+            k = trade_index.get(trade)
+            if k is None:
+                k = trade_index[trade] = len(self.trades)
+                self.trades.append(trade)
+            return k
+
+        pair_task, pair_trade, pair_count = [], [], []
+        direct_trade = np.empty(n, dtype=np.int64)
+        direct_cost = np.zeros(n, dtype=np.float64)
+        for i, task in enumerate(tasks):
+            for trade, count in (task.get("required_resources") or {}).items():
+                if count:
+                    pair_task.append(i)
+                    pair_trade.append(code_of(trade))
+                    pair_count.append(count)
+            direct_trade[i] = code_of(task.get("trade") or UNSPECIFIED_TRADE)
+            direct_cost[i] = task.get("cost") or 0
+        pair_task = np.array(pair_task, dtype=np.int64)
+        pair_trade = np.array(pair_trade, dtype=np.int64)
+        pair_count = np.array(pair_count, dtype=np.float64)
+        rates = np.array([hourly_rates.get(trade, 0) for trade in self.trades], dtype=np.float64)
+        if np.any(direct_cost < 0) or np.any(pair_count < 0):
+            raise ValueError("Les effectifs et coûts des tâches doivent être positifs")
+
+        trades, calendars = len(self.trades), len(unique_calendars)
+
+        def spread(row_trade, row_task, weights) -> np.ndarray:
+            """Somme par (corps de métier, jour) de `weights` appliqués sur [start, end[ de chaque tâche."""
+            rows = row_trade * calendars + cal_code[row_task]
+            size = trades * calendars * (days + 1)
+            flat = rows * (days + 1)
+            diff = (
+                np.bincount(flat + (starts[row_task] - lo), weights=weights, minlength=size)
+                - np.bincount(flat + (ends[row_task] - lo), weights=weights, minlength=size)
+            )
+            active = np.cumsum(diff.reshape(trades * calendars, days + 1)[:, :days], axis=1, dtype=np.float64)
+            active *= np.tile(masks, (trades, 1))
+            return active.reshape(trades, calendars, days).sum(axis=1)
+
+        self.labor = spread(pair_trade, pair_task, pair_count)
+        self.cost = spread(pair_trade, pair_task, pair_count * hours_per_day * rates[pair_trade])
+
+        # Coût direct : réparti sur les jours travaillés, ou imputé au premier jour (jalon, tâche sans jour ouvré)
+        spread_ids = np.flatnonzero((direct_cost > 0) & (worked_days > 0))
+        self.cost += spread(direct_trade[spread_ids], spread_ids, direct_cost[spread_ids] / worked_days[spread_ids])
+        lump_ids = np.flatnonzero((direct_cost > 0) & (worked_days == 0))
+        np.add.at(self.cost, (direct_trade[lump_ids], starts[lump_ids] - lo), direct_cost[lump_ids])
+
+        # Arrondi des cumuls flottants (les effectifs saisis sont des entiers ou des demi-journées)
+        self.labor = np.round(self.labor, 9)
+        self.days = np.arange(lo, lo + days, dtype=np.int64)
+
+    def period_bounds(self, period: str) -> np.ndarray:
+        """Index du premier jour de chaque période (semaines du lundi, mois civils)."""
+        if period == "day":
+            return np.arange(len(self.days))
+        if period == "week":
+            keys = (self.days - 1) // 7
+        elif period == "month":
+            keys = (self.days - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        else:
+            raise ValueError(f"Période inconnue : '{period}' (disponibles : {', '.join(PERIODS)})")
+        return np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+
+    def rollup(self, period: str) -> dict:
+        """Charge (homme-jours), effectif de pointe et coût par période et corps de métier, avec la courbe en S."""
+        bounds = self.period_bounds(period)
+        labor = np.add.reduceat(self.labor, bounds, axis=1)
+        peak = np.maximum.reduceat(self.labor, bounds, axis=1)
+        cost = np.add.reduceat(self.cost, bounds, axis=1)
+        daily_total = self.labor.sum(axis=0)
+        cost_total = cost.sum(axis=0)
+        cumulative = np.cumsum(cost_total)
+        grand_total = cumulative[-1] if len(cumulative) else 0
+        starts = self.days[bounds]
+        return {
+            "period_start": [datetime.fromordinal(int(day)).strftime("%Y-%m-%d") for day in starts],
+            "label": self._labels(period, starts),
+            "labor_man_days": self._by_trade(labor),
+            "labor_total": np.round(labor.sum(axis=0), 2).tolist(),
+            "peak_workers": self._by_trade(peak),
+            "peak_workers_total": np.round(np.maximum.reduceat(daily_total, bounds), 2).tolist(),
+            "cost": self._by_trade(cost),
+            "cost_total": np.round(cost_total, 2).tolist(),
+            "cumulative_cost": np.round(cumulative, 2).tolist(),
+            "cumulative_percent": (
+                np.round(cumulative / grand_total * 100, 1).tolist() if grand_total > 0 else [0.0] * len(bounds)
+            ),
+        }
+
+    def _by_trade(self, matrix: np.ndarray) -> Dict[str, list]:
+        rounded = np.round(matrix, 2)
+        return {trade: rounded[k].tolist() for k, trade in enumerate(self.trades) if matrix[k].any()}
+
+    @staticmethod
+    def _labels(period: str, starts: np.ndarray) -> List[str]:
+        if period == "week":
+            labels = []
+            for day in starts.tolist():
+                year, week, _ = datetime.fromordinal(day).isocalendar()
+                labels.append(f"{year}-S{week:02d}")
+            return labels
+        if period == "month":
+            return [datetime.fromordinal(day).strftime("%Y-%m") for day in starts.tolist()]
+        return [datetime.fromordinal(day).strftime("%Y-%m-%d") for day in starts.tolist()]
+
+    def trade_summary(self, hours_per_day: float = 8) -> List[dict]:
+        """Totaux par corps de métier, par coût décroissant."""
+        labor = self.labor.sum(axis=1)
+        cost = self.cost.sum(axis=1)
+        total_cost = cost.sum()
+        summary = [
+            {
+                "trade": trade,
+                "labor_man_days": round(float(labor[k]), 2),
+                "labor_hours": round(float(labor[k]) * hours_per_day, 1),
+                "peak_workers": round(float(self.labor[k].max(initial=0)), 2),
+                "cost": round(float(cost[k]), 2),
+                "cost_share_percent": round(float(cost[k] / total_cost * 100), 1) if total_cost > 0 else 0.0
+            }
+            for k, trade in enumerate(self.trades)
+            if labor[k] > 0 or cost[k] > 0
+        ]
+        summary.sort(key=lambda row: (-row["cost"], -row["labor_man_days"]))
+        return summary
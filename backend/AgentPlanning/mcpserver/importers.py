@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : importers.py
+# @Author: Assistant
+# @Desc  : Import en flux de plannings MS Project XML (MSPDI) et Primavera XER vers le format des outils
+
+import re
+import sys
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+IMPORT_FORMATS = ("mspdi", "xer")
+
+# Types de liens MSPDI (PredecessorLink/Type) et Primavera (pred_type)
+MSPDI_LINK_TYPES = {"0": "FF", "1": "FS", "2": "SF", "3": "SS"}
+XER_LINK_TYPES = {"PR_FS": "FS", "PR_SS": "SS", "PR_FF": "FF", "PR_SF": "SF"}
+
+# Activités Primavera sans durée propre (résumés WBS, niveau d'effort) : non importées
+XER_SKIPPED_TYPES = ("TT_WBS", "TT_LOE")
+
+_ISO_DURATION = re.compile(
+    r"^P(?:(?P<days>\d+(?:\.\d+)?)D)?(?:T(?:(?P<hours>\d+(?:\.\d+)?)H)?(?:(?P<minutes>\d+(?:\.\d+)?)M)?"
+    r"(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?$"
+)
+
+
+def detect_format(path: str) -> str:
+    lower = path.lower()
+    if lower.endswith(".xer"):
+        return "xer"
+    if lower.endswith(".xml"):
+        return "mspdi"
+    raise ValueError(f"Format non reconnu pour '{path}' (extensions prises en charge : .xml, .xer)")
+
+
+def iso_duration_hours(value: str, hours_per_day: float) -> float:
+    """Durée ISO 8601 MSPDI (ex. PT16H0M0S) en heures de travail."""
+    match = _ISO_DURATION.match(value.strip()) if value else None
+    if not match:
+        return 0.0
+    parts = {k: float(v) if v else 0.0 for k, v in match.groupdict().items()}
+    return parts["days"] * hours_per_day + parts["hours"] + parts["minutes"] / 60 + parts["seconds"] / 3600
+
+
+def _rounded(value: float):
+    """Arrondi au centième, entier si possible (comme dans les listes de tâches saisies)."""
+    value = round(value, 2)
+    return int(value) if value.is_integer() else value
+
+
+def _dependency(name: str, kind: str, lag_days: float):
+    lag_days = _rounded(lag_days)
+    if kind == "FS" and not lag_days:
+        return name
+    return {"task": name, "type": kind, "lag": lag_days}
+
+
+class _ImportedTasks:
+    """
+    Accumulateur commun aux deux formats : activités indexées par identifiant source
+    (interné), liens résolus en noms une fois tout le fichier lu.
+    """
+
+    def __init__(self):
+        self.tasks: List[dict] = []
+        self.by_key: Dict[str, int] = {}
+        self.links: List[Tuple[str, str, str, float]] = []
+        self.names = set()
+        self.skipped = 0
+        self.dropped_links = 0
+
+    def add(self, key: str, name: str, duration_days: float, **fields) -> dict:
+        if name in self.names:
+            name = f"{name} ({key})"
+        name = sys.intern(name)
+        self.names.add(name)
+        task = {"name": name, "duration_days": _rounded(duration_days), "dependencies": []}
+        task.update({k: v for k, v in fields.items() if v not in (None, "")})
+        self.by_key[sys.intern(key)] = len(self.tasks)
+        self.tasks.append(task)
+        return task
+
+    def link(self, successor_key: str, predecessor_key: str, kind: str, lag_days: float):
+        self.links.append((sys.intern(successor_key), sys.intern(predecessor_key), kind, lag_days))
+
+    def assign(self, task_key: str, resource: str, units: float):
+        i = self.by_key.get(task_key)
+        if i is None or not resource:
+            return
+        task = self.tasks[i]
+        resources = task.setdefault("required_resources", {})
+        resources[resource] = _rounded(resources.get(resource, 0) + units)
+        task.setdefault("trade", resource)
+
+    def finish(self) -> List[dict]:
+        for successor_key, predecessor_key, kind, lag_days in self.links:
+            i = self.by_key.get(successor_key)
+            j = self.by_key.get(predecessor_key)
+            if i is None or j is None or i == j:
+                self.dropped_links += 1
+                continue
+            self.tasks[i]["dependencies"].append(_dependency(self.tasks[j]["name"], kind, lag_days))
+        self.links = []
+        return self.tasks
+
+
+_LOCAL_NAMES: Dict[str, str] = {}
+
+
+def _local(tag: str) -> str:
+    """Nom local d'une balise (sans espace de noms), mis en cache : les balises MSPDI se répètent."""
+    name = _LOCAL_NAMES.get(tag)
+    if name is None:
+        name = _LOCAL_NAMES[tag] = tag.rsplit("}", 1)[-1]
+    return name
+
+
+def read_mspdi(path: str) -> Tuple[List[dict], dict]:
+    """
+    Lecture en flux d'un fichier MS Project XML (MSPDI) par iterparse : chaque
+    élément Task / Resource / Assignment est traité à sa fermeture puis libéré,
+    la mémoire ne dépend donc que du nombre d'activités retenues.
+    Les tâches récapitulatives (Summary=1) et lignes vides (IsNull=1) ne sont pas importées.
+    """
+    imported = _ImportedTasks()
+    minutes_per_day = 480.0
+    resources: Dict[str, str] = {}
+    project_name = None
+
+    # Pile des éléments ouverts : la profondeur distingue les champs du projet de ceux des tâches
+    stack = []
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        depth = len(stack)
+        if depth > 2:
+            # Champs internes d'une tâche / ressource : lus à la fermeture de leur parent
+            continue
+        tag = _local(elem.tag)
+
+        if depth == 1 and tag == "MinutesPerDay" and elem.text:
+            minutes_per_day = float(elem.text) or 480.0
+        elif depth == 1 and tag in ("Title", "Name") and elem.text and (project_name is None or tag == "Title"):
+            project_name = elem.text
+        elif tag == "Task":
+            fields = {_local(child.tag): child for child in elem}
+            uid = fields["UID"].text if "UID" in fields else None
+            summary = fields.get("Summary")
+            blank = fields.get("IsNull")
+            if uid is None or (summary is not None and summary.text == "1") or (blank is not None and blank.text == "1"):
+                imported.skipped += 1
+            else:
+                name = fields["Name"].text if "Name" in fields and fields["Name"].text else f"Tâche {uid}"
+                hours = iso_duration_hours(fields["Duration"].text, minutes_per_day / 60) if "Duration" in fields else 0
+                wbs = fields["WBS"].text if "WBS" in fields else None
+                imported.add(uid, name, hours * 60 / minutes_per_day, wbs=wbs, source_uid=int(uid) if uid.isdigit() else uid)
+                for link in elem:
+                    if _local(link.tag) != "PredecessorLink":
+                        continue
+                    values = {_local(child.tag): child.text for child in link}
+                    predecessor = values.get("PredecessorUID")
+                    if predecessor is None:
+                        continue
+                    kind = MSPDI_LINK_TYPES.get(values.get("Type", "1"), "FS")
+                    # LinkLag en dixièmes de minute de travail
+                    lag_days = float(values.get("LinkLag") or 0) / 10 / minutes_per_day
+                    imported.link(uid, predecessor, kind, lag_days)
+        elif tag == "Resource":
+            values = {_local(child.tag): child.text for child in elem}
+            if values.get("UID") and values.get("Name"):
+                resources[values["UID"]] = sys.intern(values["Name"])
+        elif tag == "Assignment":
+            values = {_local(child.tag): child.text for child in elem}
+            resource = resources.get(values.get("ResourceUID"))
+            if resource:
+                imported.assign(values.get("TaskUID"), resource, float(values.get("Units") or 1))
+
+        if tag in ("Task", "Resource", "Assignment") and stack:
+            # Élément traité : détaché de son conteneur pour libérer la mémoire
+            stack[-1].remove(elem)
+
+    tasks = imported.finish()
+    return tasks, {
+        "format": "mspdi",
+        "project_name": project_name,
+        "skipped_activities": imported.skipped,
+        "dropped_links": imported.dropped_links
+    }
+
+
+def _xer_rows(path: str, encoding: str):
+    """Lecture ligne à ligne d'un XER : (table, dictionnaire champ -> valeur) pour chaque ligne %R."""
+    table = None
+    fields: List[str] = []
+    with open(path, encoding=encoding, errors="replace", newline="") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if line.startswith("%T"):
+                table = line.split("\t", 1)[1].strip() if "\t" in line else None
+                fields = []
+            elif line.startswith("%F"):
+                fields = [sys.intern(name) for name in line.split("\t")[1:]]
+            elif line.startswith("%R") and table is not None:
+                yield table, dict(zip(fields, line.split("\t")[1:]))
+            elif line.startswith("%E"):
+                break
+
+
+def read_xer(path: str, encoding: str = "cp1252") -> Tuple[List[dict], dict]:
+    """
+    Lecture en flux d'un export Primavera XER (tables CALENDAR, PROJECT, TASK,
+    TASKPRED, RSRC, TASKRSRC) : une ligne à la fois, seuls les champs utiles
+    sont conservés. Les codes d'activité (task_code) servent de noms de tâches ;
+    les résumés WBS et niveaux d'effort ne sont pas importés.
+    """
+    imported = _ImportedTasks()
+    hours_per_day: Dict[str, float] = {}
+    task_calendar: Dict[str, str] = {}
+    resources: Dict[str, str] = {}
+    project_name = None
+
+    def day_hours(calendar_id: Optional[str]) -> float:
+        return hours_per_day.get(calendar_id) or 8.0
+
+    for table, row in _xer_rows(path, encoding):
+        if table == "CALENDAR":
+            try:
+                hours_per_day[row.get("clndr_id")] = float(row.get("day_hr_cnt") or 8)
+            except ValueError:
+                pass
+        elif table == "PROJECT" and project_name is None:
+            project_name = row.get("proj_short_name")
+        elif table == "TASK":
+            task_id = row.get("task_id")
+            if not task_id:
+                continue
+            if row.get("task_type") in XER_SKIPPED_TYPES:
+                imported.skipped += 1
+                continue
+            calendar_id = row.get("clndr_id")
+            task_calendar[sys.intern(task_id)] = calendar_id
+            hours = float(row.get("target_drtn_hr_cnt") or 0)
+            imported.add(
+                task_id,
+                row.get("task_code") or f"A{task_id}",
+                hours / day_hours(calendar_id),
+                description=row.get("task_name"),
+                wbs_id=row.get("wbs_id")
+            )
+        elif table == "TASKPRED":
+            successor = row.get("task_id")
+            kind = XER_LINK_TYPES.get(row.get("pred_type"), "FS")
+            lag_hours = float(row.get("lag_hr_cnt") or 0)
+            imported.link(successor, row.get("pred_task_id"), kind, lag_hours / day_hours(task_calendar.get(successor)))
+        elif table == "RSRC":
+            if row.get("rsrc_id"):
+                resources[row["rsrc_id"]] = sys.intern(row.get("rsrc_name") or row.get("rsrc_short_name") or row["rsrc_id"])
+        elif table == "TASKRSRC":
+            task_id = row.get("task_id")
+            resource = resources.get(row.get("rsrc_id"))
+            # target_qty_per_hr : effectif affecté (1.0 = une personne à plein temps)
+            imported.assign(task_id, resource, float(row.get("target_qty_per_hr") or 0) or 1.0)
+
+    tasks = imported.finish()
+    return tasks, {
+        "format": "xer",
+        "project_name": project_name,
+        "skipped_activities": imported.skipped,
+        "dropped_links": imported.dropped_links
+    }
+
+
+def read_schedule_file(path: str, file_format: Optional[str] = None) -> Tuple[List[dict], dict]:
+    file_format = file_format or detect_format(path)
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Format inconnu : '{file_format}' (disponibles : {', '.join(IMPORT_FORMATS)})")
+    if file_format == "mspdi":
+        return read_mspdi(path)
+    return read_xer(path)
+
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : incremental.py
+# @Author: Assistant
+# @Desc  : Recalcul CPM incrémental pour les modifications unitaires d'un planning
+
+import heapq
+from typing import Dict, Iterable, List, Optional, Set
+
+from scheduling import CycleError, TaskGraph, forward_pass, tail_lengths
+
+
+class IncrementalSchedule:
+    """
+    Planning CPM modifiable tâche par tâche.
+
+    Deux grandeurs sont maintenues par tâche :
+    - `es` (début au plus tôt), qui ne dépend que de l'amont ;
+    - `tail` (plus long chemin du début de la tâche à la fin du projet), qui ne
+      dépend que de l'aval.
+    Les dates au plus tard s'en déduisent : LS = T - tail, où T est la durée du
+    projet. Une modification ne repropage donc `es` que vers l'aval et `tail`
+    que vers l'amont, dans l'ordre topologique (rangs maintenus par
+    l'algorithme de Pearce-Kelly lors des ajouts de liens).
+    """
+
+    def __init__(self, tasks: list):
+        graph = TaskGraph(tasks)
+        if graph.typed:
+            raise ValueError(
+                "Les modifications incrémentales ne prennent en charge que les liens fin-début sans décalage"
+            )
+        self.names: List[str] = list(graph.names)
+        self.index: Dict[str, int] = dict(graph.index)
+        self.durations: list = list(graph.durations)
+        self.preds: List[List[int]] = [list(p) for p in graph.preds]
+        self.succs: List[List[int]] = [list(s) for s in graph.succs]
+        # Champs d'origine (ressources, distributions...) restitués par to_tasks()
+        self.task_fields: List[dict] = [
+            {k: v for k, v in task.items() if k not in ("name", "duration_days", "dependencies")}
+            for task in tasks
+        ]
+
+        self.rank: List[int] = [0] * len(graph)
+        for position, i in enumerate(graph.order):
+            self.rank[i] = position
+        self._next_rank = len(graph)
+
+        self.es, self.ef = forward_pass(graph)
+        self.tail = tail_lengths(graph, self.durations)
+        self._finish_heap = [(-ef, i) for i, ef in enumerate(self.ef)]
+        heapq.heapify(self._finish_heap)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # ------------------------------------------------------------------
+    # Lectures
+    # ------------------------------------------------------------------
+    @property
+    def project_duration(self):
+        """Durée du projet (max des fins au plus tôt), via un tas à invalidation paresseuse."""
+        heap = self._finish_heap
+        while heap and -heap[0][0] != self.ef[heap[0][1]]:
+            heapq.heappop(heap)
+        return -heap[0][0] if heap else 0
+
+    def _task_index(self, name: str) -> int:
+        i = self.index.get(name)
+        if i is None:
+            raise ValueError(f"Tâche inconnue : '{name}'")
+        return i
+
+    def task_dates(self, i: int, project_duration=None) -> dict:
+        T = self.project_duration if project_duration is None else project_duration
+        ls = T - self.tail[i]
+        lf = ls + self.durations[i]
+        earliest_successor = min((self.es[s] for s in self.succs[i]), default=T)
+        return {
+            "task_name": self.names[i],
+            "duration_days": self.durations[i],
+            "earliest_start": self.es[i],
+            "earliest_finish": self.ef[i],
+            "latest_start": ls,
+            "latest_finish": lf,
+            "total_float_days": ls - self.es[i],
+            "free_float_days": earliest_successor - self.ef[i],
+            "is_critical": ls == self.es[i]
+        }
+
+    def to_tasks(self) -> list:
+        """État courant au format des outils de planning."""
+        return [
+            {
+                "name": name,
+                "duration_days": self.durations[i],
+                "dependencies": [self.names[p] for p in self.preds[i]],
+                **self.task_fields[i]
+            }
+            for i, name in enumerate(self.names)
+        ]
+
+    def critical_path(self) -> List[str]:
+        T = self.project_duration
+        critical = [i for i in range(len(self.names)) if T - self.tail[i] == self.es[i]]
+        critical.sort(key=lambda i: (self.es[i], self.rank[i]))
+        return [self.names[i] for i in critical]
+
+    # ------------------------------------------------------------------
+    # Propagations
+    # ------------------------------------------------------------------
+    def _propagate_forward(self, seeds: Iterable[int]) -> Dict[int, object]:
+        """Recalcule `es`/`ef` à partir des tâches `seeds`, vers l'aval uniquement ; renvoie les anciens `es`."""
+        changed = {}
+        heap = [(self.rank[i], i) for i in set(seeds)]
+        heapq.heapify(heap)
+        queued = {i for _, i in heap}
+        while heap:
+            _, u = heapq.heappop(heap)
+            queued.discard(u)
+            start = 0
+            for p in self.preds[u]:
+                if self.ef[p] > start:
+                    start = self.ef[p]
+            finish = start + self.durations[u]
+            if start == self.es[u] and finish == self.ef[u]:
+                continue
+            finish_changed = finish != self.ef[u]
+            changed.setdefault(u, self.es[u])
+            self.es[u], self.ef[u] = start, finish
+            if finish_changed:
+                heapq.heappush(self._finish_heap, (-finish, u))
+                for s in self.succs[u]:
+                    if s not in queued:
+                        queued.add(s)
+                        heapq.heappush(heap, (self.rank[s], s))
+        return changed
+
+    def _propagate_backward(self, seeds: Iterable[int]) -> Set[int]:
+        """Recalcule `tail` à partir des tâches `seeds`, vers l'amont uniquement."""
+        changed = set()
+        heap = [(-self.rank[i], i) for i in set(seeds)]
+        heapq.heapify(heap)
+        queued = {i for _, i in heap}
+        while heap:
+            _, u = heapq.heappop(heap)
+            queued.discard(u)
+            longest = 0
+            for s in self.succs[u]:
+                if self.tail[s] > longest:
+                    longest = self.tail[s]
+            tail = self.durations[u] + longest
+            if tail == self.tail[u]:
+                continue
+            self.tail[u] = tail
+            changed.add(u)
+            for p in self.preds[u]:
+                if p not in queued:
+                    queued.add(p)
+                    heapq.heappush(heap, (-self.rank[p], p))
+        return changed
+
+    def _reorder(self, x: int, y: int):
+        """
+        Maintien de l'ordre topologique à l'ajout du lien x -> y (Pearce-Kelly) :
+        seuls les nœuds de rang compris entre rang(y) et rang(x) sont renumérotés.
+        """
+        lower, upper = self.rank[y], self.rank[x]
+        if lower > upper:
+            return
+
+        forward, stack = set(), [y]
+        while stack:
+            u = stack.pop()
+            if u == x:
+                raise CycleError([self.names[x], self.names[y]])
+            if u in forward:
+                continue
+            forward.add(u)
+            stack.extend(s for s in self.succs[u] if self.rank[s] <= upper and s not in forward)
+
+        backward, stack = set(), [x]
+        while stack:
+            u = stack.pop()
+            if u in backward:
+                continue
+            backward.add(u)
+            stack.extend(p for p in self.preds[u] if self.rank[p] >= lower and p not in backward)
+
+        ordered = sorted(backward, key=self.rank.__getitem__) + sorted(forward, key=self.rank.__getitem__)
+        slots = sorted(self.rank[u] for u in ordered)
+        for u, r in zip(ordered, slots):
+            self.rank[u] = r
+
+    # ------------------------------------------------------------------
+    # Opérations delta
+    # ------------------------------------------------------------------
+    def _result(self, early: Dict[int, object], late: Set[int], previous_duration) -> dict:
+        T = self.project_duration
+        touched = set(early) | late
+        # La marge libre d'un prédécesseur dépend du début au plus tôt de ses successeurs
+        for u in early:
+            for p in self.preds[u]:
+                if p in touched:
+                    continue
+                before = min(early.get(s, self.es[s]) for s in self.succs[p])
+                after = min(self.es[s] for s in self.succs[p])
+                if before != after:
+                    touched.add(p)
+        return {
+            "project_duration_days": T,
+            "project_duration_delta": T - previous_duration,
+            "changed_tasks": [self.task_dates(i, T) for i in sorted(touched, key=self.rank.__getitem__)]
+        }
+
+    def change_duration(self, name: str, duration) -> dict:
+        i = self._task_index(name)
+        if duration < 0:
+            raise ValueError("La durée doit être positive ou nulle")
+        previous = self.project_duration
+        self.durations[i] = duration
+        early = self._propagate_forward([i])
+        late = self._propagate_backward([i])
+        return self._result(early, late, previous)
+
+    def add_link(self, predecessor: str, successor: str) -> dict:
+        x, y = self._task_index(predecessor), self._task_index(successor)
+        if x == y:
+            raise CycleError([predecessor])
+        if x in self.preds[y]:
+            raise ValueError(f"Le lien {predecessor} -> {successor} existe déjà")
+        previous = self.project_duration
+        self._reorder(x, y)
+        self.preds[y].append(x)
+        self.succs[x].append(y)
+        early = self._propagate_forward([y])
+        late = self._propagate_backward([x])
+        # Les extrémités du lien changent au moins de marge libre
+        return self._result(early, late | {x, y}, previous)
+
+    def remove_link(self, predecessor: str, successor: str) -> dict:
+        x, y = self._task_index(predecessor), self._task_index(successor)
+        if x not in self.preds[y]:
+            raise ValueError(f"Le lien {predecessor} -> {successor} n'existe pas")
+        previous = self.project_duration
+        self.preds[y].remove(x)
+        self.succs[x].remove(y)
+        early = self._propagate_forward([y])
+        late = self._propagate_backward([x])
+        # Les extrémités du lien changent au moins de marge libre
+        return self._result(early, late | {x, y}, previous)
+
+    def insert_task(
+        self,
+        name: str,
+        duration,
+        dependencies: Optional[List[str]] = None,
+        successors: Optional[List[str]] = None,
+        trade: str = "Non spécifié"
+    ) -> dict:
+        if name in self.index:
+            raise ValueError(f"Tâche en double : '{name}'")
+        dependencies = dependencies or []
+        successors = successors or []
+        preds = [self._task_index(d) for d in dependencies]
+        succs = [self._task_index(s) for s in successors]
+        if set(preds) & set(succs):
+            raise CycleError([name] + sorted(set(dependencies) & set(successors)))
+
+        previous = self.project_duration
+        i = len(self.names)
+        self.names.append(name)
+        self.index[name] = i
+        self.durations.append(duration)
+        self.task_fields.append({"trade": trade})
+        self.preds.append([])
+        self.succs.append([])
+        self.rank.append(self._next_rank)
+        self._next_rank += 1
+        self.es.append(0)
+        self.ef.append(duration)
+        self.tail.append(duration)
+        heapq.heappush(self._finish_heap, (-duration, i))
+
+        try:
+            for p in preds:
+                self.preds[i].append(p)
+                self.succs[p].append(i)
+            for s in succs:
+                self._reorder(i, s)
+                self.preds[s].append(i)
+                self.succs[i].append(s)
+        except CycleError:
+            self._rollback_insert(i)
+            raise
+
+        early = self._propagate_forward([i] + succs)
+        early.setdefault(i, 0)
+        # Les prédécesseurs gagnent un successeur : leur marge libre peut baisser même si
+        # la nouvelle tâche démarre à 0 (aucun écart de début visible dans `early`)
+        late = self._propagate_backward([i] + preds) | {i} | set(preds)
+        return self._result(early, late, previous)
+
+    def _rollback_insert(self, i: int):
+        for p in self.preds[i]:
+            self.succs[p].remove(i)
+        for s in self.succs[i]:
+            self.preds[s].remove(i)
+        del self.index[self.names[i]]
+        for column in (self.names, self.durations, self.task_fields, self.preds, self.succs,
+                       self.rank, self.es, self.ef, self.tail):
+            column.pop()
+        self._finish_heap = [entry for entry in self._finish_heap if entry[1] != i]
+        heapq.heapify(self._finish_heap)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : interval_index.py
+# @Author: Assistant
+# @Desc  : Arbre d'intervalles centré sur les fenêtres de tâches planifiées (requêtes par période)
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class IntervalIndex:
+    """
+    Arbre d'intervalles centré, statique, sur des intervalles fermés [start, end].
+
+    Chaque nœud porte un centre et les intervalles qui le contiennent, rangés
+    deux fois : par début croissant et par fin décroissante. Une requête de
+    fenêtre [lo, hi] descend un seul côté quand la fenêtre est d'un côté du
+    centre (et ne lit alors qu'un préfixe de la liste du nœud), les deux côtés
+    sinon, auquel cas tout le nœud est rapporté : coût O(log n + k).
+    Le centre d'un nœud est le début de son intervalle médian, si bien que
+    chaque nœud contient au moins un intervalle.
+    """
+
+    def __init__(self, starts: Sequence[int], ends: Sequence[int]):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.maximum(np.asarray(ends, dtype=np.int64), self.starts)
+        self.center: List[int] = []
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.by_start: List[np.ndarray] = []
+        self.node_starts: List[np.ndarray] = []
+        self.by_end: List[np.ndarray] = []
+        self.node_ends: List[np.ndarray] = []
+        ids = np.argsort(self.starts, kind="stable")
+        self.root = self._build(ids)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _build(self, ids: np.ndarray) -> int:
+        """Construction itérative (pile explicite) ; `ids` est trié par début croissant."""
+        if not len(ids):
+            return -1
+        root = self._new_node()
+        stack = [(root, ids)]
+        while stack:
+            node, ids = stack.pop()
+            starts, ends = self.starts[ids], self.ends[ids]
+            center = int(starts[len(ids) // 2])
+            here = (starts <= center) & (ends >= center)
+            left = ids[ends < center]
+            right = ids[starts > center]
+
+            mine = ids[here]
+            self.center[node] = center
+            # `ids` est trié par début : le sous-ensemble aussi
+            self.by_start[node] = mine
+            self.node_starts[node] = self.starts[mine]
+            order = np.argsort(-self.ends[mine], kind="stable")
+            self.by_end[node] = mine[order]
+            self.node_ends[node] = self.ends[mine][order]
+
+            if len(left):
+                child = self._new_node()
+                self.left[node] = child
+                stack.append((child, left))
+            if len(right):
+                child = self._new_node()
+                self.right[node] = child
+                stack.append((child, right))
+        return root
+
+    def _new_node(self) -> int:
+        self.center.append(0)
+        self.left.append(-1)
+        self.right.append(-1)
+        empty = np.empty(0, dtype=np.int64)
+        self.by_start.append(empty)
+        self.node_starts.append(empty)
+        self.by_end.append(empty)
+        self.node_ends.append(empty)
+        return len(self.center) - 1
+
+    def overlapping(self, lo: int, hi: int) -> np.ndarray:
+        """Index des intervalles qui recoupent la fenêtre fermée [lo, hi]."""
+        found = []
+        stack = [self.root] if self.root >= 0 else []
+        while stack:
+            node = stack.pop()
+            center = self.center[node]
+            if hi < center:
+                # Les intervalles du nœud finissent tous après le centre (> hi) : garder ceux qui commencent avant hi
+                count = int(np.searchsorted(self.node_starts[node], hi, side="right"))
+                if count:
+                    found.append(self.by_start[node][:count])
+                if self.left[node] >= 0:
+                    stack.append(self.left[node])
+            elif lo > center:
+                # Ils commencent tous avant le centre (< lo) : garder ceux qui finissent après lo
+                count = int(np.searchsorted(-self.node_ends[node], -lo, side="right"))
+                if count:
+                    found.append(self.by_end[node][:count])
+                if self.right[node] >= 0:
+                    stack.append(self.right[node])
+            else:
+                found.append(self.by_start[node])
+                if self.left[node] >= 0:
+                    stack.append(self.left[node])
+                if self.right[node] >= 0:
+                    stack.append(self.right[node])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def stabbing(self, day: int) -> np.ndarray:
+        return self.overlapping(day, day)
+
+
+def free_windows(
+    starts: Sequence[int],
+    ends: Sequence[int],
+    loads: Sequence[float],
+    lo: int,
+    hi: int,
+    capacity: float
+) -> List[Tuple[int, int]]:
+    """
+    Périodes fermées de [lo, hi] où la charge cumulée des intervalles fermés
+    [start, end] donnés reste sous `capacity` (balayage sur les k intervalles).
+    """
+    events: Dict[int, float] = {}
+    for start, end, load in zip(starts, ends, loads):
+        start, end = max(int(start), lo), min(int(end), hi)
+        if start > end or load <= 0:
+            continue
+        events[start] = events.get(start, 0) + load
+        events[end + 1] = events.get(end + 1, 0) - load
+
+    windows = []
+    usage = 0.0
+    cursor: Optional[int] = lo
+    for day in sorted(events):
+        usage_before = usage
+        usage += events[day]
+        free_before = usage_before < capacity - 1e-9
+        free_after = usage < capacity - 1e-9
+        if free_before and not free_after:
+            if cursor is not None and cursor <= day - 1:
+                windows.append((cursor, day - 1))
+            cursor = None
+        elif not free_before and free_after:
+            cursor = day
+    if cursor is not None and cursor <= hi:
+        windows.append((cursor, hi))
+    return windows
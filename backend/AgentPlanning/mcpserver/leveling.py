@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : leveling.py
+# @Author: Assistant
+# @Desc  : Lissage des ressources par schéma de génération série (SSGS) pour le planning BTP
+
+import heapq
+import math
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from scheduling import TaskGraph, CriticalPathAnalysis, start_bound, tail_lengths
+
+# Règles de priorité : clé à minimiser pour chaque tâche éligible
+PRIORITY_RULES = ("least_float", "longest_path", "most_resources")
+
+
+class ResourceLevelingError(ValueError):
+    """Levée lorsqu'une tâche demande plus de ressources que la capacité disponible."""
+
+
+class _TradeProfile:
+    """Profil de charge incrémental d'un corps de métier (tableau journalier extensible)."""
+
+    def __init__(self, capacity: float, horizon: int):
+        self.capacity = capacity
+        self.usage = np.zeros(max(horizon, 16), dtype=np.float64)
+
+    def _ensure(self, end: int):
+        if end > len(self.usage):
+            grown = np.zeros(max(end, 2 * len(self.usage)), dtype=np.float64)
+            grown[:len(self.usage)] = self.usage
+            self.usage = grown
+
+    def last_violation(self, start: int, duration: int, amount: float) -> int:
+        """Dernier jour de [start, start+duration[ où `amount` ne tient pas, -1 sinon."""
+        self._ensure(start + duration)
+        window = self.usage[start:start + duration]
+        over = np.flatnonzero(window + amount > self.capacity + 1e-9)
+        return start + int(over[-1]) if len(over) else -1
+
+    def add(self, start: int, duration: int, amount: float):
+        self._ensure(start + duration)
+        self.usage[start:start + duration] += amount
+
+
+def serial_schedule(
+    graph: TaskGraph,
+    requirements: Sequence[Dict[str, float]],
+    capacities: Dict[str, float],
+    priority_rule: str = "least_float",
+    cpm: Optional[CriticalPathAnalysis] = None
+) -> Dict[str, object]:
+    """
+    Schéma de génération série (SSGS) sous contraintes de ressources.
+
+    Les tâches éligibles (tous prédécesseurs planifiés) sont tenues dans un tas
+    trié selon la règle de priorité ; chaque tâche extraite est placée au plus
+    tôt à partir de la fin de ses prédécesseurs, à la première date où la charge
+    de chaque corps de métier reste sous sa capacité sur toute sa durée. Les
+    corps de métier absents de `capacities` ne sont pas limités.
+
+    :param cpm: Analyse CPM déjà calculée pour `graph` (recalculée sinon)
+    :return: {"start", "finish"} en jours ouvrés et l'analyse CPM de référence
+    """
+    if priority_rule not in PRIORITY_RULES:
+        raise ValueError(f"Règle de priorité inconnue : '{priority_rule}' (disponibles : {', '.join(PRIORITY_RULES)})")
+
+    n = len(graph)
+    durations = [math.ceil(d) for d in graph.durations]
+    cpm = cpm or CriticalPathAnalysis(graph)
+
+    # Demandes limitées uniquement, et contrôle de faisabilité
+    demands = []
+    infeasible = []
+    for i, req in enumerate(requirements):
+        task_demands = [(trade, count) for trade, count in req.items() if trade in capacities and count > 0]
+        for trade, count in task_demands:
+            if count > capacities[trade]:
+                infeasible.append(f"{graph.names[i]} ({trade}: {count} > {capacities[trade]})")
+        demands.append(task_demands)
+    if infeasible:
+        raise ResourceLevelingError(
+            "Demande supérieure à la capacité disponible : " + ", ".join(infeasible[:10])
+        )
+
+    if priority_rule == "least_float":
+        keys = [(cpm.total_float[i], cpm.earliest_start[i]) for i in range(n)]
+    elif priority_rule == "longest_path":
+        tail = tail_lengths(graph, durations)
+        keys = [(-tail[i], cpm.earliest_start[i]) for i in range(n)]
+    else:
+        keys = [(-sum(count for _, count in demands[i]), cpm.earliest_start[i]) for i in range(n)]
+
+    horizon = int(cpm.project_duration) + 1
+    profiles = {trade: _TradeProfile(capacity, horizon) for trade, capacity in capacities.items()}
+
+    start = [0] * n
+    finish = [0] * n
+    remaining = [len(p) for p in graph.preds]
+    eligible = [(keys[i], i) for i in range(n) if remaining[i] == 0]
+    heapq.heapify(eligible)
+
+    while eligible:
+        _, i = heapq.heappop(eligible)
+        duration = durations[i]
+        if graph.typed:
+            t = max(
+                [0] + [
+                    start_bound(kind, lag, start[p], finish[p], duration)
+                    for p, kind, lag in zip(graph.preds[i], graph.pred_kinds[i], graph.pred_lags[i])
+                ]
+            )
+            t = math.ceil(t)
+        else:
+            t = max((finish[p] for p in graph.preds[i]), default=0)
+
+        if duration > 0 and demands[i]:
+            # Recherche de la première fenêtre faisable, en sautant après le dernier jour en conflit
+            while True:
+                blocking = max(
+                    profiles[trade].last_violation(t, duration, count)
+                    for trade, count in demands[i]
+                )
+                if blocking < 0:
+                    break
+                t = blocking + 1
+            for trade, count in demands[i]:
+                profiles[trade].add(t, duration, count)
+
+        start[i] = t
+        finish[i] = t + duration
+
+        for s in graph.succs[i]:
+            remaining[s] -= 1
+            if remaining[s] == 0:
+                heapq.heappush(eligible, (keys[s], s))
+
+    return {
+        "start": start,
+        "finish": finish,
+        "makespan": max(finish, default=0),
+        "cpm": cpm,
+        "peak_usage": {
+            trade: float(profile.usage.max()) if len(profile.usage) else 0.0
+            for trade, profile in profiles.items()
+        }
+    }
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : memo.py
+# @Author: Assistant
+# @Desc  : Cache LRU par empreinte de contenu pour les calculs de planning répétés entre appels d'outils
+
+import contextvars
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from scheduling import CriticalPathAnalysis, TaskGraph, forward_pass
+
+
+def canonical_hash(*parts) -> str:
+    """Empreinte stable d'objets JSON : clés triées, séparateurs compacts (indépendante de l'ordre des clés)."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+SIZE_SAMPLE = 32
+
+
+def approximate_size(obj, _depth: int = 0) -> int:
+    """
+    Taille mémoire approximative (octets) d'un résultat composé de dict/list/scalaires.
+    Les longues listes sont estimées sur un échantillon de SIZE_SAMPLE éléments.
+    """
+    size = sys.getsizeof(obj)
+    if _depth > 20:
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += approximate_size(key, _depth + 1) + approximate_size(value, _depth + 1)
+    elif isinstance(obj, (list, tuple)) and obj:
+        step = max(1, len(obj) // SIZE_SAMPLE)
+        sample = obj[::step]
+        sampled = sum(approximate_size(value, _depth + 1) for value in sample)
+        size += sampled * len(obj) // len(sample)
+    return size
+
+
+class LRUCache:
+    """
+    Cache LRU borné à la fois en nombre d'entrées et en mémoire estimée,
+    avec compteurs de succès / échecs / évictions.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key: str, value, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], size: Callable[[Any], int]):
+        found, value = self.get(key)
+        if found:
+            return value
+        value = compute()
+        self.put(key, value, size(value))
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_bytes": self._bytes,
+            "max_memory_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+class PlanningArtifacts:
+    """
+    Calculs intermédiaires partagés entre outils pour une même liste de tâches :
+    graphe indexé (ordre topologique), passe avant et analyse CPM complète,
+    chacun calculé au premier besoin. Les structures dérivées qui dépendent
+    aussi d'autres paramètres (calendrier, date de début...) sont rangées par
+    clé dans `derive`.
+    """
+
+    def __init__(self, tasks: list):
+        self.graph = TaskGraph(tasks)
+        self._forward: Optional[Tuple[list, list]] = None
+        self._cpm: Optional[CriticalPathAnalysis] = None
+        self._derived: dict = {}
+        self._lock = threading.Lock()
+
+    @property
+    def forward(self) -> Tuple[list, list]:
+        if self._forward is None:
+            with self._lock:
+                if self._forward is None:
+                    self._forward = forward_pass(self.graph)
+        return self._forward
+
+    @property
+    def cpm(self) -> CriticalPathAnalysis:
+        if self._cpm is None:
+            forward = self.forward
+            with self._lock:
+                if self._cpm is None:
+                    self._cpm = CriticalPathAnalysis(self.graph, forward)
+        return self._cpm
+
+    def derive(self, key, compute: Callable[[], Any]):
+        """Structure dérivée mémorisée par clé (par ex. index de dates pour un calendrier donné)."""
+        value = self._derived.get(key)
+        if value is None:
+            value = compute()
+            with self._lock:
+                # Borne simple : les dérivés d'anciennes dates de début ne s'accumulent pas
+                if len(self._derived) >= 16:
+                    self._derived.clear()
+                self._derived[key] = value
+        return value
+
+    def estimated_size(self) -> int:
+        # Graphe, passes avant/arrière et marges : quelques listes de longueur n et E
+        n = len(self.graph)
+        links = sum(len(p) for p in self.graph.preds)
+        return 200 * n + 32 * links + approximate_size(self.graph.names) + approximate_size(self.graph.tasks)
+
+
+# Empreinte des tâches de l'appel en cours, calculée une fois par le décorateur d'outil
+_CURRENT_TASKS: contextvars.ContextVar = contextvars.ContextVar("current_tasks", default=(None, None))
+
+
+def tasks_digest(tasks: list) -> str:
+    current, digest = _CURRENT_TASKS.get()
+    if current is tasks:
+        return digest
+    return canonical_hash(tasks)
+
+
+def bind_tasks_digest(tasks: list, digest: str):
+    return _CURRENT_TASKS.set((tasks, digest))
+
+
+def release_tasks_digest(token):
+    _CURRENT_TASKS.reset(token)
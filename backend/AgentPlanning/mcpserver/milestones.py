@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : milestones.py
+# @Author: Assistant
+# @Desc  : Suivi vectorisé des jalons, d'un projet ou d'un portefeuille de chantiers
+
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+
+DONE, IN_PROGRESS, UPCOMING, OTHER = range(4)
+STATUS_CODES = {"terminé": DONE, "en_cours": IN_PROGRESS, "à_venir": UPCOMING}
+
+# Jours depuis l'époque NumPy (1970-01-01) -> ordinal Python
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+def parse_days(values: List[Optional[str]], label: str) -> np.ndarray:
+    """
+    Dates YYYY-MM-DD -> ordinaux int64 (-1 pour une date absente), analysées d'un bloc
+    sur les valeurs distinctes : un portefeuille répète beaucoup les mêmes dates.
+    """
+    text = np.array([v or "" for v in values], dtype=str)
+    unique, inverse = np.unique(text, return_inverse=True)
+    present = unique != ""
+    # datetime64 accepte aussi "2025-03" ou une heure : seule la forme exacte YYYY-MM-DD est admise
+    if np.any(present & (np.char.str_len(unique) != 10)):
+        bad = unique[present & (np.char.str_len(unique) != 10)][0]
+        raise ValueError(f"Format de date invalide pour {label} : '{bad}'. Utiliser YYYY-MM-DD")
+    try:
+        days = np.array(np.where(present, unique, "NaT"), dtype="datetime64[D]")
+    except ValueError as e:
+        raise ValueError(f"Format de date invalide pour {label} : {e}")
+    ordinals = np.where(present, days.astype(np.int64) + _EPOCH_ORDINAL, -1)
+    return ordinals[inverse]
+
+
+class MilestoneTable:
+    """
+    Jalons de plusieurs projets à plat en colonnes (projet propriétaire, dates en
+    ordinaux, code de statut) ; retards, échéances et statistiques par projet sont
+    calculés sur les tableaux entiers (np.bincount par projet).
+
+    Sémantique du rapport d'origine : un jalon sans statut est traité comme en
+    cours pour le calcul du retard, mais n'est pas compté « en cours » dans les statistiques.
+    """
+
+    def __init__(self, projects: List[list]):
+        names, planned, actual, status, declared, owner = [], [], [], [], [], []
+        for p, milestones in enumerate(projects):
+            for milestone in milestones:
+                names.append(milestone["name"])
+                planned.append(milestone.get("planned_date"))
+                actual.append(milestone.get("actual_date"))
+                raw = milestone.get("status")
+                status.append(STATUS_CODES.get(raw, OTHER) if raw is not None else IN_PROGRESS)
+                declared.append(raw is not None)
+                owner.append(p)
+
+        self.projects = len(projects)
+        self.names = names
+        self.planned_text = planned
+        self.actual_text = actual
+        self.planned = parse_days(planned, "planned_date")
+        if np.any(self.planned < 0):
+            missing = names[int(np.flatnonzero(self.planned < 0)[0])]
+            raise ValueError(f"planned_date manquant pour le jalon '{missing}'")
+        self.actual = parse_days(actual, "actual_date")
+        self.status = np.array(status, dtype=np.int8)
+        self.declared = np.array(declared, dtype=bool)
+        self.owner = np.array(owner, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def evaluate(self, today: int, horizon_days: int = 30):
+        """Calcule retard (jours), retards signalés et jalons à venir dans l'horizon pour la date `today`."""
+        achieved = self.actual >= 0
+        in_progress = self.status == IN_PROGRESS
+        self.delay = np.where(
+            achieved,
+            self.actual - self.planned,
+            np.where(in_progress, np.maximum(today - self.planned, 0), 0)
+        )
+        self.late = (self.delay > 0) & ((self.status == DONE) | in_progress)
+        self.days_until = self.planned - today
+        self.upcoming = (self.status == UPCOMING) & (self.days_until > 0) & (self.days_until <= horizon_days)
+
+    def _per_project(self, mask: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+        values = mask if weights is None else np.where(mask, weights, 0)
+        return np.bincount(self.owner, weights=values.astype(np.float64), minlength=self.projects)
+
+    def statistics(self) -> dict:
+        """Statistiques par projet (tableaux de longueur `projects`)."""
+        total = np.bincount(self.owner, minlength=self.projects)
+        completed = self._per_project(self.declared & (self.status == DONE))
+        in_progress = self._per_project(self.declared & (self.status == IN_PROGRESS))
+        late = self._per_project(self.late)
+        delay_sum = self._per_project(self.late, self.delay)
+        max_delay = np.zeros(self.projects, dtype=np.int64)
+        np.maximum.at(max_delay, self.owner[self.late], self.delay[self.late])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            completion = np.where(total > 0, completed / np.maximum(total, 1) * 100, 0.0)
+            average_delay = np.where(late > 0, delay_sum / np.maximum(late, 1), 0.0)
+        return {
+            "total": total,
+            "completed": completed.astype(np.int64),
+            "in_progress": in_progress.astype(np.int64),
+            "completion_rate": completion,
+            "late": late.astype(np.int64),
+            "average_delay": average_delay,
+            "max_delay": max_delay,
+            "upcoming": self._per_project(self.upcoming).astype(np.int64),
+        }
+
+    def ranked_late(self, limit: Optional[int] = None) -> np.ndarray:
+        """Jalons en retard par retard décroissant (ordre d'origine à égalité)."""
+        ids = np.flatnonzero(self.late)
+        ids = ids[np.argsort(-self.delay[ids], kind="stable")]
+        return ids if limit is None else ids[:limit]
+
+    def ranked_upcoming(self, limit: Optional[int] = None) -> np.ndarray:
+        """Jalons à venir par échéance croissante."""
+        ids = np.flatnonzero(self.upcoming)
+        ids = ids[np.argsort(self.days_until[ids], kind="stable")]
+        return ids if limit is None else ids[:limit]
+
+    def ranked_projects(self, stats: dict, limit: Optional[int] = None) -> np.ndarray:
+        """Projets ayant des jalons en retard, par nombre de retards puis retard maximal décroissants."""
+        ranking = np.lexsort((-stats["max_delay"], -stats["late"]))
+        ranking = ranking[stats["late"][ranking] > 0]
+        return ranking if limit is None else ranking[:limit]
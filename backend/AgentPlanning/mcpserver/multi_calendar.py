@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : multi_calendar.py
+# @Author: Assistant
+# @Desc  : Passes CPM avec un calendrier de jours ouvrés par tâche (corps de métier, façades, travail le samedi)
+
+import math
+from typing import Dict, List, Optional
+
+from calendars import DEFAULT_CALENDAR, WorkingCalendar
+from scheduling import FF, FS, SS, TaskGraph
+
+
+def assign_calendars(
+    tasks: list,
+    calendars: Dict[str, WorkingCalendar],
+    trade_calendars: Optional[Dict[str, str]] = None,
+    default: str = DEFAULT_CALENDAR
+) -> List[str]:
+    """
+    Nom du calendrier de chaque tâche : champ `calendar` de la tâche, sinon celui
+    de son corps de métier dans `trade_calendars`, sinon `default`.
+    """
+    trade_calendars = trade_calendars or {}
+    names = []
+    for task in tasks:
+        name = task.get("calendar") or trade_calendars.get(task.get("trade")) or default
+        if name not in calendars:
+            raise ValueError(
+                f"Calendrier inconnu '{name}' pour la tâche '{task['name']}' "
+                f"(disponibles : {', '.join(sorted(calendars))})"
+            )
+        names.append(name)
+    return names
+
+
+class CalendarSchedule:
+    """
+    Analyse CPM où chaque tâche suit son propre calendrier de jours ouvrés.
+
+    Les passes travaillent sur des ordinaux de dates : une tâche commence un jour
+    ouvré de son calendrier et occupe ses `duration_days` jours ouvrés suivants ;
+    les décalages des liens sont comptés dans le calendrier du successeur. Chaque
+    décalage est une requête de rang / sélection sur le bitset du calendrier, si
+    bien que le coût ne dépend pas du nombre de calendriers.
+
+    Pour rester interchangeable avec CriticalPathAnalysis, les dates sont exposées
+    en jours calendaires depuis le début du projet (fin = jour ouvré suivant le
+    dernier jour travaillé, comme en mode calendrier unique) ; les marges sont en
+    jours ouvrés du calendrier de la tâche.
+    """
+
+    def __init__(
+        self,
+        graph: TaskGraph,
+        task_calendars: List[WorkingCalendar],
+        origin: int,
+        calendar_names: Optional[List[str]] = None
+    ):
+        self.graph = graph
+        self.calendars = task_calendars
+        self.calendar_names = calendar_names
+        self.origin = origin
+        n = len(graph)
+        durations = [math.ceil(d) for d in graph.durations]
+        preds, succs = graph.preds, graph.succs
+        pred_kinds, pred_lags = graph.pred_kinds, graph.pred_lags
+        succ_kinds, succ_lags = graph.succ_kinds, graph.succ_lags
+
+        # Passe avant : début (jour ouvré) et fin exclusive (lendemain du dernier jour travaillé)
+        start = [0] * n
+        finish = [0] * n
+        for i in graph.order:
+            cal = task_calendars[i]
+            duration = durations[i]
+            earliest = cal.next_working_ordinal(origin)
+            for p, kind, lag in zip(preds[i], pred_kinds[i], pred_lags[i]):
+                anchor = cal.next_working_ordinal(finish[p] if kind in (FS, FF) else start[p])
+                bound = cal.offset_ordinal(anchor, lag)
+                if kind not in (FS, SS):
+                    bound = cal.offset_ordinal(bound, -duration)
+                if bound > earliest:
+                    earliest = bound
+            start[i] = earliest
+            finish[i] = cal.offset_ordinal(earliest, duration - 1) + 1 if duration > 0 else earliest
+
+        project_finish = max(finish, default=origin)
+
+        # Passe arrière : début au plus tard sous les contraintes des successeurs et de la fin du projet
+        latest = [0] * n
+        for i in reversed(graph.order):
+            latest[i] = self._latest_start(
+                i, durations, project_finish, succs[i], succ_kinds[i], succ_lags[i], latest
+            )
+        # Marge libre : même calcul contre les débuts au plus tôt des successeurs
+        free_latest = [
+            self._latest_start(i, durations, project_finish, succs[i], succ_kinds[i], succ_lags[i], start)
+            for i in range(n)
+        ]
+
+        self.durations = durations
+        self.start_ordinals = start
+        self.end_ordinals = [self._end(i, start[i]) for i in range(n)]
+        self.latest_start_ordinals = latest
+        self.earliest_start = [s - origin for s in start]
+        self.earliest_finish = [e - origin for e in self.end_ordinals]
+        self.latest_start = [s - origin for s in latest]
+        self.latest_finish = [self._end(i, latest[i]) - origin for i in range(n)]
+        self.total_float = [task_calendars[i].count(start[i], latest[i]) for i in range(n)]
+        self.free_float = [
+            min(task_calendars[i].count(start[i], free_latest[i]), self.total_float[i]) for i in range(n)
+        ]
+        self.project_duration = max(self.earliest_finish, default=0)
+
+    def _end(self, i: int, start: int) -> int:
+        """Jour de fin affiché : jour ouvré suivant le dernier jour travaillé (le début pour un jalon)."""
+        duration = self.durations[i]
+        return self.calendars[i].offset_ordinal(start, duration) if duration > 0 else start
+
+    def _latest_start(self, i: int, durations, project_finish: int, succs, kinds, lags, succ_start) -> int:
+        """Début au plus tard de i pour des débuts de successeurs `succ_start` donnés."""
+        cal = self.calendars[i]
+        duration = durations[i]
+        # La fin du projet est une fin exclusive : un jalon peut se placer au jour ouvré
+        # qui la suit, comme dans la passe avant
+        finish_limit = project_finish if duration > 0 else cal.next_working_ordinal(project_finish)
+        start_limit = None
+        for s, kind, lag in zip(succs, kinds, lags):
+            succ_cal = self.calendars[s]
+            if kind in (FS, SS):
+                reference = succ_start[s]
+            else:
+                reference = succ_cal.offset_ordinal(succ_start[s], durations[s]) if durations[s] > 0 else succ_start[s]
+            bound = succ_cal.offset_ordinal(reference, -lag)
+            if kind in (FS, FF):
+                if bound < finish_limit:
+                    finish_limit = bound
+            elif start_limit is None or bound < start_limit:
+                start_limit = bound
+        if duration > 0:
+            latest = cal.offset_ordinal(finish_limit, -duration)
+        else:
+            latest = cal.previous_working_ordinal(finish_limit)
+        if start_limit is not None:
+            latest = min(latest, cal.previous_working_ordinal(start_limit))
+        return latest
+
+    def is_critical(self, i: int) -> bool:
+        return self.total_float[i] <= 0
+
+    def critical_indices(self) -> List[int]:
+        """Tâches critiques dans l'ordre du chemin (date au plus tôt, puis ordre topologique)."""
+        critical = [i for i in self.graph.order if self.total_float[i] <= 0]
+        critical.sort(key=lambda i: self.earliest_start[i])
+        return critical
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : pagination.py
+# @Author: Assistant
+# @Desc  : Pagination par curseur, filtres et sortie en colonnes pour les résultats volumineux du planning
+
+import base64
+import hashlib
+import json
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+OUTPUT_FORMATS = ("rows", "columnar")
+
+
+def query_fingerprint(*parts) -> str:
+    """Empreinte courte d'une requête : un curseur n'est valable que pour la requête qui l'a produit."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(position: int, fingerprint: str) -> str:
+    raw = json.dumps({"p": position, "q": fingerprint}, separators=(",", ":")).encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+        position = int(state["p"])
+        owner = state["q"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Curseur invalide")
+    if owner != fingerprint or position < 0:
+        raise ValueError("Curseur invalide pour cette requête (tâches, calendrier ou filtres modifiés)")
+    return position
+
+
+def paginate(
+    indices: Sequence[int],
+    page_size: Optional[int],
+    cursor: Optional[str],
+    fingerprint: str
+) -> Tuple[Sequence[int], Optional[dict]]:
+    """
+    Découpe la liste ordonnée `indices` en page.
+
+    :return: (index de la page, informations de pagination ou None si la pagination n'est pas demandée)
+    """
+    if page_size is None and cursor is None:
+        return indices, None
+    if page_size is not None and page_size <= 0:
+        raise ValueError("page_size doit être positif")
+    position = decode_cursor(cursor, fingerprint) if cursor else 0
+    end = len(indices) if page_size is None else min(position + page_size, len(indices))
+    page = indices[position:end]
+    return page, {
+        "total_matching": len(indices),
+        "returned": len(page),
+        "next_cursor": encode_cursor(end, fingerprint) if end < len(indices) else None
+    }
+
+
+def parse_window(window_start: Optional[str], window_end: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Fenêtre de dates [début, fin] en ordinaux (bornes ouvertes si absentes), ou None sans filtre."""
+    if window_start is None and window_end is None:
+        return None
+    try:
+        lo = datetime.strptime(window_start, "%Y-%m-%d").toordinal() if window_start else 0
+        hi = datetime.strptime(window_end, "%Y-%m-%d").toordinal() if window_end else sys.maxsize
+    except ValueError:
+        raise ValueError("Format de date invalide pour la fenêtre. Utiliser YYYY-MM-DD")
+    if lo > hi:
+        raise ValueError("window_start doit précéder window_end")
+    return lo, hi
+
+
+class TradeTable:
+    """Corps de métier internés : chaque libellé est remplacé par un code entier dans la sortie en colonnes."""
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, trade: str) -> int:
+        k = self._codes.get(trade)
+        if k is None:
+            k = self._codes[trade] = len(self.labels)
+            self.labels.append(trade)
+        return k
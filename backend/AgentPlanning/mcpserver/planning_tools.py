@@ -5,392 +5,778 @@
 # @Desc  : Outils MCP pour la planification de projets BTP
 
 from fastmcp import FastMCP
+import functools
+import inspect
 import json
+import math
+import os
+import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 from typing import List, Dict
 
+from calendars import CALENDAR_PRESETS, WorkingCalendar, get_calendar, named_calendars
+from exports import (
+    EXPORT_CONTENTS, EXPORT_FORMATS, histogram_columns, profile_columns, schedule_columns, write_table
+)
+from histograms import PERIODS, LoadingHistogram
+from importers import read_schedule_file
+from incremental import IncrementalSchedule
+from interval_index import IntervalIndex, free_windows
+from leveling import serial_schedule
+from memo import (
+    LRUCache, PlanningArtifacts, bind_tasks_digest, canonical_hash,
+    release_tasks_digest, tasks_digest
+)
+from milestones import MilestoneTable
+from multi_calendar import CalendarSchedule, assign_calendars
+from portfolio import level_portfolio
+from risk import DurationModel, percentiles, simulate
+from schedule_diff import ScheduleDiff
+from schedule_store import DEFAULT_STORE_DIR, ScheduleStore
+from pagination import OUTPUT_FORMATS, TradeTable, paginate, parse_window, query_fingerprint
+from resources import ResourceProfile, format_ordinal
+from scheduling import LINK_TYPES
+
 mcp = FastMCP("Outils Planning BTP")
 
+# Magasin de plannings référencés par identifiant (colonnes sur disque, cache mémoire)
+SCHEDULE_STORE = ScheduleStore(os.environ.get("PLANNING_STORE_DIR", DEFAULT_STORE_DIR))
+EXPORT_DIR = os.environ.get("PLANNING_EXPORT_DIR", os.path.join(os.path.dirname(DEFAULT_STORE_DIR), "exports"))
+
+# Plannings ouverts pour modifications incrémentales, par identifiant
+SCHEDULE_HANDLES: Dict[str, IncrementalSchedule] = {}
+
+DETAIL_LEVELS = ("full", "summary")
+
+# Résultats d'outils mémorisés (en JSON) par empreinte (outil, tâches, calendrier, paramètres)
+RESULT_CACHE = LRUCache(
+    max_entries=int(os.environ.get("PLANNING_CACHE_ENTRIES", 128)),
+    max_bytes=int(os.environ.get("PLANNING_CACHE_MB", 256)) * 1024 * 1024
+)
+
+# Calculs intermédiaires (graphe, passes avant/arrière) partagés entre outils, par empreinte des tâches
+ARTIFACT_CACHE = LRUCache(max_entries=32, max_bytes=256 * 1024 * 1024)
+
 
-def calculate_end_date(start_date: datetime, duration_days: int, exclude_weekends: bool = True) -> datetime:
-    """Calcule la date de fin en excluant les week-ends si demandé"""
+def calculate_end_date(
+    start_date: datetime,
+    duration_days: int,
+    exclude_weekends: bool = True,
+    calendar: WorkingCalendar = None
+) -> datetime:
+    """Calcule la date de fin en excluant les week-ends (et jours fériés du calendrier) si demandé"""
     if not exclude_weekends:
         return start_date + timedelta(days=duration_days)
 
-    days_added = 0
-    current_date = start_date
+    # Décalage en O(1) sur le calendrier de jours ouvrés précalculé
+    return (calendar or get_calendar()).offset(start_date, duration_days)
+
+
+def load_tasks(tasks: list, schedule_id: str) -> list:
+    """Tâches fournies directement, ou chargées depuis un planning ouvert / le magasin de plannings"""
+    if tasks is not None:
+        return tasks
+    if schedule_id:
+        handle = SCHEDULE_HANDLES.get(schedule_id)
+        if handle is not None:
+            return handle.to_tasks()
+        return SCHEDULE_STORE.get(schedule_id).tasks()
+    raise ValueError("Fournir 'tasks' ou 'schedule_id'")
+
+
+def resolve_tasks(tasks: list, schedule_id: str):
+    """(tâches, empreinte) : l'empreinte d'un planning stocké est calculée une seule fois par version"""
+    if tasks is None and schedule_id and schedule_id not in SCHEDULE_HANDLES:
+        stored = SCHEDULE_STORE.get(schedule_id)
+        return stored.tasks(), stored.digest
+    tasks = load_tasks(tasks, schedule_id)
+    return tasks, canonical_hash(tasks)
+
+
+def planning_artifacts(tasks: list, digest: str = None) -> PlanningArtifacts:
+    """Graphe et passes CPM partagés : un second outil sur les mêmes tâches réutilise les calculs du premier"""
+    return ARTIFACT_CACHE.get_or_compute(
+        digest or tasks_digest(tasks),
+        lambda: PlanningArtifacts(tasks),
+        PlanningArtifacts.estimated_size
+    )
+
+
+def memoized_tool(tool_name: str, cacheable=lambda params: True):
+    """
+    Mémorise le résultat d'un outil par empreinte canonique de (outil, tâches, calendrier, paramètres).
+    Les tâches référencées par schedule_id sont chargées puis empreintées par leur contenu :
+    une modification du planning stocké invalide donc naturellement l'entrée.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            params = signature.bind(*args, **kwargs)
+            params.apply_defaults()
+            params = dict(params.arguments)
+            if not cacheable(params):
+                return func(**params)
+            try:
+                params["tasks"], digest = resolve_tasks(params.get("tasks"), params.get("schedule_id"))
+            except ValueError as e:
+                return {"error": str(e)}
+
+            key_params = {k: v for k, v in params.items() if k != "tasks"}
+            for name in ("holiday_sets", "holidays"):
+                key_params[name] = sorted(set(key_params.get(name) or []))
+            key = canonical_hash(tool_name, digest, key_params)
+
+            # Le cache garde le résultat sérialisé : chaque succès rend une copie, qu'un appelant peut modifier
+            found, payload = RESULT_CACHE.get(key)
+            if found:
+                return json.loads(payload)
+            token = bind_tasks_digest(params["tasks"], digest)
+            try:
+                result = func(**params)
+            finally:
+                release_tasks_digest(token)
+            if "error" not in result:
+                try:
+                    payload = json.dumps(result, ensure_ascii=False)
+                except (TypeError, ValueError):
+                    return result
+                RESULT_CACHE.put(key, payload, len(payload))
+            return result
+
+        return wrapper
+    return decorator
+
+
+def returns_stable_id(params: dict) -> bool:
+    """Une synthèse sur tâches en ligne enregistre le planning (qui a pu être supprimé depuis) : elle n'est pas mémorisée"""
+    return params.get("detail", "full") != "summary" or bool(params.get("schedule_id"))
+
+
+def summary_schedule_id(tasks: list, schedule_id: str, project_name: str = None) -> str:
+    """
+    Identifiant à renvoyer avec une synthèse : les tâches transmises en ligne sont stockées sous
+    l'empreinte de leur contenu, des appels répétés sur les mêmes tâches réutilisent le même planning.
+    """
+    if schedule_id:
+        return schedule_id
+    return SCHEDULE_STORE.put_content(tasks, tasks_digest(tasks), project_name=project_name).schedule_id
+
+
+def select_tasks(
+    order: List[int],
+    calendar: WorkingCalendar,
+    project_start: datetime,
+    starts: List[float],
+    finishes: List[float],
+    window,
+    critical: List[bool] = None
+) -> List[int]:
+    """Filtre les tâches (ordre conservé) : chemin critique seul et/ou chevauchement de la fenêtre de dates"""
+    if critical is not None:
+        order = [i for i in order if critical[i]]
+    if window is not None:
+        lo, hi = window
+        origin = project_start.toordinal()
+        order = [
+            i for i in order
+            if calendar.offset_ordinal(origin, starts[i]) <= hi and calendar.offset_ordinal(origin, finishes[i]) >= lo
+        ]
+    return order
+
+
+def schedule_windows(artifacts: PlanningArtifacts, calendar: WorkingCalendar, project_start: datetime) -> dict:
+    """
+    Fenêtres des tâches au plus tôt en jours calendaires fermés [premier jour, dernier jour travaillé]
+    et arbre d'intervalles associé, mémorisés avec le graphe pour ce calendrier et cette date de début.
+    """
+    origin = project_start.toordinal()
+
+    def compute():
+        earliest_start, earliest_finish = artifacts.forward
+        starts, ends = [], []
+        for es, ef in zip(earliest_start, earliest_finish):
+            first = math.ceil(es)
+            starts.append(calendar.offset_ordinal(origin, first))
+            ends.append(calendar.offset_ordinal(origin, max(math.ceil(ef) - 1, first)))
+        return {"starts": starts, "ends": ends, "index": IntervalIndex(starts, ends), "trades": {}}
+
+    return artifacts.derive(("windows", calendar.holiday_sets, calendar.extra_holidays, origin), compute)
+
+
+def trade_windows(artifacts: PlanningArtifacts, windows: dict, trade: str) -> dict:
+    """Sous-index des tâches mobilisant un corps de métier (required_resources, sinon trade) avec leur charge."""
+    cached = windows["trades"].get(trade)
+    if cached is None:
+        ids, loads = [], []
+        for i, task in enumerate(artifacts.graph.tasks):
+            load = task.get("required_resources", {}).get(trade, 1 if task.get("trade") == trade else 0)
+            if load > 0:
+                ids.append(i)
+                loads.append(load)
+        starts = [windows["starts"][i] for i in ids]
+        ends = [windows["ends"][i] for i in ids]
+        cached = windows["trades"][trade] = {
+            "ids": ids, "loads": loads, "starts": starts, "ends": ends, "index": IntervalIndex(starts, ends)
+        }
+    return cached
+
+
+def window_context(tasks: list, schedule_id: str, start_date: str, holiday_sets: list, holidays: list):
+    """Préambule commun des requêtes par période : (artefacts, calendrier, date de début, fenêtres)"""
+    project_start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+    if project_start is None:
+        raise ValueError("start_date est requis (YYYY-MM-DD)")
+    calendar = get_calendar(holiday_sets or [], holidays or [])
+    tasks, digest = resolve_tasks(tasks, schedule_id)
+    artifacts = planning_artifacts(tasks, digest)
+    return artifacts, calendar, project_start, schedule_windows(artifacts, calendar, project_start)
+
+
+def parse_day(value: str, label: str) -> int:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        raise ValueError(f"Format de date invalide pour {label}. Utiliser YYYY-MM-DD")
+
+
+def window_rows(artifacts: PlanningArtifacts, windows: dict, ids, limit: int) -> List[dict]:
+    cpm = artifacts.cpm
+    graph = artifacts.graph
+    ordered = sorted(ids, key=lambda i: (windows["starts"][i], i))[:limit]
+    return [
+        {
+            "task_name": graph.names[i],
+            "trade": graph.tasks[i].get("trade", "Non spécifié"),
+            "start_date": format_ordinal(windows["starts"][i]),
+            "end_date": format_ordinal(windows["ends"][i]),
+            "total_float_days": cpm.total_float[i],
+            "is_critical": cpm.is_critical(i)
+        }
+        for i in ordered
+    ]
 
-    while days_added < duration_days:
-        current_date += timedelta(days=1)
-        # 0 = lundi, 6 = dimanche
-        if current_date.weekday() < 5:  # Lundi à vendredi
-            days_added += 1
 
-    return current_date
+def calendar_notes(calendar: WorkingCalendar) -> List[str]:
+    """Notes décrivant les jours non travaillés pris en compte par le calendrier"""
+    notes = ["Les week-ends sont exclus des calculs"]
+    if calendar.holiday_sets:
+        notes.append(f"Jours non travaillés pris en compte : {', '.join(calendar.holiday_sets)}")
+    if calendar.extra_holidays:
+        notes.append(f"{len(calendar.extra_holidays)} jour(s) de fermeture spécifique(s) au projet")
+    return notes
+
+
+def calendar_schedule(
+    artifacts: PlanningArtifacts,
+    project_start: datetime,
+    calendars: dict,
+    trade_calendars: dict,
+    holiday_sets: list,
+    holidays: list
+):
+    """
+    Analyse multi-calendrier (CalendarSchedule) si des calendriers nommés sont demandés
+    (paramètres `calendars` / `trade_calendars` ou champ `calendar` d'une tâche), sinon None.
+    Mémorisée avec les autres calculs dérivés des mêmes tâches.
+    """
+    tasks = artifacts.graph.tasks
+    if not calendars and not trade_calendars and not any("calendar" in task for task in tasks):
+        return None
+    if project_start is None:
+        raise ValueError("Les calendriers par corps de métier nécessitent start_date")
+    origin = project_start.toordinal()
+
+    def compute():
+        named = named_calendars(calendars, holiday_sets or [], holidays or [])
+        names = assign_calendars(tasks, named, trade_calendars)
+        return CalendarSchedule(artifacts.graph, [named[name] for name in names], origin, names)
+
+    key = ("calendars", origin, canonical_hash(calendars, trade_calendars, sorted(holiday_sets or []), sorted(holidays or [])))
+    return artifacts.derive(key, compute)
+
+
+def multi_calendar_notes(schedule: CalendarSchedule) -> List[str]:
+    """Notes décrivant les calendriers nommés utilisés par une analyse multi-calendrier"""
+    used: Dict[str, int] = {}
+    for name in schedule.calendar_names:
+        used[name] = used.get(name, 0) + 1
+    return [
+        "Calendriers par tâche : " + ", ".join(f"{name} ({count} tâche(s))" for name, count in sorted(used.items())),
+        "Les décalages des liens sont comptés en jours ouvrés du calendrier du successeur"
+    ]
 
 
 @mcp.tool()
+@memoized_tool("createGanttChart", returns_stable_id)
 def createGanttChart(
     project_name: str,
     start_date: str,
-    tasks: list
+    tasks: list = None,
+    holiday_sets: list = None,
+    holidays: list = None,
+    schedule_id: str = None,
+    detail: str = "full",
+    output_format: str = "rows",
+    page_size: int = None,
+    cursor: str = None,
+    critical_only: bool = False,
+    window_start: str = None,
+    window_end: str = None,
+    calendars: dict = None,
+    trade_calendars: dict = None
 ) -> dict:
     """
     Crée un diagramme de Gantt pour le planning du projet.
 
     :param project_name: Nom du projet
     :param start_date: Date de début du projet (format YYYY-MM-DD)
-    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], trade}
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], trade} ; une dépendance est un nom
+                  de tâche (fin-début) ou {task, type: FS|SS|FF|SF, lag: jours ouvrés, négatif pour un recouvrement}
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :param detail: "full" (toutes les tâches) ou "summary" (synthèse + schedule_id)
+    :param output_format: "rows" (une entrée par tâche) ou "columnar" (tableaux parallèles, dates en jours depuis start_date)
+    :param page_size: Nombre de tâches par page (défaut : toutes)
+    :param cursor: Curseur next_cursor renvoyé par la page précédente
+    :param critical_only: Ne renvoyer que les tâches critiques
+    :param window_start: Ne renvoyer que les tâches actives à partir de cette date (YYYY-MM-DD)
+    :param window_end: Ne renvoyer que les tâches actives jusqu'à cette date (YYYY-MM-DD)
+    :param calendars: Calendriers nommés {nom: {base: standard|samedi|continu, weekmask, holidays,
+                      closures: [{start, end}]}} en plus des préréglages standard, samedi et continu
+    :param trade_calendars: Calendrier par corps de métier {trade: nom} ; le champ calendar d'une tâche prime
     :return: Données du diagramme de Gantt
     """
+    if detail not in DETAIL_LEVELS:
+        return {"error": "Niveau de détail invalide. Utiliser 'full' ou 'summary'"}
+    if output_format not in OUTPUT_FORMATS:
+        return {"error": "Format de sortie invalide. Utiliser 'rows' ou 'columnar'"}
+
     try:
         project_start = datetime.strptime(start_date, "%Y-%m-%d")
     except ValueError:
         return {"error": "Format de date invalide. Utiliser YYYY-MM-DD"}
 
-    # Dictionnaire pour stocker les tâches avec leurs dates
-    task_schedule = {}
-
-    # Fonction récursive pour calculer la date de début d'une tâche
-    def calculate_task_start(task_name: str, task_data: dict, processed: set) -> datetime:
-        if task_name in processed:
-            return task_schedule[task_name]["start"]
-
-        dependencies = task_data.get("dependencies", [])
-
-        if not dependencies:
-            # Pas de dépendances, commence au début du projet
-            return project_start
-
-        # Trouver la fin la plus tardive parmi les dépendances
-        latest_end = project_start
-        for dep_name in dependencies:
-            dep_task = next((t for t in tasks if t["name"] == dep_name), None)
-            if dep_task:
-                dep_start = calculate_task_start(dep_name, dep_task, processed)
-                dep_end = calculate_end_date(dep_start, dep_task["duration_days"])
-                if dep_end > latest_end:
-                    latest_end = dep_end
-
-        return latest_end
-
-    # Calculer le planning pour chaque tâche
-    processed_tasks = set()
-    gantt_data = []
-
-    for task in tasks:
-        task_name = task["name"]
-        task_start = calculate_task_start(task_name, task, processed_tasks)
-        task_end = calculate_end_date(task_start, task["duration_days"])
-
-        task_schedule[task_name] = {
-            "start": task_start,
-            "end": task_end,
-            "duration_days": task["duration_days"]
-        }
-
-        gantt_entry = {
-            "task_name": task_name,
-            "trade": task.get("trade", "Non spécifié"),
-            "start_date": task_start.strftime("%Y-%m-%d"),
-            "end_date": task_end.strftime("%Y-%m-%d"),
-            "duration_days": task["duration_days"],
-            "dependencies": task.get("dependencies", []),
-            "week_number": task_start.isocalendar()[1]
-        }
+    try:
+        calendar = get_calendar(holiday_sets or [], holidays or [])
+        window = parse_window(window_start, window_end)
+    except ValueError as e:
+        return {"error": str(e)}
 
-        gantt_data.append(gantt_entry)
-        processed_tasks.add(task_name)
+    # Graphe indexé par nom et ordre topologique : chaque tâche est planifiée une seule fois
+    try:
+        tasks = load_tasks(tasks, schedule_id)
+        digest = tasks_digest(tasks)
+        artifacts = planning_artifacts(tasks, digest)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    graph = artifacts.graph
+    earliest_start, earliest_finish = artifacts.forward
+    notes = calendar_notes(calendar)
+    try:
+        schedule = calendar_schedule(artifacts, project_start, calendars, trade_calendars, holiday_sets, holidays)
+    except ValueError as e:
+        return {"error": str(e)}
+    if schedule is not None:
+        # Dates déjà placées sur le calendrier de chaque tâche, en jours calendaires depuis le début
+        earliest_start, earliest_finish = schedule.earliest_start, schedule.earliest_finish
+        calendar = get_calendar(weekmask=CALENDAR_PRESETS["continu"])
+        notes += multi_calendar_notes(schedule)
 
     # Calculer la date de fin du projet
-    project_end = max([task_schedule[t]["end"] for t in task_schedule])
+    project_end = calculate_end_date(project_start, max(earliest_finish, default=0), calendar=calendar)
     total_duration = (project_end - project_start).days
-
-    return {
-        "project_info": {
-            "name": project_name,
-            "start_date": project_start.strftime("%Y-%m-%d"),
-            "end_date": project_end.strftime("%Y-%m-%d"),
-            "total_duration_days": total_duration,
-            "total_duration_weeks": round(total_duration / 7, 1)
-        },
-        "gantt_chart": sorted(gantt_data, key=lambda x: x["start_date"]),
-        "notes": [
-            "Les week-ends sont exclus des calculs",
-            "Prévoir marge de 10-15% pour intempéries",
-            "Vérifier disponibilité des ressources"
-        ]
+    project_info = {
+        "name": project_name,
+        "start_date": project_start.strftime("%Y-%m-%d"),
+        "end_date": project_end.strftime("%Y-%m-%d"),
+        "total_duration_days": total_duration,
+        "total_duration_weeks": round(total_duration / 7, 1)
     }
+    notes += [
+        "Prévoir marge de 10-15% pour intempéries",
+        "Vérifier disponibilité des ressources"
+    ]
+
+    if detail == "summary":
+        return {
+            "schedule_id": summary_schedule_id(tasks, schedule_id, project_name),
+            "project_info": project_info,
+            "tasks_count": len(graph),
+            "notes": notes
+        }
+
+    # Ordre d'affichage par date de début (jour ouvré entamé), puis ordre de saisie
+    order = sorted(range(len(graph)), key=lambda i: (math.ceil(earliest_start[i]), i))
+    critical = None
+    if critical_only:
+        cpm = schedule or artifacts.cpm
+        critical = [cpm.is_critical(i) for i in range(len(graph))]
+    order = select_tasks(order, calendar, project_start, earliest_start, earliest_finish, window, critical)
+
+    # Le curseur est lié au contenu des tâches et aux calendriers, pas seulement à leur nombre
+    fingerprint = query_fingerprint(
+        "gantt", digest, start_date, sorted(set(holiday_sets or [])), sorted(set(holidays or [])),
+        calendars, trade_calendars, critical_only, window_start, window_end
+    )
+    try:
+        page, page_info = paginate(order, page_size, cursor, fingerprint)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    result = {"project_info": project_info}
+
+    if output_format == "columnar":
+        origin = project_start.toordinal()
+        trades = TradeTable()
+        result["gantt_columns"] = {
+            "task_index": list(page),
+            "task_name": [graph.names[i] for i in page],
+            "trade": [trades.code(tasks[i].get("trade", "Non spécifié")) for i in page],
+            "start_day": [calendar.offset_ordinal(origin, earliest_start[i]) - origin for i in page],
+            "end_day": [calendar.offset_ordinal(origin, earliest_finish[i]) - origin for i in page],
+            "duration_days": [graph.durations[i] for i in page],
+            "dependencies": [list(graph.preds[i]) for i in page]
+        }
+        if graph.typed:
+            result["gantt_columns"]["dependency_types"] = [
+                [LINK_TYPES[kind] for kind in graph.pred_kinds[i]] for i in page
+            ]
+            result["gantt_columns"]["dependency_lags"] = [list(graph.pred_lags[i]) for i in page]
+        if schedule is not None:
+            result["gantt_columns"]["calendar"] = [schedule.calendar_names[i] for i in page]
+        result["trade_table"] = trades.labels
+        result["columns_info"] = (
+            "start_day/end_day : jours calendaires depuis start_date ; trade : index dans trade_table ; "
+            "dependencies : valeurs de task_index"
+        )
+    else:
+        gantt_data = []
+        for i in page:
+            task = tasks[i]
+            task_start = calculate_end_date(project_start, earliest_start[i], calendar=calendar)
+            task_end = calculate_end_date(project_start, earliest_finish[i], calendar=calendar)
+
+            gantt_data.append({
+                "task_name": task["name"],
+                "trade": task.get("trade", "Non spécifié"),
+                "start_date": task_start.strftime("%Y-%m-%d"),
+                "end_date": task_end.strftime("%Y-%m-%d"),
+                "duration_days": task["duration_days"],
+                "dependencies": task.get("dependencies", []),
+                "week_number": task_start.isocalendar()[1]
+            })
+            if schedule is not None:
+                gantt_data[-1]["calendar"] = schedule.calendar_names[i]
+        result["gantt_chart"] = gantt_data
+
+    if page_info is not None:
+        result["page"] = page_info
+    result["notes"] = notes
+    return result
 
 
 @mcp.tool()
+@memoized_tool("detectCriticalPath", returns_stable_id)
 def detectCriticalPath(
-    tasks: list
+    tasks: list = None,
+    start_date: str = None,
+    holiday_sets: list = None,
+    holidays: list = None,
+    schedule_id: str = None,
+    detail: str = "full",
+    output_format: str = "rows",
+    page_size: int = None,
+    cursor: str = None,
+    critical_only: bool = False,
+    window_start: str = None,
+    window_end: str = None,
+    calendars: dict = None,
+    trade_calendars: dict = None
 ) -> dict:
     """
     Identifie le chemin critique du projet (séquence de tâches déterminant la durée minimale).
 
-    :param tasks: Liste de tâches avec {name, duration_days, dependencies[]}
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[]} ; une dépendance est un nom
+                  de tâche (fin-début) ou {task, type: FS|SS|FF|SF, lag: jours ouvrés, négatif pour un recouvrement}
+    :param start_date: Date de début optionnelle (YYYY-MM-DD) pour convertir les jours ouvrés en dates
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :param detail: "full" (analyse par tâche) ou "summary" (chemin critique + schedule_id)
+    :param output_format: "rows" (une entrée par tâche) ou "columnar" (tableaux parallèles en jours ouvrés)
+    :param page_size: Nombre de tâches par page (défaut : toutes)
+    :param cursor: Curseur next_cursor renvoyé par la page précédente
+    :param critical_only: Ne renvoyer que les tâches critiques
+    :param window_start: Ne renvoyer que les tâches actives à partir de cette date (YYYY-MM-DD, nécessite start_date)
+    :param window_end: Ne renvoyer que les tâches actives jusqu'à cette date (YYYY-MM-DD, nécessite start_date)
+    :param calendars: Calendriers nommés {nom: {base: standard|samedi|continu, weekmask, holidays,
+                      closures: [{start, end}]}} en plus des préréglages standard, samedi et continu
+    :param trade_calendars: Calendrier par corps de métier {trade: nom} ; le champ calendar d'une tâche prime.
+                            Nécessite start_date ; les dates sont alors en jours calendaires depuis start_date
+                            et les marges en jours ouvrés du calendrier de chaque tâche
     :return: Chemin critique et analyse
     """
-    # Construction du graphe de dépendances
-    task_dict = {task["name"]: task for task in tasks}
-
-    # Calcul des dates au plus tôt (forward pass)
-    earliest_start = {}
-    earliest_finish = {}
-
-    def calculate_earliest(task_name: str, visited: set) -> int:
-        if task_name in visited:
-            return earliest_finish[task_name]
-
-        visited.add(task_name)
-        task = task_dict[task_name]
-        dependencies = task.get("dependencies", [])
-
-        if not dependencies:
-            earliest_start[task_name] = 0
-        else:
-            earliest_start[task_name] = max(
-                calculate_earliest(dep, visited) for dep in dependencies
-            )
-
-        earliest_finish[task_name] = earliest_start[task_name] + task["duration_days"]
-        return earliest_finish[task_name]
-
-    # Calculer pour toutes les tâches
-    visited_set = set()
-    for task in tasks:
-        calculate_earliest(task["name"], visited_set)
-
-    # Durée totale du projet
-    project_duration = max(earliest_finish.values())
-
-    # Calcul des dates au plus tard (backward pass)
-    latest_start = {}
-    latest_finish = {}
-
-    # Initialiser les tâches finales
-    for task_name, ef in earliest_finish.items():
-        if ef == project_duration:
-            latest_finish[task_name] = project_duration
-
-    def calculate_latest(task_name: str, visited: set):
-        if task_name in visited:
-            return
-
-        visited.add(task_name)
-        task = task_dict[task_name]
-
-        # Trouver les tâches qui dépendent de celle-ci
-        dependents = [
-            t["name"] for t in tasks
-            if task_name in t.get("dependencies", [])
-        ]
-
-        if not dependents:
-            # Tâche finale
-            latest_finish[task_name] = project_duration
-        else:
-            # Calculer d'abord les dépendants
-            for dep in dependents:
-                if dep not in visited:
-                    calculate_latest(dep, visited)
-
-            latest_finish[task_name] = min(
-                latest_start[dep] for dep in dependents
-            )
-
-        latest_start[task_name] = latest_finish[task_name] - task["duration_days"]
-
-    # Calculer pour toutes les tâches
-    visited_set_backward = set()
-    # Commencer par les tâches finales
-    final_tasks = [name for name, ef in earliest_finish.items() if ef == project_duration]
-    for task_name in final_tasks:
-        calculate_latest(task_name, visited_set_backward)
+    if detail not in DETAIL_LEVELS:
+        return {"error": "Niveau de détail invalide. Utiliser 'full' ou 'summary'"}
+    if output_format not in OUTPUT_FORMATS:
+        return {"error": "Format de sortie invalide. Utiliser 'rows' ou 'columnar'"}
+
+    project_start = None
+    if start_date:
+        try:
+            project_start = datetime.strptime(start_date, "%Y-%m-%d")
+        except ValueError:
+            return {"error": "Format de date invalide. Utiliser YYYY-MM-DD"}
+    try:
+        calendar = get_calendar(holiday_sets or [], holidays or [])
+        window = parse_window(window_start, window_end)
+    except ValueError as e:
+        return {"error": str(e)}
+    if window is not None and project_start is None:
+        return {"error": "Le filtre par fenêtre de dates nécessite start_date"}
+
+    # Construction du graphe indexé et passes avant/arrière en O(V+E)
+    try:
+        tasks = load_tasks(tasks, schedule_id)
+        digest = tasks_digest(tasks)
+        artifacts = planning_artifacts(tasks, digest)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    graph = artifacts.graph
+    cpm = artifacts.cpm
+    project_duration = cpm.project_duration
+    project_calendar = calendar
+    try:
+        schedule = calendar_schedule(artifacts, project_start, calendars, trade_calendars, holiday_sets, holidays)
+    except ValueError as e:
+        return {"error": str(e)}
+    if schedule is not None:
+        # Dates en jours calendaires depuis le début : conversion par le calendrier continu ;
+        # la durée du projet reste exprimée en jours ouvrés du calendrier du projet
+        cpm = schedule
+        calendar = get_calendar(weekmask=CALENDAR_PRESETS["continu"])
+        origin = project_start.toordinal()
+        project_duration = project_calendar.count(origin, origin + schedule.project_duration)
+    critical_path = [graph.names[i] for i in cpm.critical_indices()]
+
+    # Tri stable : à début égal, les tâches restent dans l'ordre de saisie
+    order = sorted(range(len(graph)), key=cpm.earliest_start.__getitem__) if detail == "full" else []
+    critical = [cpm.is_critical(i) for i in range(len(graph))] if critical_only else None
+    order = select_tasks(order, calendar, project_start, cpm.earliest_start, cpm.earliest_finish, window, critical)
+
+    fingerprint = query_fingerprint(
+        "cpm", digest, start_date, sorted(set(holiday_sets or [])), sorted(set(holidays or [])),
+        calendars, trade_calendars, critical_only, window_start, window_end
+    )
+    try:
+        page, page_info = paginate(order, page_size, cursor, fingerprint)
+    except ValueError as e:
+        return {"error": str(e)}
 
-    # Identifier les tâches critiques (marge = 0)
-    critical_tasks = []
     task_analysis = []
-
-    for task_name in task_dict:
-        if task_name not in latest_start:
-            continue
-
-        slack = latest_start[task_name] - earliest_start[task_name]
+    for i in (page if output_format == "rows" else []):
+        task_name = graph.names[i]
+        slack = cpm.total_float[i]
         is_critical = slack == 0
 
-        if is_critical:
-            critical_tasks.append(task_name)
-
         task_analysis.append({
             "task_name": task_name,
-            "duration_days": task_dict[task_name]["duration_days"],
-            "earliest_start": earliest_start[task_name],
-            "earliest_finish": earliest_finish[task_name],
-            "latest_start": latest_start[task_name],
-            "latest_finish": latest_finish[task_name],
+            "duration_days": graph.durations[i],
+            "earliest_start": cpm.earliest_start[i],
+            "earliest_finish": cpm.earliest_finish[i],
+            "latest_start": cpm.latest_start[i],
+            "latest_finish": cpm.latest_finish[i],
             "slack_days": slack,
+            "total_float_days": slack,
+            "free_float_days": cpm.free_float[i],
             "is_critical": is_critical,
             "priority": "CRITIQUE" if is_critical else "NORMALE" if slack <= 5 else "FLEXIBLE"
         })
+        if schedule is not None:
+            task_analysis[-1]["calendar"] = schedule.calendar_names[i]
 
-    # Reconstruire le chemin critique
-    critical_path = []
-    current_tasks = [t for t in critical_tasks if not any(
-        t in task_dict[other].get("dependencies", [])
-        for other in critical_tasks
-    )]
-
-    while current_tasks:
-        task_name = current_tasks.pop(0)
-        critical_path.append(task_name)
-
-        # Trouver les successeurs critiques
-        successors = [
-            t for t in critical_tasks
-            if task_name in task_dict[t].get("dependencies", [])
-            and t not in critical_path
-        ]
-        current_tasks.extend(successors)
+        if project_start is not None:
+            task_analysis[-1].update({
+                "earliest_start_date": calendar.offset(project_start, cpm.earliest_start[i]).strftime("%Y-%m-%d"),
+                "latest_finish_date": calendar.offset(project_start, cpm.latest_finish[i]).strftime("%Y-%m-%d")
+            })
 
-    return {
+    result = {
         "project_duration_days": project_duration,
         "critical_path": critical_path,
-        "critical_tasks_count": len(critical_tasks),
-        "task_analysis": sorted(task_analysis, key=lambda x: x["earliest_start"]),
+        "critical_tasks_count": len(critical_path),
+        "task_analysis": task_analysis,
+        "unknown_dependencies": graph.unknown_dependencies,
         "recommendations": [
-            f"Surveiller étroitement les {len(critical_tasks)} tâches critiques",
+            f"Surveiller étroitement les {len(critical_path)} tâches critiques",
             "Tout retard sur le chemin critique retarde le projet entier",
             "Allouer des ressources prioritaires aux tâches critiques",
             "Anticiper les risques sur ces tâches"
         ]
     }
 
+    if project_start is not None:
+        end_offset = project_duration if schedule is None else schedule.project_duration
+        result["project_end_date"] = calendar.offset(project_start, end_offset).strftime("%Y-%m-%d")
+    if schedule is not None:
+        result["calendar_notes"] = multi_calendar_notes(schedule)
+
+    if detail == "full" and output_format == "columnar":
+        del result["task_analysis"]
+        columns = {
+            "task_index": list(page),
+            "task_name": [graph.names[i] for i in page]
+        }
+        for field, values in (
+            ("duration_days", graph.durations),
+            ("earliest_start", cpm.earliest_start),
+            ("earliest_finish", cpm.earliest_finish),
+            ("latest_start", cpm.latest_start),
+            ("latest_finish", cpm.latest_finish),
+            ("total_float_days", cpm.total_float),
+            ("free_float_days", cpm.free_float)
+        ):
+            columns[field] = [values[i] for i in page]
+        columns["is_critical"] = [cpm.is_critical(i) for i in page]
+        result["task_columns"] = columns
+        result["columns_info"] = "Valeurs en jours ouvrés depuis le début du projet"
+        if schedule is not None:
+            columns["calendar"] = [schedule.calendar_names[i] for i in page]
+            result["columns_info"] = (
+                "Dates en jours calendaires depuis start_date ; marges en jours ouvrés du calendrier de la tâche"
+            )
+
+    if detail == "full" and page_info is not None:
+        result["page"] = page_info
+
+    if detail == "summary":
+        del result["task_analysis"]
+        result["schedule_id"] = summary_schedule_id(tasks, schedule_id)
+
+    return result
+
 
 @mcp.tool()
+@memoized_tool("optimizeResourceAllocation", returns_stable_id)
 def optimizeResourceAllocation(
-    tasks: list,
-    available_resources: dict,
-    start_date: str
+    tasks: list = None,
+    available_resources: dict = None,
+    start_date: str = None,
+    holiday_sets: list = None,
+    holidays: list = None,
+    resolution: str = "interval",
+    schedule_id: str = None,
+    detail: str = "full"
 ) -> dict:
     """
     Optimise l'allocation des ressources pour éviter les sur/sous-utilisations.
 
-    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], required_resources{trade: count}}
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], required_resources{trade: count}} ;
+                  une dépendance est un nom de tâche (fin-début) ou {task, type: FS|SS|FF|SF, lag}
     :param available_resources: Ressources disponibles {trade: max_count}
     :param start_date: Date de début (YYYY-MM-DD)
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :param resolution: "interval" (profils constants par morceaux) ou "day" (détail jour par jour)
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :param detail: "full" (profils détaillés) ou "summary" (statistiques + schedule_id)
     :return: Planning optimisé des ressources
     """
+    if resolution not in ("interval", "day"):
+        return {"error": "Résolution invalide. Utiliser 'interval' ou 'day'"}
+    if detail not in DETAIL_LEVELS:
+        return {"error": "Niveau de détail invalide. Utiliser 'full' ou 'summary'"}
+    if available_resources is None or start_date is None:
+        return {"error": "Fournir available_resources et start_date"}
+
     try:
         project_start = datetime.strptime(start_date, "%Y-%m-%d")
     except ValueError:
         return {"error": "Format de date invalide"}
 
-    # Première passe : calculer le planning sans contraintes de ressources
-    task_schedule = {}
-
-    def calculate_task_dates(task_name: str, task_data: dict, processed: set):
-        if task_name in processed:
-            return
-
-        dependencies = task_data.get("dependencies", [])
-
-        if not dependencies:
-            task_start = project_start
-        else:
-            latest_dep_end = project_start
-            for dep in dependencies:
-                dep_task = next((t for t in tasks if t["name"] == dep), None)
-                if dep_task and dep not in processed:
-                    calculate_task_dates(dep, dep_task, processed)
-
-                if dep in task_schedule:
-                    dep_end = task_schedule[dep]["end"]
-                    if dep_end > latest_dep_end:
-                        latest_dep_end = dep_end
-
-            task_start = latest_dep_end
-
-        task_end = calculate_end_date(task_start, task_data["duration_days"])
-
-        task_schedule[task_name] = {
-            "start": task_start,
-            "end": task_end,
-            "duration": task_data["duration_days"],
-            "resources": task_data.get("required_resources", {})
-        }
-
-        processed.add(task_name)
-
-    # Calculer les dates pour toutes les tâches
-    processed = set()
-    for task in tasks:
-        calculate_task_dates(task["name"], task, processed)
+    try:
+        calendar = get_calendar(holiday_sets or [], holidays or [])
+    except ValueError as e:
+        return {"error": str(e)}
 
-    # Analyse de l'utilisation des ressources par période
-    project_end = max(t["end"] for t in task_schedule.values())
-    current_date = project_start
+    # Première passe : calculer le planning sans contraintes de ressources
+    try:
+        tasks = load_tasks(tasks, schedule_id)
+        artifacts = planning_artifacts(tasks)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    graph = artifacts.graph
+    earliest_start, earliest_finish = artifacts.forward
+    start_ordinal = project_start.toordinal()
+    starts = [calendar.offset_ordinal(start_ordinal, es) for es in earliest_start]
+    ends = [calendar.offset_ordinal(start_ordinal, ef) for ef in earliest_finish]
+    project_end = datetime.fromordinal(max(ends, default=start_ordinal))
+
+    # Profil de charge par balayage des événements début/fin (fin de projet incluse)
+    profile = ResourceProfile(
+        starts,
+        ends,
+        [task.get("required_resources", {}) for task in tasks],
+        start_ordinal,
+        project_end.toordinal() + 1,
+        trades=list(available_resources.keys())
+    )
+    conflict_segments = profile.conflicts(available_resources)
+    conflict_days = sum(c["end"] - c["start"] for c in conflict_segments)
 
-    resource_timeline = []
     conflicts = []
-
-    while current_date <= project_end:
-        daily_usage = {trade: 0 for trade in available_resources.keys()}
-
-        # Compter les ressources utilisées ce jour
-        active_tasks = []
-        for task_name, schedule in task_schedule.items():
-            if schedule["start"] <= current_date < schedule["end"]:
-                active_tasks.append(task_name)
-                for trade, count in schedule["resources"].items():
-                    daily_usage[trade] = daily_usage.get(trade, 0) + count
-
-        # Détecter les conflits
-        day_conflicts = []
-        for trade, usage in daily_usage.items():
-            if trade in available_resources and usage > available_resources[trade]:
-                day_conflicts.append({
-                    "trade": trade,
-                    "required": usage,
-                    "available": available_resources[trade],
-                    "overflow": usage - available_resources[trade]
+    resource_timeline = None
+    if resolution == "day":
+        # Expansion jour par jour, uniquement sur demande
+        resource_timeline = []
+        for day, usage in (profile.daily() if detail == "full" else ()):
+            daily_usage = {trade: usage[k] for k, trade in enumerate(profile.trades)}
+            resource_timeline.append({
+                "date": format_ordinal(day),
+                "usage": daily_usage,
+                "utilization_percent": {
+                    trade: round((daily_usage.get(trade, 0) / available_resources[trade] * 100), 1)
+                    for trade in available_resources.keys()
+                    if available_resources[trade] > 0
+                }
+            })
+        for segment in conflict_segments:
+            for day in range(segment["start"], segment["end"]):
+                if len(conflicts) >= 10:
+                    break
+                conflicts.append({
+                    "date": format_ordinal(day),
+                    "conflicts": segment["conflicts"],
+                    "active_tasks": [graph.names[i] for i in profile.active_tasks(day)]
                 })
-
-        if day_conflicts:
+    else:
+        for segment in conflict_segments[:10]:
             conflicts.append({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "conflicts": day_conflicts,
-                "active_tasks": active_tasks
+                "start_date": format_ordinal(segment["start"]),
+                "end_date": format_ordinal(segment["end"] - 1),
+                "days": segment["end"] - segment["start"],
+                "conflicts": segment["conflicts"],
+                "active_tasks": [graph.names[i] for i in profile.active_tasks(segment["start"])]
             })
 
-        resource_timeline.append({
-            "date": current_date.strftime("%Y-%m-%d"),
-            "usage": daily_usage,
-            "utilization_percent": {
-                trade: round((daily_usage.get(trade, 0) / available_resources[trade] * 100), 1)
-                for trade in available_resources.keys()
-                if available_resources[trade] > 0
-            }
-        })
-
-        current_date += timedelta(days=1)
-
-    # Calculer les statistiques d'utilisation
+    # Calculer les statistiques d'utilisation sur les intervalles
     avg_utilization = {}
     for trade in available_resources.keys():
         if available_resources[trade] > 0:
-            total_util = sum(
-                day["usage"].get(trade, 0) / available_resources[trade]
-                for day in resource_timeline
+            avg_utilization[trade] = round(
+                profile.usage_days(trade) / available_resources[trade] / profile.total_days * 100, 1
             )
-            avg_utilization[trade] = round((total_util / len(resource_timeline) * 100), 1)
 
     # Recommandations
     recommendations = []
-    if conflicts:
-        recommendations.append(f"⚠️ {len(conflicts)} jour(s) avec conflits de ressources détectés")
+    if conflict_days:
+        recommendations.append(f"⚠️ {conflict_days} jour(s) avec conflits de ressources détectés")
         recommendations.append("Considérer l'ajout de ressources ou le décalage de tâches non-critiques")
 
     for trade, util in avg_utilization.items():
@@ -399,17 +785,20 @@ def optimizeResourceAllocation(
         elif util > 90:
             recommendations.append(f"{trade}: Sur-utilisation ({util}%) - ajouter des ressources?")
 
-    return {
+    result = {
         "summary": {
             "project_start": project_start.strftime("%Y-%m-%d"),
             "project_end": project_end.strftime("%Y-%m-%d"),
             "total_days": (project_end - project_start).days,
-            "conflicts_detected": len(conflicts) > 0,
-            "conflict_days_count": len(conflicts)
+            "conflicts_detected": conflict_days > 0,
+            "conflict_days_count": conflict_days,
+            "conflict_periods_count": len(conflict_segments),
+            "resolution": resolution
         },
         "available_resources": available_resources,
         "average_utilization_percent": avg_utilization,
-        "resource_conflicts": conflicts[:10],  # Limiter à 10 premiers conflits
+        "peak_usage": {trade: profile.peak(trade) for trade in profile.trades},
+        "resource_conflicts": conflicts,  # Limiter à 10 premiers conflits
         "recommendations": recommendations,
         "optimization_tips": [
             "Privilégier les tâches sur le chemin critique",
@@ -418,6 +807,1058 @@ def optimizeResourceAllocation(
         ]
     }
 
+    if detail == "summary":
+        result["schedule_id"] = summary_schedule_id(tasks, schedule_id)
+    elif resolution == "day":
+        result["resource_timeline"] = resource_timeline
+    else:
+        result["resource_profile"] = {
+            trade: [
+                {"start_date": format_ordinal(start), "end_date": format_ordinal(end - 1), "usage": usage}
+                for start, end, usage in profile.trade_intervals(trade)
+            ]
+            for trade in profile.trades
+        }
+
+    return result
+
+
+@mcp.tool()
+@memoized_tool("levelResources")
+def levelResources(
+    tasks: list = None,
+    available_resources: dict = None,
+    start_date: str = None,
+    priority_rule: str = "least_float",
+    holiday_sets: list = None,
+    holidays: list = None,
+    schedule_id: str = None
+) -> dict:
+    """
+    Lisse les ressources : décale les tâches pour obtenir un planning sans conflit de ressources.
+
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], required_resources{trade: count}} ;
+                  une dépendance est un nom de tâche (fin-début) ou {task, type: FS|SS|FF|SF, lag}
+    :param available_resources: Ressources disponibles {trade: max_count}
+    :param start_date: Date de début (YYYY-MM-DD)
+    :param priority_rule: Règle de priorité (least_float, longest_path, most_resources)
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :return: Planning lissé et décalages par tâche
+    """
+    if available_resources is None or start_date is None:
+        return {"error": "Fournir available_resources et start_date"}
+
+    try:
+        project_start = datetime.strptime(start_date, "%Y-%m-%d")
+    except ValueError:
+        return {"error": "Format de date invalide. Utiliser YYYY-MM-DD"}
+
+    try:
+        calendar = get_calendar(holiday_sets or [], holidays or [])
+        tasks = load_tasks(tasks, schedule_id)
+        artifacts = planning_artifacts(tasks)
+        graph = artifacts.graph
+        leveled = serial_schedule(
+            graph,
+            [task.get("required_resources", {}) for task in tasks],
+            available_resources,
+            priority_rule,
+            cpm=artifacts.cpm
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+
+    cpm = leveled["cpm"]
+    schedule = []
+    delayed_tasks = 0
+    for i, task_name in enumerate(graph.names):
+        shift = leveled["start"][i] - cpm.earliest_start[i]
+        if shift > 0:
+            delayed_tasks += 1
+        schedule.append({
+            "task_name": task_name,
+            "trade": tasks[i].get("trade", "Non spécifié"),
+            "start_date": calendar.offset(project_start, leveled["start"][i]).strftime("%Y-%m-%d"),
+            "end_date": calendar.offset(project_start, leveled["finish"][i]).strftime("%Y-%m-%d"),
+            "duration_days": graph.durations[i],
+            "shift_days": shift,
+            "total_float_days": cpm.total_float[i]
+        })
+
+    extension = leveled["makespan"] - cpm.project_duration
+
+    recommendations = []
+    if extension > 0:
+        recommendations.append(
+            f"⚠️ Le lissage allonge le projet de {extension} jour(s) ouvré(s) : envisager des ressources supplémentaires"
+        )
+    else:
+        recommendations.append("✅ Lissage absorbé par les marges, sans allongement du projet")
+    if delayed_tasks:
+        recommendations.append(f"{delayed_tasks} tâche(s) décalée(s) : informer les corps de métier concernés")
+
+    return {
+        "summary": {
+            "project_start": project_start.strftime("%Y-%m-%d"),
+            "unleveled_end": calendar.offset(project_start, cpm.project_duration).strftime("%Y-%m-%d"),
+            "leveled_end": calendar.offset(project_start, leveled["makespan"]).strftime("%Y-%m-%d"),
+            "unleveled_duration_days": cpm.project_duration,
+            "leveled_duration_days": leveled["makespan"],
+            "extension_days": extension,
+            "delayed_tasks_count": delayed_tasks,
+            "priority_rule": priority_rule
+        },
+        "available_resources": available_resources,
+        "peak_usage": leveled["peak_usage"],
+        "schedule": sorted(schedule, key=lambda x: x["start_date"]),
+        "recommendations": recommendations
+    }
+
+
+@mcp.tool()
+def levelPortfolio(
+    projects: list,
+    shared_resources: dict,
+    priority_rule: str = "least_float",
+    holiday_sets: list = None,
+    holidays: list = None,
+    workers: int = None,
+    limit: int = 20
+) -> dict:
+    """
+    Lissage multi-projets : détecte et résout les conflits d'équipes partagées entre chantiers simultanés.
+
+    Les projets qui ne partagent aucun corps de métier limité forment des groupes indépendants,
+    lissés en parallèle sur plusieurs processus pour les gros portefeuilles.
+
+    :param projects: Liste de {project_name, start_date (YYYY-MM-DD), tasks[] ou schedule_id} ;
+                     tâches avec {name, duration_days, dependencies[], required_resources{trade: count}}
+    :param shared_resources: Effectifs partagés entre les chantiers {trade: max_count}
+    :param priority_rule: Règle de priorité (least_float, longest_path, most_resources)
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture communs (YYYY-MM-DD)
+    :param workers: Nombre de processus (défaut : automatique selon la taille du portefeuille)
+    :param limit: Nombre maximal de conflits et de tâches décalées listés par projet
+    :return: Conflits inter-chantiers avant lissage, groupes de projets et dates lissées par projet
+    """
+    if not projects or shared_resources is None:
+        return {"error": "Fournir projects et shared_resources"}
+
+    names, starts, project_tasks = [], [], []
+    try:
+        calendar = get_calendar(holiday_sets or [], holidays or [])
+        for k, project in enumerate(projects):
+            name = project.get("project_name") or f"Projet {k + 1}"
+            if name in names:
+                return {"error": f"Projet en double : '{name}'"}
+            if not project.get("start_date"):
+                return {"error": f"start_date manquant pour le projet '{name}'"}
+            names.append(name)
+            starts.append(parse_day(project["start_date"], f"le projet '{name}'"))
+            project_tasks.append(load_tasks(project.get("tasks"), project.get("schedule_id")))
+    except ValueError as e:
+        return {"error": f"{names[-1]} : {e}" if len(project_tasks) < len(names) else str(e)}
+
+    # Axe commun en jours ouvrés depuis le premier démarrage ; un projet ne démarre qu'à sa date
+    origin = min(starts)
+    releases = [
+        calendar.count(origin, start) + (0 if start == origin or calendar.is_working_day(start) else 1)
+        for start in starts
+    ]
+
+    # Conflits avant lissage : profil de charge commun des plannings au plus tôt de chaque projet
+    flat_starts, flat_ends, requirements, owners = [], [], [], []
+    for p, tasks in enumerate(project_tasks):
+        try:
+            earliest_start, earliest_finish = planning_artifacts(tasks).forward
+        except ValueError as e:
+            return {"error": f"{names[p]} : {e}"}
+        flat_starts.extend(calendar.offset_ordinal(starts[p], es) for es in earliest_start)
+        flat_ends.extend(calendar.offset_ordinal(starts[p], ef) for ef in earliest_finish)
+        requirements.extend(
+            {trade: count for trade, count in task.get("required_resources", {}).items() if trade in shared_resources}
+            for task in tasks
+        )
+        owners.extend([p] * len(tasks))
+
+    horizon_end = max(flat_ends, default=origin) + 1
+    profile = ResourceProfile(flat_starts, flat_ends, requirements, origin, horizon_end, trades=list(shared_resources))
+    segments = profile.conflicts(shared_resources)
+
+    # Chantiers impliqués dans chaque surcharge : index d'intervalles sur les tâches mobilisant une équipe partagée
+    loaded = [i for i, req in enumerate(requirements) if req and flat_ends[i] > flat_starts[i]]
+    active = IntervalIndex([flat_starts[i] for i in loaded], [flat_ends[i] - 1 for i in loaded])
+    conflicts = []
+    cross_project_days = 0
+    for segment in segments:
+        overloaded = [c["trade"] for c in segment["conflicts"]]
+        involved = sorted({
+            owners[loaded[k]] for k in active.stabbing(segment["start"]).tolist()
+            if any(trade in requirements[loaded[k]] for trade in overloaded)
+        })
+        if len(involved) > 1:
+            cross_project_days += segment["end"] - segment["start"]
+        if len(conflicts) < limit:
+            conflicts.append({
+                "start_date": format_ordinal(segment["start"]),
+                "end_date": format_ordinal(segment["end"] - 1),
+                "days": segment["end"] - segment["start"],
+                "conflicts": segment["conflicts"],
+                "projects": [names[p] for p in involved]
+            })
+
+    try:
+        leveled = level_portfolio(project_tasks, releases, shared_resources, priority_rule, workers)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    def day(offset: int) -> str:
+        return format_ordinal(calendar.offset_ordinal(origin, offset))
+
+    results = []
+    delayed_total = 0
+    for p, tasks in enumerate(project_tasks):
+        start, finish, earliest = leveled["start"][p], leveled["finish"][p], leveled["earliest_start"][p]
+        shifts = [s - es for s, es in zip(start, earliest)]
+        delayed = [i for i, shift in enumerate(shifts) if shift > 0]
+        delayed_total += len(delayed)
+        delayed.sort(key=lambda i: -shifts[i])
+        unleveled_finish = max((f - s + es for s, f, es in zip(start, finish, earliest)), default=releases[p])
+        leveled_finish = max(finish, default=releases[p])
+        results.append({
+            "project_name": names[p],
+            "cluster": leveled["cluster_of"][p],
+            "start_date": format_ordinal(starts[p]),
+            "unleveled_end": day(unleveled_finish),
+            "leveled_end": day(leveled_finish),
+            "extension_days": leveled_finish - unleveled_finish,
+            "delayed_tasks_count": len(delayed),
+            "largest_shifts": [
+                {
+                    "task_name": tasks[i]["name"],
+                    "shift_days": shifts[i],
+                    "start_date": day(start[i]),
+                    "end_date": day(finish[i])
+                }
+                for i in delayed[:limit]
+            ]
+        })
+
+    extended = [r for r in results if r["extension_days"] > 0]
+    recommendations = []
+    if segments:
+        recommendations.append(
+            f"⚠️ {len(segments)} période(s) de surcharge des équipes partagées avant lissage"
+            + (f", dont {cross_project_days} jour(s) entre plusieurs chantiers" if cross_project_days else "")
+        )
+    else:
+        recommendations.append("✅ Aucun conflit d'équipes partagées entre chantiers")
+    for r in sorted(extended, key=lambda r: -r["extension_days"])[:5]:
+        recommendations.append(
+            f"{r['project_name']} : fin repoussée de {r['extension_days']} jour(s) ouvré(s) par le partage des équipes"
+        )
+
+    return {
+        "summary": {
+            "projects": len(projects),
+            "tasks": len(owners),
+            "independent_clusters": len(leveled["clusters"]),
+            "conflict_periods_count": len(segments),
+            "conflict_days_count": sum(s["end"] - s["start"] for s in segments),
+            "cross_project_conflict_days": cross_project_days,
+            "delayed_tasks_count": delayed_total,
+            "extended_projects_count": len(extended),
+            "priority_rule": priority_rule,
+            "workers": leveled["workers"]
+        },
+        "shared_resources": shared_resources,
+        "clusters": [
+            {"projects": [names[p] for p in cluster["projects"]], "shared_trades": cluster["shared_trades"]}
+            for cluster in leveled["clusters"]
+        ],
+        "resource_conflicts": conflicts,
+        "peak_usage": leveled["peak_usage"],
+        "projects": results,
+        "recommendations": recommendations
+    }
+
+
+@mcp.tool()
+@memoized_tool("buildResourceHistograms")
+def buildResourceHistograms(
+    tasks: list = None,
+    start_date: str = None,
+    holiday_sets: list = None,
+    holidays: list = None,
+    schedule_id: str = None,
+    hourly_rates: dict = None,
+    hours_per_day: float = 8,
+    periods: list = None,
+    basis: str = "early",
+    calendars: dict = None,
+    trade_calendars: dict = None
+) -> dict:
+    """
+    Histogrammes de charge main-d'œuvre et courbes en S de coût par corps de métier, en un seul calcul.
+
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], trade, required_resources{trade: effectif},
+                  cost (coût direct de la tâche en euros, optionnel)}
+    :param start_date: Date de début du projet (YYYY-MM-DD)
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :param hourly_rates: Taux horaires par corps de métier {trade: euros/h} pour le coût de main-d'œuvre
+    :param hours_per_day: Heures travaillées par ouvrier et par jour
+    :param periods: Agrégations à produire parmi "day", "week", "month" (défaut : week et month)
+    :param basis: "early" (dates au plus tôt) ou "late" (dates au plus tard, pour l'enveloppe de la courbe en S)
+    :param calendars: Calendriers nommés {nom: {base, weekmask, holidays, closures: [{start, end}]}}
+    :param trade_calendars: Calendrier par corps de métier {trade: nom} ; le champ calendar d'une tâche prime
+    :return: Histogrammes par période (colonnes parallèles), courbe en S cumulée et synthèse par corps de métier
+    """
+    periods = list(periods) if periods else ["week", "month"]
+    unknown = [period for period in periods if period not in PERIODS]
+    if unknown:
+        return {"error": f"Période inconnue : '{unknown[0]}' (disponibles : {', '.join(PERIODS)})"}
+    if basis not in ("early", "late"):
+        return {"error": "Base invalide. Utiliser 'early' ou 'late'"}
+    if hours_per_day <= 0:
+        return {"error": "hours_per_day doit être positif"}
+    if start_date is None:
+        return {"error": "Fournir start_date"}
+    try:
+        project_start = datetime.strptime(start_date, "%Y-%m-%d")
+    except ValueError:
+        return {"error": "Format de date invalide. Utiliser YYYY-MM-DD"}
+
+    try:
+        calendar = get_calendar(holiday_sets or [], holidays or [])
+        tasks = load_tasks(tasks, schedule_id)
+        artifacts = planning_artifacts(tasks)
+        schedule = calendar_schedule(artifacts, project_start, calendars, trade_calendars, holiday_sets, holidays)
+    except ValueError as e:
+        return {"error": str(e)}
+    if not tasks:
+        return {"error": "Aucune tâche à analyser"}
+
+    origin = project_start.toordinal()
+    if schedule is not None:
+        task_calendars = schedule.calendars
+        if basis == "early":
+            starts, ends = schedule.start_ordinals, schedule.end_ordinals
+        else:
+            starts = [origin + offset for offset in schedule.latest_start]
+            ends = [origin + offset for offset in schedule.latest_finish]
+    else:
+        task_calendars = [calendar] * len(tasks)
+        if basis == "early":
+            first, last = artifacts.forward
+        else:
+            first, last = artifacts.cpm.latest_start, artifacts.cpm.latest_finish
+        starts = [calendar.offset_ordinal(origin, math.ceil(day)) for day in first]
+        ends = [calendar.offset_ordinal(origin, math.ceil(day)) for day in last]
+
+    try:
+        histogram = LoadingHistogram(tasks, starts, ends, task_calendars, hourly_rates, hours_per_day)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    trades = histogram.trade_summary(hours_per_day)
+    total_labor = float(histogram.labor.sum())
+    total_cost = float(histogram.cost.sum())
+    daily_total = histogram.labor.sum(axis=0)
+    peak_day = int(daily_total.argmax()) if len(daily_total) else 0
+    result = {
+        "project_info": {
+            "start_date": project_start.strftime("%Y-%m-%d"),
+            "end_date": format_ordinal(max(ends)),
+            "basis": basis,
+            "total_labor_man_days": round(total_labor, 2),
+            "total_labor_hours": round(total_labor * hours_per_day, 1),
+            "total_cost": round(total_cost, 2),
+            "peak_workers": round(float(daily_total[peak_day]), 2) if len(daily_total) else 0,
+            "peak_date": format_ordinal(int(histogram.days[peak_day]))
+        },
+        "trade_summary": trades,
+        "histograms": {period: histogram.rollup(period) for period in periods},
+        "columns_info": (
+            "Par période : labor_man_days = homme-jours, peak_workers = effectif journalier maximal, "
+            "cost = coût (main-d'œuvre + coûts directs), cumulative_cost / cumulative_percent = courbe en S"
+        )
+    }
+    notes = calendar_notes(calendar)
+    if schedule is not None:
+        notes += multi_calendar_notes(schedule)
+    unrated = [row["trade"] for row in trades if row["labor_man_days"] > 0 and not (hourly_rates or {}).get(row["trade"])]
+    if unrated:
+        notes.append(f"Sans taux horaire (main-d'œuvre non chiffrée) : {', '.join(unrated)}")
+    result["notes"] = notes
+    return result
+
+
+@mcp.tool()
+def exportPlanningData(
+    content: str = "schedule",
+    tasks: list = None,
+    schedule_id: str = None,
+    start_date: str = None,
+    holiday_sets: list = None,
+    holidays: list = None,
+    file_format: str = "arrow",
+    export_name: str = None,
+    available_resources: dict = None,
+    hourly_rates: dict = None,
+    hours_per_day: float = 8,
+    calendars: dict = None,
+    trade_calendars: dict = None
+) -> dict:
+    """
+    Exporte un résultat de planning en colonnes dans un fichier Arrow IPC ou Parquet côté serveur,
+    pour les tableaux de bord (lecture par memory-map sans décodage JSON). Seuls le chemin et une synthèse sont renvoyés.
+
+    :param content: "schedule" (analyse CPM par tâche), "resources" (profil de charge par segments constants)
+                    ou "histogram" (charge et coût journaliers par corps de métier)
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], trade, required_resources{trade: effectif}, cost}
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :param start_date: Date de début (YYYY-MM-DD) ; obligatoire pour resources et histogram
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :param file_format: "arrow" (IPC non compressé, memory-map) ou "parquet" (compressé)
+    :param export_name: Préfixe du fichier (lettres, chiffres, - et _)
+    :param available_resources: Capacités {trade: max_count} pour les colonnes available/overflow de resources
+    :param hourly_rates: Taux horaires {trade: euros/h} pour le coût de histogram
+    :param hours_per_day: Heures travaillées par ouvrier et par jour (histogram)
+    :param calendars: Calendriers nommés {nom: {base, weekmask, holidays, closures: [{start, end}]}}
+    :param trade_calendars: Calendrier par corps de métier {trade: nom} ; le champ calendar d'une tâche prime
+    :return: Chemin du fichier, schéma, nombre de lignes et synthèse
+    """
+    if content not in EXPORT_CONTENTS:
+        return {"error": f"Contenu inconnu : '{content}' (disponibles : {', '.join(EXPORT_CONTENTS)})"}
+    if file_format not in EXPORT_FORMATS:
+        return {"error": f"Format inconnu : '{file_format}' (disponibles : {', '.join(EXPORT_FORMATS)})"}
+    if export_name and not all(c.isalnum() or c in "-_" for c in export_name):
+        return {"error": "export_name ne peut contenir que des lettres, chiffres, - et _"}
+    if content != "schedule" and start_date is None:
+        return {"error": f"L'export '{content}' nécessite start_date"}
+    project_start = None
+    if start_date:
+        try:
+            project_start = datetime.strptime(start_date, "%Y-%m-%d")
+        except ValueError:
+            return {"error": "Format de date invalide. Utiliser YYYY-MM-DD"}
+
+    try:
+        calendar = get_calendar(holiday_sets or [], holidays or [])
+        tasks, digest = resolve_tasks(tasks, schedule_id)
+        artifacts = planning_artifacts(tasks, digest)
+        schedule = calendar_schedule(artifacts, project_start, calendars, trade_calendars, holiday_sets, holidays)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # Nom déterministe : une même demande sur un même planning réécrit le même fichier
+    key = canonical_hash(
+        content, digest, start_date, sorted(holiday_sets or []), sorted(holidays or []),
+        available_resources, hourly_rates, hours_per_day, calendars, trade_calendars
+    )
+    path = os.path.join(EXPORT_DIR, f"{export_name or content}-{key[:16]}{EXPORT_FORMATS[file_format]}")
+
+    graph = artifacts.graph
+    origin = project_start.toordinal() if project_start else None
+    cpm = schedule or artifacts.cpm
+    if schedule is not None:
+        starts, ends = schedule.start_ordinals, schedule.end_ordinals
+        task_calendars = schedule.calendars
+    elif origin is not None:
+        earliest_start, earliest_finish = artifacts.forward
+        starts = [calendar.offset_ordinal(origin, math.ceil(day)) for day in earliest_start]
+        ends = [calendar.offset_ordinal(origin, math.ceil(day)) for day in earliest_finish]
+        task_calendars = [calendar] * len(graph)
+
+    if content == "schedule":
+        columns = schedule_columns(
+            graph, cpm,
+            get_calendar(weekmask=CALENDAR_PRESETS["continu"]) if schedule is not None else calendar,
+            origin,
+            schedule.calendar_names if schedule is not None else None
+        )
+        summary = {
+            "tasks": len(graph),
+            "critical_tasks": sum(1 for i in range(len(graph)) if cpm.is_critical(i)),
+            "project_duration_days": cpm.project_duration
+        }
+    elif content == "resources":
+        end = max(ends, default=origin)
+        profile = ResourceProfile(
+            starts, ends, [task.get("required_resources", {}) for task in tasks], origin, end + 1,
+            trades=list((available_resources or {}).keys())
+        )
+        columns = profile_columns(profile, available_resources)
+        summary = {
+            "segments": len(profile.segments),
+            "peak_usage": {trade: profile.peak(trade) for trade in profile.trades},
+            "conflict_segments": len(profile.conflicts(available_resources)) if available_resources else None
+        }
+    else:
+        try:
+            histogram = LoadingHistogram(tasks, starts, ends, task_calendars, hourly_rates, hours_per_day)
+        except ValueError as e:
+            return {"error": str(e)}
+        columns = histogram_columns(histogram)
+        summary = {
+            "days": len(histogram.days),
+            "total_labor_man_days": round(float(histogram.labor.sum()), 2),
+            "total_cost": round(float(histogram.cost.sum()), 2)
+        }
+
+    try:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        schema = write_table(path, columns, file_format, {
+            "content": content,
+            "start_date": start_date or "",
+            "schedule_id": schedule_id or "",
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+    except ValueError as e:
+        return {"error": str(e)}
+    except OSError as e:
+        return {"error": f"Écriture impossible dans {EXPORT_DIR} : {e}"}
+
+    rows = len(next(iter(columns.values()))) if columns else 0
+    return {
+        "file_path": os.path.realpath(path),
+        "format": file_format,
+        "content": content,
+        "rows": rows,
+        "bytes": os.path.getsize(path),
+        "schema": schema,
+        "summary": summary,
+        "notes": [
+            "Lecture sans copie : pyarrow.ipc.open_file(pyarrow.memory_map(file_path))"
+            if file_format == "arrow" else "Lecture : pyarrow.parquet.read_table(file_path) ou tout moteur Parquet",
+            "Dates en date32 ; *_start/*_finish en jours depuis start_date (ouvrés, ou calendaires en multi-calendrier)"
+        ]
+    }
+
+
+@mcp.tool()
+def findActiveTasks(
+    start_date: str,
+    window_start: str,
+    window_end: str,
+    tasks: list = None,
+    schedule_id: str = None,
+    trade: str = None,
+    holiday_sets: list = None,
+    holidays: list = None,
+    limit: int = 200
+) -> dict:
+    """
+    Tâches actives sur une période (planning prévisionnel / lookahead), via un index d'intervalles.
+
+    :param start_date: Date de début du projet (YYYY-MM-DD)
+    :param window_start: Début de la période (YYYY-MM-DD)
+    :param window_end: Fin de la période, incluse (YYYY-MM-DD)
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], trade}
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :param trade: Ne renvoyer que les tâches de ce corps de métier
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :param limit: Nombre maximal de tâches détaillées
+    :return: Tâches actives triées par date de début
+    """
+    try:
+        artifacts, calendar, project_start, windows = window_context(tasks, schedule_id, start_date, holiday_sets, holidays)
+        lo, hi = parse_day(window_start, "window_start"), parse_day(window_end, "window_end")
+    except ValueError as e:
+        return {"error": str(e)}
+    if lo > hi:
+        return {"error": "window_start doit précéder window_end"}
+
+    if trade:
+        sub = trade_windows(artifacts, windows, trade)
+        ids = [sub["ids"][k] for k in sub["index"].overlapping(lo, hi).tolist()]
+    else:
+        ids = windows["index"].overlapping(lo, hi).tolist()
+
+    rows = window_rows(artifacts, windows, ids, limit)
+    return {
+        "window": {"start_date": format_ordinal(lo), "end_date": format_ordinal(hi), "working_days": calendar.count(lo - 1, hi)},
+        "active_tasks_count": len(ids),
+        "critical_tasks_count": sum(1 for i in ids if artifacts.cpm.is_critical(i)),
+        "active_tasks": rows,
+        "truncated": len(ids) > len(rows)
+    }
+
+
+@mcp.tool()
+def findOverlappingTasks(
+    start_date: str,
+    task_name: str,
+    tasks: list = None,
+    schedule_id: str = None,
+    trade: str = None,
+    holiday_sets: list = None,
+    holidays: list = None,
+    limit: int = 200
+) -> dict:
+    """
+    Tâches dont la période recoupe celle d'une tâche donnée (co-activité, location de grue...).
+
+    :param start_date: Date de début du projet (YYYY-MM-DD)
+    :param task_name: Tâche de référence
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], trade}
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :param trade: Ne renvoyer que les tâches de ce corps de métier
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :param limit: Nombre maximal de tâches détaillées
+    :return: Période de la tâche et tâches concomitantes
+    """
+    try:
+        artifacts, calendar, project_start, windows = window_context(tasks, schedule_id, start_date, holiday_sets, holidays)
+    except ValueError as e:
+        return {"error": str(e)}
+    x = artifacts.graph.index.get(task_name)
+    if x is None:
+        return {"error": f"Tâche inconnue : '{task_name}'"}
+
+    lo, hi = windows["starts"][x], windows["ends"][x]
+    if trade:
+        sub = trade_windows(artifacts, windows, trade)
+        ids = [sub["ids"][k] for k in sub["index"].overlapping(lo, hi).tolist()]
+    else:
+        ids = windows["index"].overlapping(lo, hi).tolist()
+    ids = [i for i in ids if i != x]
+
+    rows = window_rows(artifacts, windows, ids, limit)
+    return {
+        "task": window_rows(artifacts, windows, [x], 1)[0],
+        "overlapping_tasks_count": len(ids),
+        "overlapping_tasks": rows,
+        "truncated": len(ids) > len(rows)
+    }
+
+
+@mcp.tool()
+def findFreeWindows(
+    start_date: str,
+    trade: str,
+    window_start: str,
+    window_end: str,
+    tasks: list = None,
+    schedule_id: str = None,
+    capacity: float = 1,
+    min_days: int = 1,
+    holiday_sets: list = None,
+    holidays: list = None
+) -> dict:
+    """
+    Créneaux libres d'un corps de métier sur une période : jours où sa charge planifiée reste sous la capacité.
+
+    :param start_date: Date de début du projet (YYYY-MM-DD)
+    :param trade: Corps de métier (clé de required_resources, ou champ trade des tâches)
+    :param window_start: Début de la période (YYYY-MM-DD)
+    :param window_end: Fin de la période, incluse (YYYY-MM-DD)
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], trade, required_resources{}}
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :param capacity: Effectif disponible (défaut 1 : créneau libre = aucune tâche du corps de métier en cours)
+    :param min_days: Durée minimale d'un créneau en jours ouvrés
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :return: Créneaux libres avec leur nombre de jours ouvrés
+    """
+    if capacity <= 0:
+        return {"error": "La capacité doit être positive"}
+    try:
+        artifacts, calendar, project_start, windows = window_context(tasks, schedule_id, start_date, holiday_sets, holidays)
+        lo, hi = parse_day(window_start, "window_start"), parse_day(window_end, "window_end")
+    except ValueError as e:
+        return {"error": str(e)}
+    if lo > hi:
+        return {"error": "window_start doit précéder window_end"}
+
+    sub = trade_windows(artifacts, windows, trade)
+    hits = sub["index"].overlapping(lo, hi).tolist()
+    found = free_windows(
+        [sub["starts"][k] for k in hits],
+        [sub["ends"][k] for k in hits],
+        [sub["loads"][k] for k in hits],
+        lo, hi, capacity
+    )
+
+    free = []
+    for first, last in found:
+        working_days = calendar.count(first - 1, last)
+        if working_days >= min_days:
+            free.append({
+                "start_date": format_ordinal(first),
+                "end_date": format_ordinal(last),
+                "working_days": working_days
+            })
+
+    return {
+        "trade": trade,
+        "capacity": capacity,
+        "window": {"start_date": format_ordinal(lo), "end_date": format_ordinal(hi), "working_days": calendar.count(lo - 1, hi)},
+        "scheduled_tasks_in_window": len(hits),
+        "free_windows_count": len(free),
+        "free_windows": free,
+        "free_working_days": sum(w["working_days"] for w in free)
+    }
+
+
+@mcp.tool()
+def compareSchedules(
+    baseline_tasks: list = None,
+    current_tasks: list = None,
+    baseline_schedule_id: str = None,
+    current_schedule_id: str = None,
+    start_date: str = None,
+    match_on: str = "name",
+    holiday_sets: list = None,
+    holidays: list = None,
+    limit: int = 50,
+    min_slip_days: float = 0
+) -> dict:
+    """
+    Compare un planning de référence (baseline) et sa mise à jour : glissements de début et de fin,
+    écarts de durée et de marge par tâche, tâches ajoutées / supprimées et évolution du chemin critique.
+
+    :param baseline_tasks: Tâches du planning de référence
+    :param current_tasks: Tâches du planning à jour
+    :param baseline_schedule_id: Identifiant du planning de référence stocké, à la place de baseline_tasks
+    :param current_schedule_id: Identifiant du planning à jour stocké, à la place de current_tasks
+    :param start_date: Date de début optionnelle (YYYY-MM-DD) pour dater les écarts listés
+    :param match_on: Champ d'appariement des tâches entre versions : "name" (défaut) ou un identifiant
+                     (ex. "source_uid" pour un import MS Project) ; le nom sert à défaut
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :param limit: Nombre maximal de tâches détaillées par liste
+    :param min_slip_days: Glissement minimal (jours ouvrés) pour qu'une tâche sans autre écart soit listée
+    :return: Synthèse des écarts, écarts classés et changements du chemin critique
+    """
+    project_start = None
+    if start_date:
+        try:
+            project_start = datetime.strptime(start_date, "%Y-%m-%d")
+        except ValueError:
+            return {"error": "Format de date invalide. Utiliser YYYY-MM-DD"}
+    if limit < 0:
+        return {"error": "limit doit être positif"}
+    for label, given_tasks, given_id in (("baseline", baseline_tasks, baseline_schedule_id),
+                                         ("current", current_tasks, current_schedule_id)):
+        if given_tasks is None and not given_id:
+            return {"error": f"Fournir '{label}_tasks' ou '{label}_schedule_id'"}
+
+    try:
+        calendar = get_calendar(holiday_sets or [], holidays or [])
+        baseline = planning_artifacts(*resolve_tasks(baseline_tasks, baseline_schedule_id))
+        current = planning_artifacts(*resolve_tasks(current_tasks, current_schedule_id))
+        diff = ScheduleDiff(baseline, current, match_on)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    origin = project_start.toordinal() if project_start else None
+
+    def day(offset: float) -> str:
+        return format_ordinal(calendar.offset_ordinal(origin, offset))
+
+    ranked = diff.ranked(limit, min_slip_days).tolist()
+    deltas = {name: values[ranked].tolist() for name, values in diff.deltas.items()}
+    baseline_float = diff.baseline_float[ranked].tolist()
+    current_float = diff.current_float[ranked].tolist()
+    b_ids = diff.baseline_ids[ranked].tolist()
+    c_ids = diff.current_ids[ranked].tolist()
+    b_start, b_finish = baseline.forward
+    c_start, c_finish = current.forward
+
+    changes = []
+    for k, name in enumerate(diff.names(ranked)):
+        row = {
+            "task_name": name,
+            "start_slip_days": deltas["start"][k],
+            "finish_slip_days": deltas["finish"][k],
+            "duration_change_days": deltas["duration"][k],
+            "float_change_days": deltas["float"][k],
+            "baseline_total_float": baseline_float[k],
+            "current_total_float": current_float[k]
+        }
+        if origin is not None:
+            row.update({
+                "baseline_start": day(b_start[b_ids[k]]),
+                "current_start": day(c_start[c_ids[k]]),
+                "baseline_finish": day(b_finish[b_ids[k]]),
+                "current_finish": day(c_finish[c_ids[k]])
+            })
+        changes.append(row)
+
+    joined, left = diff.critical_changes()
+    project = {
+        "baseline_duration_days": baseline.cpm.project_duration,
+        "current_duration_days": current.cpm.project_duration,
+        "finish_slip_days": current.cpm.project_duration - baseline.cpm.project_duration
+    }
+    if origin is not None:
+        project["baseline_end_date"] = day(baseline.cpm.project_duration)
+        project["current_end_date"] = day(current.cpm.project_duration)
+
+    return {
+        "match_on": match_on,
+        "project": project,
+        "summary": diff.summary(),
+        "ranked_changes": changes,
+        "critical_path_changes": {
+            "became_critical_count": len(joined),
+            "became_critical": diff.names(joined[:limit]),
+            "no_longer_critical_count": len(left),
+            "no_longer_critical": diff.names(left[:limit])
+        },
+        "added_tasks": [current.graph.names[i] for i in diff.added_ids[:limit].tolist()],
+        "removed_tasks": [baseline.graph.names[i] for i in diff.removed_ids[:limit].tolist()],
+        "calendar_notes": calendar_notes(calendar)
+    }
+
+
+EDIT_OPERATIONS = ("change_duration", "add_link", "remove_link", "insert_task")
+
+
+@mcp.tool()
+def openSchedule(
+    tasks: list = None,
+    schedule_id: str = None
+) -> dict:
+    """
+    Ouvre un planning côté serveur pour des modifications incrémentales (editSchedule).
+
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], trade}
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :return: Identifiant du planning et synthèse CPM
+    """
+    try:
+        tasks = load_tasks(tasks, schedule_id)
+        schedule = IncrementalSchedule(tasks)
+        if not schedule_id:
+            schedule_id = SCHEDULE_STORE.put(tasks).schedule_id
+    except ValueError as e:
+        return {"error": str(e)}
+
+    SCHEDULE_HANDLES[schedule_id] = schedule
+    critical_path = schedule.critical_path()
+
+    return {
+        "schedule_id": schedule_id,
+        "tasks_count": len(schedule),
+        "project_duration_days": schedule.project_duration,
+        "critical_tasks_count": len(critical_path),
+        "critical_path": critical_path[:50]
+    }
+
+
+@mcp.tool()
+def editSchedule(
+    schedule_id: str,
+    operation: str,
+    task_name: str = None,
+    duration_days: float = None,
+    predecessor: str = None,
+    successor: str = None,
+    dependencies: list = None,
+    successors: list = None,
+    trade: str = "Non spécifié"
+) -> dict:
+    """
+    Applique une modification unitaire à un planning ouvert et renvoie uniquement les tâches impactées.
+
+    :param schedule_id: Identifiant renvoyé par openSchedule
+    :param operation: change_duration (task_name, duration_days), add_link / remove_link (predecessor, successor),
+                      insert_task (task_name, duration_days, dependencies[], successors[], trade)
+    :return: Nouvelle durée du projet et tâches dont les dates ou marges ont changé
+    """
+    schedule = SCHEDULE_HANDLES.get(schedule_id)
+    if schedule is None:
+        return {"error": f"Planning inconnu : '{schedule_id}'"}
+    if operation not in EDIT_OPERATIONS:
+        return {"error": f"Opération inconnue : '{operation}' (disponibles : {', '.join(EDIT_OPERATIONS)})"}
+
+    try:
+        if operation == "change_duration":
+            if task_name is None or duration_days is None:
+                return {"error": "change_duration nécessite task_name et duration_days"}
+            delta = schedule.change_duration(task_name, duration_days)
+        elif operation in ("add_link", "remove_link"):
+            if predecessor is None or successor is None:
+                return {"error": f"{operation} nécessite predecessor et successor"}
+            if operation == "add_link":
+                delta = schedule.add_link(predecessor, successor)
+            else:
+                delta = schedule.remove_link(predecessor, successor)
+        else:
+            if task_name is None or duration_days is None:
+                return {"error": "insert_task nécessite task_name et duration_days"}
+            delta = schedule.insert_task(task_name, duration_days, dependencies, successors, trade)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    notes = []
+    if delta["project_duration_delta"]:
+        notes.append(
+            f"Durée du projet modifiée de {delta['project_duration_delta']} jour(s) : "
+            "les dates au plus tard et marges des autres tâches sont décalées d'autant"
+        )
+
+    return {
+        "schedule_id": schedule_id,
+        "operation": operation,
+        **delta,
+        "changed_tasks_count": len(delta["changed_tasks"]),
+        "notes": notes
+    }
+
+
+@mcp.tool()
+def closeSchedule(
+    schedule_id: str
+) -> dict:
+    """
+    Ferme un planning ouvert : l'état modifié est enregistré dans le magasin sous le même identifiant.
+
+    :param schedule_id: Identifiant renvoyé par openSchedule
+    :return: Confirmation
+    """
+    schedule = SCHEDULE_HANDLES.pop(schedule_id, None)
+    if schedule is None:
+        return {"error": f"Planning inconnu : '{schedule_id}'"}
+    try:
+        meta = SCHEDULE_STORE.get(schedule_id).meta
+        project_name = meta.get("project_name")
+    except ValueError:
+        project_name = None
+    stored = SCHEDULE_STORE.put(schedule.to_tasks(), schedule_id=schedule_id, project_name=project_name)
+    return {"schedule_id": schedule_id, "closed": True, "tasks_count": len(stored)}
+
+
+@mcp.tool()
+def storeSchedule(
+    tasks: list,
+    project_name: str = None
+) -> dict:
+    """
+    Enregistre un planning côté serveur ; les autres outils l'utilisent ensuite via schedule_id.
+
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], trade, required_resources{}}
+    :param project_name: Nom du projet (optionnel)
+    :return: Identifiant et synthèse du planning stocké
+    """
+    try:
+        stored = SCHEDULE_STORE.put(tasks, project_name=project_name)
+    except (ValueError, KeyError) as e:
+        return {"error": f"Planning invalide : {e}"}
+    summary = stored.summary()
+    summary["unknown_dependencies"] = stored.meta["unknown_dependencies"]
+    return summary
+
+
+@mcp.tool()
+def importSchedule(
+    file_path: str,
+    file_format: str = None,
+    project_name: str = None
+) -> dict:
+    """
+    Importe un fichier MS Project XML (.xml) ou Primavera XER (.xer) directement dans le magasin de plannings.
+
+    :param file_path: Chemin du fichier sur le serveur
+    :param file_format: "mspdi" ou "xer" (défaut : selon l'extension)
+    :param project_name: Nom du projet (défaut : celui du fichier)
+    :return: Identifiant du planning stocké, à utiliser comme schedule_id dans les autres outils
+    """
+    import_root = os.environ.get("PLANNING_IMPORT_DIR")
+    path = os.path.realpath(file_path)
+    if import_root and os.path.commonpath([path, os.path.realpath(import_root)]) != os.path.realpath(import_root):
+        return {"error": f"Import limité au répertoire {import_root}"}
+    if not os.path.isfile(path):
+        return {"error": f"Fichier introuvable : '{file_path}'"}
+
+    try:
+        tasks, info = read_schedule_file(path, file_format)
+        stored = SCHEDULE_STORE.put(
+            tasks,
+            project_name=project_name or info["project_name"],
+            source_file=os.path.basename(path),
+            source_format=info["format"]
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    except ET.ParseError as e:
+        return {"error": f"XML invalide : {e}"}
+
+    summary = stored.summary()
+    summary.update({
+        "source_format": info["format"],
+        "skipped_activities": info["skipped_activities"],
+        "dropped_links": info["dropped_links"],
+        "unknown_dependencies": stored.meta["unknown_dependencies"]
+    })
+    return summary
+
+
+@mcp.tool()
+def listSchedules() -> dict:
+    """
+    Liste les plannings stockés côté serveur.
+
+    :return: Synthèse de chaque planning (identifiant, nom, nombre de tâches)
+    """
+    schedules = []
+    for schedule_id in SCHEDULE_STORE.list():
+        try:
+            schedules.append(SCHEDULE_STORE.get(schedule_id).summary())
+        except (ValueError, OSError):
+            continue
+    return {"schedules_count": len(schedules), "schedules": schedules}
+
+
+@mcp.tool()
+def deleteSchedule(
+    schedule_id: str
+) -> dict:
+    """
+    Supprime un planning stocké (et le ferme s'il est ouvert).
+
+    :param schedule_id: Identifiant du planning
+    :return: Confirmation
+    """
+    SCHEDULE_HANDLES.pop(schedule_id, None)
+    try:
+        deleted = SCHEDULE_STORE.delete(schedule_id)
+    except ValueError as e:
+        return {"error": str(e)}
+    if not deleted:
+        return {"error": f"Planning inconnu : '{schedule_id}'"}
+    return {"schedule_id": schedule_id, "deleted": True}
+
+
+@mcp.tool()
+def getPlanningCacheStats(
+    clear: bool = False
+) -> dict:
+    """
+    Statistiques du cache de calculs de planning (succès, échecs, mémoire occupée).
+
+    :param clear: Vider les caches après lecture
+    :return: Compteurs du cache de résultats et du cache de calculs intermédiaires
+    """
+    stats = {
+        "results": RESULT_CACHE.stats(),
+        "artifacts": ARTIFACT_CACHE.stats()
+    }
+    if clear:
+        RESULT_CACHE.clear()
+        ARTIFACT_CACHE.clear()
+        stats["cleared"] = True
+    return stats
+
 
 @mcp.tool()
 def simulateScenario(
@@ -519,94 +1960,247 @@ def simulateScenario(
     }
 
 
+@mcp.tool()
+@memoized_tool("simulateScheduleRisk", lambda params: params.get("seed") is not None)
+def simulateScheduleRisk(
+    tasks: list = None,
+    iterations: int = 100000,
+    seed: int = None,
+    start_date: str = None,
+    holiday_sets: list = None,
+    holidays: list = None,
+    workers: int = None,
+    schedule_id: str = None
+) -> dict:
+    """
+    Analyse de risque planning par simulation Monte Carlo sur le réseau de tâches.
+
+    :param tasks: Liste de tâches avec {name, duration_days, dependencies[], duration_distribution}
+                  où duration_distribution vaut {type: triangular|pert, min, mode, max} ou {type: lognormal, mean, sd}
+    :param iterations: Nombre d'itérations (défaut 100000)
+    :param seed: Graine aléatoire pour des résultats reproductibles
+    :param start_date: Date de début optionnelle (YYYY-MM-DD) pour exprimer les percentiles en dates
+    :param holiday_sets: Jeux de jours non travaillés (jours_feries_fr, conges_aout_btp)
+    :param holidays: Jours de fermeture propres au projet (YYYY-MM-DD)
+    :param workers: Nombre de processus (défaut : automatique selon la taille du graphe)
+    :param schedule_id: Identifiant d'un planning stocké (storeSchedule), à la place de tasks
+    :return: Percentiles de fin, indices de criticité et classement de sensibilité
+    """
+    if iterations <= 0:
+        return {"error": "Le nombre d'itérations doit être positif"}
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        return {"error": f"Graine invalide : {seed!r} (entier positif ou nul attendu)"}
+
+    project_start = None
+    if start_date:
+        try:
+            project_start = datetime.strptime(start_date, "%Y-%m-%d")
+        except ValueError:
+            return {"error": "Format de date invalide. Utiliser YYYY-MM-DD"}
+
+    try:
+        calendar = get_calendar(holiday_sets or [], holidays or [])
+        tasks = load_tasks(tasks, schedule_id)
+        artifacts = planning_artifacts(tasks)
+        graph = artifacts.graph
+        model = DurationModel(tasks)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    deterministic = artifacts.cpm.project_duration
+    simulation = simulate(graph, model, iterations, seed=seed, workers=workers)
+    finish = simulation["finish"]
+    p50, p80, p90 = percentiles(finish)
+
+    def as_date(days: float):
+        return calendar.offset(project_start, math.ceil(days - 1e-9)).strftime("%Y-%m-%d") if project_start else None
+
+    criticality = simulation["criticality"]
+    sensitivity = simulation["sensitivity"]
+    by_criticality = sorted(range(len(graph)), key=lambda i: -criticality[i])
+    by_sensitivity = sorted(range(len(graph)), key=lambda i: -abs(sensitivity[i]))
+
+    result = {
+        "simulation": {
+            "iterations": iterations,
+            "seed": seed,
+            "workers": simulation["workers"],
+            "tasks_count": len(graph)
+        },
+        "duration_days": {
+            "deterministic": deterministic,
+            "mean": round(float(finish.mean()), 1),
+            "std": round(float(finish.std()), 1),
+            "p50": round(p50, 1),
+            "p80": round(p80, 1),
+            "p90": round(p90, 1),
+            "probability_on_time_percent": round(float((finish <= deterministic + 1e-9).mean() * 100), 1)
+        },
+        "criticality_index": [
+            {"task_name": graph.names[i], "criticality_percent": round(float(criticality[i] * 100), 1)}
+            for i in by_criticality[:20]
+            if criticality[i] > 0
+        ],
+        "sensitivity_ranking": [
+            {
+                "task_name": graph.names[i],
+                "correlation": round(float(sensitivity[i]), 3),
+                "mean_duration_days": round(float(simulation["mean_duration"][i]), 1)
+            }
+            for i in by_sensitivity[:20]
+            if sensitivity[i] != 0
+        ],
+        "recommendations": [
+            f"Engager la date P80 ({round(p80, 1)} jours ouvrés) plutôt que la durée déterministe ({deterministic} jours)",
+            "Sécuriser en priorité les tâches en tête du classement de sensibilité",
+            "Revoir les estimations min/max des tâches les plus critiques"
+        ]
+    }
+
+    if project_start is not None:
+        result["finish_dates"] = {
+            "deterministic": as_date(deterministic),
+            "p50": as_date(p50),
+            "p80": as_date(p80),
+            "p90": as_date(p90)
+        }
+
+    return result
+
+
 @mcp.tool()
 def generateMilestoneReport(
-    project_name: str,
-    milestones: list,
-    current_date: str
+    project_name: str = None,
+    milestones: list = None,
+    current_date: str = None,
+    projects: list = None,
+    upcoming_days: int = 30,
+    limit: int = 50
 ) -> dict:
     """
-    Génère un rapport sur les jalons du projet.
+    Génère un rapport sur les jalons d'un projet, ou d'un portefeuille de chantiers en un seul appel.
 
     :param project_name: Nom du projet
     :param milestones: Liste des jalons avec {name, planned_date, actual_date, status}
     :param current_date: Date actuelle (YYYY-MM-DD)
-    :return: Rapport des jalons
+    :param projects: Mode portefeuille : liste de {project_name, milestones[]} (remplace project_name/milestones)
+    :param upcoming_days: Horizon des jalons à venir, en jours
+    :param limit: Mode portefeuille : nombre maximal de jalons listés (retards, échéances) et de projets classés
+    :return: Rapport des jalons (par projet et agrégé en mode portefeuille)
     """
     try:
-        today = datetime.strptime(current_date, "%Y-%m-%d")
+        today = datetime.strptime(current_date or "", "%Y-%m-%d").toordinal()
     except ValueError:
         return {"error": "Format de date invalide"}
+    if projects is None and milestones is None:
+        return {"error": "Fournir 'milestones' ou 'projects'"}
 
-    milestone_status = []
-    delays = []
-    upcoming = []
-
-    for milestone in milestones:
-        planned = datetime.strptime(milestone["planned_date"], "%Y-%m-%d")
-        actual = datetime.strptime(milestone["actual_date"], "%Y-%m-%d") if milestone.get("actual_date") else None
-        status = milestone.get("status", "en_cours")
-
-        if actual:
-            delay_days = (actual - planned).days
-        elif status == "en_cours":
-            delay_days = (today - planned).days if today > planned else 0
+    try:
+        if projects is not None:
+            table = MilestoneTable([project.get("milestones", []) for project in projects])
         else:
-            delay_days = 0
-
-        milestone_info = {
-            "name": milestone["name"],
-            "planned_date": milestone["planned_date"],
-            "actual_date": milestone.get("actual_date", "Non atteint"),
-            "status": status,
-            "delay_days": delay_days if status != "à_venir" else None,
-            "status_icon": "✅" if status == "terminé" else "🔄" if status == "en_cours" else "📅"
+            table = MilestoneTable([milestones])
+    except (KeyError, ValueError) as e:
+        return {"error": f"Jalon invalide : {e}"}
+    table.evaluate(today, upcoming_days)
+    stats = table.statistics()
+
+    def late_row(k: int) -> dict:
+        return {"milestone": table.names[k], "delay_days": int(table.delay[k]), "planned": table.planned_text[k]}
+
+    def upcoming_row(k: int) -> dict:
+        return {"milestone": table.names[k], "date": table.planned_text[k], "days_until": int(table.days_until[k])}
+
+    def project_statistics(p: int) -> dict:
+        total, completed, in_progress = int(stats["total"][p]), int(stats["completed"][p]), int(stats["in_progress"][p])
+        return {
+            "total_milestones": total,
+            "completed": completed,
+            "in_progress": in_progress,
+            "pending": total - completed - in_progress,
+            "completion_rate_percent": round(float(stats["completion_rate"][p]), 1) if total else 0,
+            "average_delay_days": round(float(stats["average_delay"][p]), 1) if stats["late"][p] else 0
         }
 
-        milestone_status.append(milestone_info)
+    def alerts(late: int, upcoming: int) -> List[str]:
+        return [
+            f"⚠️ {late} jalon(s) en retard" if late else "✅ Aucun retard",
+            f"📅 {upcoming} jalon(s) à venir dans les {upcoming_days} jours" if upcoming else "Aucun jalon imminent"
+        ]
 
-        if delay_days > 0 and status in ["terminé", "en_cours"]:
-            delays.append({
-                "milestone": milestone["name"],
-                "delay_days": delay_days,
-                "planned": milestone["planned_date"]
+    if projects is None:
+        milestone_status = []
+        for k, milestone in enumerate(milestones):
+            status = milestone.get("status", "en_cours")
+            milestone_status.append({
+                "name": milestone["name"],
+                "planned_date": milestone["planned_date"],
+                "actual_date": milestone.get("actual_date", "Non atteint"),
+                "status": status,
+                "delay_days": int(table.delay[k]) if status != "à_venir" else None,
+                "status_icon": "✅" if status == "terminé" else "🔄" if status == "en_cours" else "📅"
             })
+        late = table.ranked_late()
+        upcoming = table.ranked_upcoming()
+        return {
+            "project_name": project_name,
+            "report_date": current_date,
+            "statistics": project_statistics(0),
+            "milestones": milestone_status,
+            "delays": [late_row(k) for k in late.tolist()],
+            "upcoming_milestones": [upcoming_row(k) for k in upcoming.tolist()],
+            "alerts": alerts(len(late), len(upcoming))
+        }
 
-        if status == "à_venir" and planned > today:
-            days_until = (planned - today).days
-            if days_until <= 30:
-                upcoming.append({
-                    "milestone": milestone["name"],
-                    "date": milestone["planned_date"],
-                    "days_until": days_until
-                })
-
-    # Statistiques
-    total_milestones = len(milestones)
-    completed = sum(1 for m in milestones if m.get("status") == "terminé")
-    in_progress = sum(1 for m in milestones if m.get("status") == "en_cours")
-    completion_rate = (completed / total_milestones * 100) if total_milestones > 0 else 0
+    project_names = [project.get("project_name") or f"Projet {p + 1}" for p, project in enumerate(projects)]
+    late_counts, upcoming_counts = stats["late"].tolist(), stats["upcoming"].tolist()
+    max_delays = stats["max_delay"].tolist()
+    per_project = [
+        {
+            "project_name": project_names[p],
+            "statistics": project_statistics(p),
+            "delayed_milestones": late_counts[p],
+            "max_delay_days": max_delays[p],
+            "upcoming_milestones": upcoming_counts[p],
+            "alerts": alerts(late_counts[p], upcoming_counts[p])
+        }
+        for p in range(len(projects))
+    ]
 
-    avg_delay = sum(d["delay_days"] for d in delays) / len(delays) if delays else 0
+    total = len(table)
+    completed = int(stats["completed"].sum())
+    in_progress = int(stats["in_progress"].sum())
+    late_ids = table.ranked_late()
+    upcoming_ids = table.ranked_upcoming(limit)
+    owners = table.owner.tolist()
+    ranking = table.ranked_projects(stats, limit).tolist()
 
     return {
-        "project_name": project_name,
         "report_date": current_date,
-        "statistics": {
-            "total_milestones": total_milestones,
+        "portfolio": {
+            "projects": len(projects),
+            "projects_with_delays": int((stats["late"] > 0).sum()),
+            "total_milestones": total,
             "completed": completed,
             "in_progress": in_progress,
-            "pending": total_milestones - completed - in_progress,
-            "completion_rate_percent": round(completion_rate, 1),
-            "average_delay_days": round(avg_delay, 1)
+            "pending": total - completed - in_progress,
+            "completion_rate_percent": round(completed / total * 100, 1) if total else 0,
+            "delayed_milestones": len(late_ids),
+            "average_delay_days": round(float(table.delay[late_ids].mean()), 1) if len(late_ids) else 0,
+            "upcoming_milestones": int(stats["upcoming"].sum())
         },
-        "milestones": milestone_status,
-        "delays": sorted(delays, key=lambda x: x["delay_days"], reverse=True),
-        "upcoming_milestones": sorted(upcoming, key=lambda x: x["days_until"]),
-        "alerts": [
-            f"⚠️ {len(delays)} jalon(s) en retard" if delays else "✅ Aucun retard",
-            f"📅 {len(upcoming)} jalon(s) à venir dans les 30 jours" if upcoming else "Aucun jalon imminent"
-        ]
+        "projects": per_project,
+        "most_delayed_projects": [
+            {"project_name": project_names[p], "delayed_milestones": late_counts[p], "max_delay_days": max_delays[p]}
+            for p in ranking
+        ],
+        "largest_delays": [
+            dict(late_row(k), project_name=project_names[owners[k]]) for k in late_ids[:limit].tolist()
+        ],
+        "upcoming_milestones": [
+            dict(upcoming_row(k), project_name=project_names[owners[k]]) for k in upcoming_ids.tolist()
+        ],
+        "alerts": alerts(len(late_ids), int(stats["upcoming"].sum()))
     }
 
 
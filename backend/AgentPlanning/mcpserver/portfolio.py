@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : portfolio.py
+# @Author: Assistant
+# @Desc  : Lissage multi-projets des équipes partagées entre chantiers (groupes indépendants en parallèle)
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from leveling import serial_schedule
+from scheduling import TaskGraph, parse_dependency
+
+# Au-delà de ce nombre total de tâches, les groupes de projets indépendants sont lissés sur plusieurs processus
+PARALLEL_TASKS = 20_000
+
+# Séparateur des noms internes « projet / tâche » du graphe combiné (absent des noms saisis)
+_SEP = "\x1f"
+
+
+class _DisjointSets:
+    """Union-find avec compression de chemin (par division) et union par taille."""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+
+def shared_clusters(projects: Sequence[list], capacities: Dict[str, float]) -> List[Tuple[List[int], List[str]]]:
+    """
+    Groupes de projets reliés par au moins un corps de métier limité (présent dans
+    `capacities`) qu'ils sollicitent tous deux : deux groupes distincts ne peuvent
+    pas entrer en conflit et se lissent indépendamment.
+
+    :return: [(index des projets, corps de métier partagés)] par taille décroissante
+    """
+    sets = _DisjointSets(len(projects))
+    first_user: Dict[str, int] = {}
+    trades_of: List[set] = []
+    for p, tasks in enumerate(projects):
+        used = {
+            trade
+            for task in tasks
+            for trade, count in task.get("required_resources", {}).items()
+            if trade in capacities and count > 0
+        }
+        trades_of.append(used)
+        for trade in used:
+            if trade in first_user:
+                sets.union(first_user[trade], p)
+            else:
+                first_user[trade] = p
+
+    groups: Dict[int, List[int]] = {}
+    for p in range(len(projects)):
+        groups.setdefault(sets.find(p), []).append(p)
+    clusters = []
+    for members in groups.values():
+        trades = sorted(set().union(*(trades_of[p] for p in members)))
+        clusters.append((members, trades))
+    clusters.sort(key=lambda c: (-sum(len(projects[p]) for p in c[0]), c[0][0]))
+    return clusters
+
+
+def _renamed(dependency, prefix: str):
+    if isinstance(dependency, str):
+        return prefix + dependency
+    name, _, _ = parse_dependency(dependency)
+    return dict(dependency, task=prefix + name)
+
+
+def combined_tasks(
+    projects: Sequence[list],
+    members: Sequence[int],
+    releases: Sequence[int]
+) -> Tuple[list, List[Optional[Tuple[int, int]]]]:
+    """
+    Liste de tâches unique pour un groupe de projets : noms préfixés par le projet,
+    et une tâche fictive de durée `releases[p]` (jours ouvrés depuis le début du
+    portefeuille) placée avant chaque tâche d'un projet qui démarre plus tard.
+
+    :return: (tâches combinées, (projet, index local) de chaque tâche combinée, None pour les tâches fictives)
+    """
+    tasks = []
+    owners = []
+    for p in members:
+        prefix = f"{p}{_SEP}"
+        release = releases[p]
+        gate = f"{p}{_SEP}{_SEP}début" if release > 0 else None
+        if gate:
+            tasks.append({"name": gate, "duration_days": release, "dependencies": []})
+            owners.append(None)
+        for i, task in enumerate(projects[p]):
+            renamed = dict(task, name=prefix + task["name"])
+            renamed["dependencies"] = [_renamed(dep, prefix) for dep in task.get("dependencies", [])]
+            if gate:
+                renamed["dependencies"].append(gate)
+            tasks.append(renamed)
+            owners.append((p, i))
+    return tasks, owners
+
+
+def _level_cluster(job) -> dict:
+    """Lissage d'un groupe de projets (exécuté dans un processus de travail si parallèle)."""
+    tasks, capacities, priority_rule = job
+    graph = TaskGraph(tasks)
+    leveled = serial_schedule(
+        graph,
+        [task.get("required_resources", {}) for task in tasks],
+        capacities,
+        priority_rule
+    )
+    return {
+        "start": leveled["start"],
+        "finish": leveled["finish"],
+        "earliest_start": leveled["cpm"].earliest_start,
+        "peak_usage": leveled["peak_usage"],
+        "makespan": leveled["makespan"],
+    }
+
+
+def level_portfolio(
+    projects: Sequence[list],
+    releases: Sequence[int],
+    capacities: Dict[str, float],
+    priority_rule: str = "least_float",
+    workers: Optional[int] = None
+) -> dict:
+    """
+    Lissage de ressources partagées entre projets.
+
+    Les projets sont regroupés par corps de métier limités communs (union-find) ;
+    chaque groupe est lissé par SSGS sur le graphe combiné de ses projets, avec
+    les capacités partagées. Les dates sont en jours ouvrés depuis le début du
+    portefeuille, chaque projet ne démarrant qu'à `releases[p]`.
+
+    :return: groupes, débuts / fins lissés et au plus tôt par projet, charges de pointe
+    """
+    clusters = shared_clusters(projects, capacities)
+    jobs = []
+    owners_by_cluster = []
+    for members, trades in clusters:
+        tasks, owners = combined_tasks(projects, members, releases)
+        jobs.append((tasks, {trade: capacities[trade] for trade in trades}, priority_rule))
+        owners_by_cluster.append(owners)
+
+    total_tasks = sum(len(tasks) for tasks in projects)
+    if workers is None:
+        workers = (os.cpu_count() or 1) if total_tasks >= PARALLEL_TASKS else 1
+    workers = max(1, min(workers, len(jobs)))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_level_cluster, jobs))
+    else:
+        results = [_level_cluster(job) for job in jobs]
+
+    start = [[0] * len(tasks) for tasks in projects]
+    finish = [[0] * len(tasks) for tasks in projects]
+    earliest = [[0] * len(tasks) for tasks in projects]
+    cluster_of = [0] * len(projects)
+    peak_usage: Dict[str, float] = {}
+    for c, (result, owners) in enumerate(zip(results, owners_by_cluster)):
+        for owner, s, f, es in zip(owners, result["start"], result["finish"], result["earliest_start"]):
+            if owner is None:
+                continue
+            p, i = owner
+            start[p][i] = s
+            finish[p][i] = f
+            earliest[p][i] = es
+        for p in clusters[c][0]:
+            cluster_of[p] = c
+        for trade, peak in result["peak_usage"].items():
+            peak_usage[trade] = max(peak_usage.get(trade, 0.0), peak)
+
+    return {
+        "clusters": [
+            {"projects": members, "shared_trades": trades, "makespan": result["makespan"]}
+            for (members, trades), result in zip(clusters, results)
+        ],
+        "cluster_of": cluster_of,
+        "start": start,
+        "finish": finish,
+        "earliest_start": earliest,
+        "peak_usage": peak_usage,
+        "workers": workers,
+    }
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : resources.py
+# @Author: Assistant
+# @Desc  : Profils de charge des ressources par balayage (sweep-line) pour le planning BTP
+
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+
+class ResourceProfile:
+    """
+    Profil de charge constant par morceaux, construit par balayage des événements
+    de début et de fin de tâches.
+
+    Les jours sont des ordinaux (`date.toordinal()`) ; une tâche occupe ses
+    ressources sur [start, end[. Chaque segment `(start, end, usage)` couvre
+    les jours [start, end[ avec une charge `usage[k]` pour `trades[k]`. Le coût
+    est O(n log n) en nombre de tâches, indépendamment de la durée du projet.
+    """
+
+    def __init__(
+        self,
+        starts: Sequence[int],
+        ends: Sequence[int],
+        requirements: Sequence[Dict[str, float]],
+        horizon_start: int,
+        horizon_end: int,
+        trades: Sequence[str] = ()
+    ):
+        self.horizon_start = horizon_start
+        self.horizon_end = horizon_end
+        self.starts = starts
+        self.ends = ends
+        self.trades: List[str] = list(trades)
+        trade_index = {trade: k for k, trade in enumerate(self.trades)}
+        for req in requirements:
+            for trade in req:
+                if trade not in trade_index:
+                    trade_index[trade] = len(self.trades)
+                    self.trades.append(trade)
+
+        # Événements (jour, signe, tâche) triés par jour
+        events = []
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            start = max(start, horizon_start)
+            end = min(end, horizon_end)
+            if start < end and requirements[i]:
+                events.append((start, 1, i))
+                events.append((end, -1, i))
+        events.sort(key=lambda e: e[0])
+
+        usage = [0] * len(self.trades)
+        self.segments = []
+        cursor = horizon_start
+        k = 0
+        while k < len(events):
+            day = events[k][0]
+            if day > cursor:
+                self._append(cursor, day, tuple(usage))
+                cursor = day
+            while k < len(events) and events[k][0] == day:
+                _, sign, i = events[k]
+                for trade, count in requirements[i].items():
+                    usage[trade_index[trade]] += sign * count
+                k += 1
+        if cursor < horizon_end:
+            self._append(cursor, horizon_end, tuple(usage))
+
+    def _append(self, start: int, end: int, usage: tuple):
+        """Ajoute un segment en fusionnant avec le précédent si la charge est identique."""
+        if self.segments and self.segments[-1][2] == usage:
+            self.segments[-1] = (self.segments[-1][0], end, usage)
+        else:
+            self.segments.append((start, end, usage))
+
+    @property
+    def total_days(self) -> int:
+        return self.horizon_end - self.horizon_start
+
+    def trade_intervals(self, trade: str) -> List[tuple]:
+        """Intervalles (start, end, usage) fusionnés pour un corps de métier."""
+        k = self.trades.index(trade) if trade in self.trades else None
+        intervals = []
+        for start, end, usage in self.segments:
+            value = usage[k] if k is not None else 0
+            if intervals and intervals[-1][2] == value and intervals[-1][1] == start:
+                intervals[-1] = (intervals[-1][0], end, value)
+            else:
+                intervals.append((start, end, value))
+        return intervals
+
+    def usage_days(self, trade: str) -> float:
+        """Somme de la charge journalière d'un corps de métier sur l'horizon (homme-jours)."""
+        if trade not in self.trades:
+            return 0
+        k = self.trades.index(trade)
+        return sum(usage[k] * (end - start) for start, end, usage in self.segments)
+
+    def peak(self, trade: str) -> float:
+        if trade not in self.trades:
+            return 0
+        k = self.trades.index(trade)
+        return max((usage[k] for _, _, usage in self.segments), default=0)
+
+    def conflicts(self, capacities: Dict[str, float]) -> List[dict]:
+        """Segments où au moins un corps de métier dépasse sa capacité."""
+        checked = [(k, trade, capacities[trade]) for k, trade in enumerate(self.trades) if trade in capacities]
+        found = []
+        for start, end, usage in self.segments:
+            overloads = [
+                {
+                    "trade": trade,
+                    "required": usage[k],
+                    "available": capacity,
+                    "overflow": usage[k] - capacity
+                }
+                for k, trade, capacity in checked
+                if usage[k] > capacity
+            ]
+            if overloads:
+                found.append({"start": start, "end": end, "conflicts": overloads})
+        return found
+
+    def active_tasks(self, day: int) -> List[int]:
+        """Index des tâches actives un jour donné (à n'appeler que pour les segments rapportés)."""
+        return [i for i, (start, end) in enumerate(zip(self.starts, self.ends)) if start <= day < end]
+
+    def daily(self):
+        """Expansion jour par jour : (ordinal, usage) pour chaque jour de l'horizon."""
+        for start, end, usage in self.segments:
+            for day in range(start, end):
+                yield day, usage
+
+
+def format_ordinal(day: int) -> str:
+    return datetime.fromordinal(day).strftime("%Y-%m-%d")
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : risk.py
+# @Author: Assistant
+# @Desc  : Analyse de risque planning par Monte Carlo vectorisé sur le graphe des tâches
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from scheduling import FF, FS, SF, SS, TaskGraph
+
+DISTRIBUTIONS = ("fixed", "triangular", "pert", "lognormal")
+
+# Itérations simulées par bloc : taille fixe, indépendante du nombre de processus
+# (reproductibilité), assez grande pour amortir les boucles Python sur les tâches
+BLOCK_ITERATIONS = 1024
+
+# Plafond d'éléments (tâches x itérations) par bloc : seuls les très grands réseaux
+# voient leurs blocs réduits, pour borner la mémoire des matrices de dates
+MAX_BLOCK_ELEMENTS = 32_000_000
+
+# Au-delà de ce volume (itérations x (tâches + liens)), la simulation est répartie sur plusieurs processus
+PARALLEL_THRESHOLD = 50_000_000
+
+
+class DurationModel:
+    """
+    Paramètres de distribution des durées, regroupés par type pour un tirage vectorisé.
+
+    Chaque tâche peut porter `duration_distribution` :
+    - {"type": "triangular", "min", "mode", "max"}
+    - {"type": "pert", "min", "mode", "max"}
+    - {"type": "lognormal", "mean", "sd"}
+    Sans distribution, la durée est fixe (`duration_days`).
+    """
+
+    def __init__(self, tasks: list):
+        n = len(tasks)
+        kinds = []
+        self.low = np.zeros(n)
+        self.mode = np.zeros(n)
+        self.high = np.zeros(n)
+        self.mean = np.zeros(n)
+        self.sd = np.zeros(n)
+
+        for i, task in enumerate(tasks):
+            spec = task.get("duration_distribution") or {"type": "fixed"}
+            kind = spec.get("type", "fixed")
+            if kind not in DISTRIBUTIONS:
+                raise ValueError(f"Distribution inconnue pour '{task['name']}' : '{kind}' (disponibles : {', '.join(DISTRIBUTIONS)})")
+            base = task["duration_days"]
+            if kind in ("triangular", "pert"):
+                low = spec.get("min", base)
+                mode = spec.get("mode", base)
+                high = spec.get("max", base)
+                if not low <= mode <= high:
+                    raise ValueError(f"Distribution de '{task['name']}' : il faut min <= mode <= max")
+                if low == high:
+                    kind = "fixed"
+                    base = low
+                self.low[i], self.mode[i], self.high[i] = low, mode, high
+            elif kind == "lognormal":
+                mean = spec.get("mean", base)
+                sd = spec.get("sd", 0)
+                if mean <= 0 or sd < 0:
+                    raise ValueError(f"Distribution de '{task['name']}' : il faut mean > 0 et sd >= 0")
+                if sd == 0:
+                    kind = "fixed"
+                    base = mean
+                self.mean[i], self.sd[i] = mean, sd
+            if kind == "fixed":
+                self.mode[i] = base
+            kinds.append(kind)
+
+        kinds = np.array(kinds)
+        self.groups = {kind: np.flatnonzero(kinds == kind) for kind in DISTRIBUTIONS}
+
+    def sample(self, rng: np.random.Generator, iterations: int) -> np.ndarray:
+        """Matrice de durées (tâches x itérations) : une ligne contiguë par tâche."""
+        durations = np.empty((len(self.mode), iterations))
+
+        idx = self.groups["fixed"]
+        if len(idx):
+            durations[idx] = self.mode[idx, None]
+
+        idx = self.groups["triangular"]
+        if len(idx):
+            durations[idx] = rng.triangular(
+                self.low[idx, None], self.mode[idx, None], self.high[idx, None], size=(len(idx), iterations)
+            )
+
+        idx = self.groups["pert"]
+        if len(idx):
+            low, mode, high = self.low[idx, None], self.mode[idx, None], self.high[idx, None]
+            span = high - low
+            alpha = 1 + 4 * (mode - low) / span
+            beta = 1 + 4 * (high - mode) / span
+            durations[idx] = low + span * rng.beta(alpha, beta, size=(len(idx), iterations))
+
+        idx = self.groups["lognormal"]
+        if len(idx):
+            mean, sd = self.mean[idx, None], self.sd[idx, None]
+            sigma2 = np.log1p((sd / mean) ** 2)
+            mu = np.log(mean) - sigma2 / 2
+            durations[idx] = rng.lognormal(mu, np.sqrt(sigma2), size=(len(idx), iterations))
+
+        return durations
+
+
+def _typed_passes(durations, order, preds, succs, links, iterations):
+    """Passes avant/arrière matricielles avec liens typés (FS, SS, FF, SF) et décalages."""
+    pred_kinds, pred_lags, succ_kinds, succ_lags = links
+    n = durations.shape[0]
+    es = np.zeros_like(durations)
+    ef = np.empty_like(durations)
+    buffer = np.empty(iterations)   # borne d'un lien, sans allocation par lien
+    for i in order:
+        for p, kind, lag in zip(preds[i], pred_kinds[i], pred_lags[i]):
+            bound = ef[p] if kind in (FS, FF) else es[p]
+            if kind in (FF, SF):
+                bound = np.subtract(bound, durations[i], out=buffer)
+            if lag:
+                bound = np.add(bound, lag, out=buffer)
+            np.maximum(es[i], bound, out=es[i])
+        np.add(es[i], durations[i], out=ef[i])
+
+    finish = ef.max(axis=0) if n else np.zeros(iterations)
+
+    ls = np.empty_like(durations)
+    lf = np.empty_like(durations)
+    for i in reversed(order):
+        lf[i] = finish
+        for s, kind, lag in zip(succs[i], succ_kinds[i], succ_lags[i]):
+            bound = ls[s] if kind in (FS, SS) else lf[s]
+            if kind in (SS, SF):
+                bound = np.add(bound, durations[i], out=buffer)
+            if lag:
+                bound = np.subtract(bound, lag, out=buffer)
+            np.minimum(lf[i], bound, out=lf[i])
+        np.subtract(lf[i], durations[i], out=ls[i])
+    return es, ls, finish
+
+
+# Graphe et modèle de durées du processus courant, transmis une seule fois par processus
+_NETWORK = None
+
+
+def _load_network(network) -> None:
+    """Initialiseur de processus : conserve (modèle, ordre, prédécesseurs, successeurs, liens)."""
+    global _NETWORK
+    _NETWORK = network
+
+
+def _simulate_chunk(args) -> Dict[str, np.ndarray]:
+    """Simule un bloc d'itérations : passes avant/arrière matricielles dans l'ordre topologique."""
+    iterations, seed = args
+    model, order, preds, succs, links = _NETWORK
+    rng = np.random.default_rng(seed)
+    durations = model.sample(rng, iterations)
+    n = durations.shape[0]
+
+    if links is not None:
+        es, ls, finish = _typed_passes(durations, order, preds, succs, links, iterations)
+    else:
+        es = np.zeros_like(durations)
+        ef = np.empty_like(durations)
+        for i in order:
+            p = preds[i]
+            if len(p) == 1:
+                es[i] = ef[p[0]]
+            elif len(p) > 1:
+                np.max(ef[p], axis=0, out=es[i])
+            np.add(es[i], durations[i], out=ef[i])
+
+        finish = ef.max(axis=0) if n else np.zeros(iterations)
+
+        # Passe arrière réutilisant le tampon ef pour les dates au plus tard
+        ls = ef
+        for i in reversed(order):
+            s = succs[i]
+            if not s:
+                lf = finish
+            elif len(s) == 1:
+                lf = ls[s[0]]
+            else:
+                lf = ls[s].min(axis=0)
+            np.subtract(lf, durations[i], out=ls[i])
+
+    critical = (ls - es) <= 1e-6 * np.maximum(finish, 1.0)
+
+    return {
+        "finish": finish,
+        "critical_count": critical.sum(axis=1),
+        "sum_d": durations.sum(axis=1),
+        "sum_d2": np.einsum("ij,ij->i", durations, durations),
+        "sum_dt": durations @ finish,
+    }
+
+
+def simulate(
+    graph: TaskGraph,
+    model: DurationModel,
+    iterations: int,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None
+) -> Dict[str, object]:
+    """
+    Monte Carlo sur le graphe : `iterations` passes avant/arrière vectorisées.
+
+    Les itérations sont découpées en blocs de taille fixe, chacun avec sa graine
+    dérivée de `seed` (SeedSequence.spawn) : le résultat est identique quel que
+    soit le nombre de processus utilisés. Le graphe est envoyé une seule fois à
+    chaque processus (initialiseur du pool), les tâches ne portent que la taille
+    du bloc et sa graine.
+    """
+    n = len(graph)
+    chunk = max(1, min(iterations, BLOCK_ITERATIONS, MAX_BLOCK_ELEMENTS // max(n, 1)))
+    sizes = [chunk] * (iterations // chunk)
+    if iterations % chunk:
+        sizes.append(iterations % chunk)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    order = graph.order
+    preds = [list(p) for p in graph.preds]
+    succs = [list(s) for s in graph.succs]
+    links = (graph.pred_kinds, graph.pred_lags, graph.succ_kinds, graph.succ_lags) if graph.typed else None
+    network = (model, order, preds, succs, links)
+    jobs = list(zip(sizes, seeds))
+
+    links_count = sum(len(p) for p in preds)
+    if workers is None:
+        workers = (os.cpu_count() or 1) if iterations * (n + links_count) >= PARALLEL_THRESHOLD else 1
+    workers = max(1, min(workers, len(jobs)))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_load_network, initargs=(network,)) as pool:
+            results = list(pool.map(_simulate_chunk, jobs))
+    else:
+        _load_network(network)
+        try:
+            results = [_simulate_chunk(job) for job in jobs]
+        finally:
+            _load_network(None)
+
+    finish = np.concatenate([r["finish"] for r in results])
+    critical_count = sum(r["critical_count"] for r in results)
+    sum_d = sum(r["sum_d"] for r in results)
+    sum_d2 = sum(r["sum_d2"] for r in results)
+    sum_dt = sum(r["sum_dt"] for r in results)
+
+    # Corrélation de Pearson durée de tâche / fin de projet (indice de sensibilité)
+    mean_d = sum_d / iterations
+    mean_t = finish.mean()
+    cov = sum_dt / iterations - mean_d * mean_t
+    sd_d = np.sqrt(np.maximum(sum_d2 / iterations - mean_d ** 2, 0))
+    sd_t = finish.std()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sensitivity = np.where((sd_d > 0) & (sd_t > 0), cov / (sd_d * sd_t), 0.0)
+
+    return {
+        "finish": finish,
+        "criticality": critical_count / iterations,
+        "sensitivity": sensitivity,
+        "mean_duration": mean_d,
+        "workers": workers,
+    }
+
+
+def percentiles(finish: np.ndarray, levels: Sequence[int] = (50, 80, 90)) -> List[float]:
+    return [float(v) for v in np.percentile(finish, levels)]
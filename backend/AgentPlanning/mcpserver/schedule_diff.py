@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : schedule_diff.py
+# @Author: Assistant
+# @Desc  : Comparaison vectorisée d'un planning de référence (baseline) et de sa mise à jour
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from memo import PlanningArtifacts
+
+
+def match_key(task: dict, match_on: str):
+    """Clé d'appariement d'une tâche : le champ `match_on` s'il est renseigné, sinon le nom."""
+    if match_on == "name":
+        return task["name"]
+    value = task.get(match_on)
+    return task["name"] if value in (None, "") else value
+
+
+def key_index(tasks: list, match_on: str, label: str) -> Dict:
+    """Index de hachage clé -> position ; une clé en double rend l'appariement ambigu."""
+    index = {}
+    for i, task in enumerate(tasks):
+        key = match_key(task, match_on)
+        if key in index:
+            raise ValueError(f"Clé '{key}' en double dans le planning {label} (match_on='{match_on}')")
+        index[key] = i
+    return index
+
+
+def _columns(artifacts: PlanningArtifacts) -> Dict[str, np.ndarray]:
+    earliest_start, earliest_finish = artifacts.forward
+    return {
+        "start": np.asarray(earliest_start, dtype=np.float64),
+        "finish": np.asarray(earliest_finish, dtype=np.float64),
+        "duration": np.asarray(artifacts.graph.durations, dtype=np.float64),
+        "float": np.asarray(artifacts.cpm.total_float, dtype=np.float64),
+    }
+
+
+class ScheduleDiff:
+    """
+    Écarts entre deux versions d'un planning, en jours ouvrés depuis le début du projet.
+
+    Les tâches sont appariées par un index de hachage sur leur clé (nom, ou
+    identifiant comme source_uid) ; les écarts de début, de fin, de durée et de
+    marge totale sont ensuite calculés d'un bloc sur les tableaux NumPy des
+    tâches appariées (`current_ids[k]` correspond à `baseline_ids[k]`).
+    """
+
+    def __init__(self, baseline: PlanningArtifacts, current: PlanningArtifacts, match_on: str = "name"):
+        self.baseline = baseline
+        self.current = current
+        base_index = key_index(baseline.graph.tasks, match_on, "de référence")
+        current_keys = [match_key(task, match_on) for task in current.graph.tasks]
+        if len(set(current_keys)) < len(current_keys):
+            key_index(current.graph.tasks, match_on, "à jour")
+
+        lookup = np.fromiter((base_index.get(key, -1) for key in current_keys), dtype=np.int64, count=len(current_keys))
+        matched = lookup >= 0
+        self.current_ids = np.flatnonzero(matched)
+        self.baseline_ids = lookup[matched]
+        self.added_ids = np.flatnonzero(~matched)
+        seen = np.zeros(len(baseline.graph), dtype=bool)
+        seen[self.baseline_ids] = True
+        self.removed_ids = np.flatnonzero(~seen)
+
+        base, cur = _columns(baseline), _columns(current)
+        self.deltas = {name: cur[name][self.current_ids] - base[name][self.baseline_ids] for name in base}
+        self.baseline_float = base["float"][self.baseline_ids]
+        self.current_float = cur["float"][self.current_ids]
+
+    def __len__(self) -> int:
+        return len(self.current_ids)
+
+    def ranked(self, limit: int, min_slip: float = 0) -> np.ndarray:
+        """
+        Positions (dans les tâches appariées) des plus forts écarts : glissement de fin
+        en valeur absolue, puis de début, puis érosion de marge.
+        """
+        finish, start, total_float = self.deltas["finish"], self.deltas["start"], self.deltas["float"]
+        changed = np.flatnonzero(
+            (np.abs(finish) > min_slip) | (np.abs(start) > min_slip) | (self.deltas["duration"] != 0) | (total_float != 0)
+        )
+        if len(changed) > limit:
+            # Sélection partielle sur le critère principal avant le tri complet des candidats
+            score = np.abs(finish[changed])
+            cutoff = np.partition(score, len(changed) - limit)[len(changed) - limit]
+            changed = changed[score >= cutoff]
+        order = np.lexsort((total_float[changed], -np.abs(start[changed]), -np.abs(finish[changed])))
+        return changed[order][:limit]
+
+    def critical_changes(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(devenues critiques, plus critiques) en positions dans les tâches appariées"""
+        was, now = self.baseline_float == 0, self.current_float == 0
+        return np.flatnonzero(now & ~was), np.flatnonzero(was & ~now)
+
+    def summary(self) -> dict:
+        finish, start = self.deltas["finish"], self.deltas["start"]
+
+        def stats(values: np.ndarray) -> dict:
+            if not len(values):
+                return {"max": 0, "min": 0, "mean": 0}
+            return {"max": float(values.max()), "min": float(values.min()), "mean": round(float(values.mean()), 2)}
+
+        return {
+            "matched_tasks": len(self),
+            "added_tasks": len(self.added_ids),
+            "removed_tasks": len(self.removed_ids),
+            "delayed_finish": int((finish > 0).sum()),
+            "advanced_finish": int((finish < 0).sum()),
+            "delayed_start": int((start > 0).sum()),
+            "duration_changed": int((self.deltas["duration"] != 0).sum()),
+            "float_eroded": int((self.deltas["float"] < 0).sum()),
+            "finish_slip_days": stats(finish),
+            "start_slip_days": stats(start),
+            "critical_baseline": int((self.baseline_float == 0).sum()),
+            "critical_current": int((self.current_float == 0).sum()),
+        }
+
+    def names(self, positions, side: str = "current") -> List[str]:
+        if side == "current":
+            graph, ids = self.current.graph, self.current_ids
+        else:
+            graph, ids = self.baseline.graph, self.baseline_ids
+        return [graph.names[i] for i in ids[positions].tolist()]
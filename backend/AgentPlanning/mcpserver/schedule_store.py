@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : schedule_store.py
+# @Author: Assistant
+# @Desc  : Stockage des plannings côté serveur (colonnes NumPy mappées en mémoire) référencés par identifiant
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from memo import canonical_hash
+from scheduling import FS, LINK_TYPES, parse_dependency
+
+# Champs stockés en colonnes ; les autres champs d'une tâche vont dans extras.json
+CORE_FIELDS = ("name", "duration_days", "dependencies", "trade", "required_resources")
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "schedules")
+
+
+class StoredSchedule:
+    """
+    Planning stocké en colonnes :
+    - noms : blob UTF-8 + offsets ;
+    - durées : float64 ;
+    - dépendances : CSR (dep_indptr, dep_indices) en index de tâches, avec type (dep_kinds) et décalage (dep_lags) ;
+    - corps de métier : codes int32 + table des libellés (internés) ;
+    - ressources : CSR (res_indptr, res_trade, res_count).
+    Les tableaux chargés depuis le disque sont mappés en mémoire (np.load mmap_mode="r").
+    """
+
+    def __init__(self, schedule_id: str, meta: dict, columns: Dict[str, np.ndarray], names_blob: bytes, extras: dict):
+        self.schedule_id = schedule_id
+        self.meta = meta
+        self.columns = columns
+        self._names_blob = names_blob
+        self.extras = extras
+        self._names: Optional[List[str]] = None
+        self._tasks: Optional[list] = None
+        self._digest: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.columns["durations"])
+
+    @classmethod
+    def from_tasks(cls, schedule_id: str, tasks: list, meta: Optional[dict] = None) -> "StoredSchedule":
+        index = {}
+        for i, task in enumerate(tasks):
+            name = task["name"]
+            if not isinstance(name, str):
+                raise ValueError(f"Nom de tâche invalide : {name!r} (texte attendu)")
+            if name in index:
+                raise ValueError(f"Tâche en double : '{name}'")
+            index[name] = i
+
+        trade_table: List[str] = []
+        trade_codes: Dict[str, int] = {}
+
+        def code(trade: str) -> int:
+            if not isinstance(trade, str):
+                raise ValueError(f"Corps de métier invalide : {trade!r} (texte attendu)")
+            if trade not in trade_codes:
+                trade_codes[trade] = len(trade_table)
+                trade_table.append(sys.intern(trade))
+            return trade_codes[trade]
+
+        encoded = [task["name"].encode("utf-8") for task in tasks]
+        name_offsets = np.zeros(len(tasks) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=name_offsets[1:])
+
+        dep_indptr = np.zeros(len(tasks) + 1, dtype=np.int64)
+        dep_indices, dep_kinds, dep_lags = [], [], []
+        res_indptr = np.zeros(len(tasks) + 1, dtype=np.int64)
+        res_trade, res_count = [], []
+        trades = np.full(len(tasks), -1, dtype=np.int32)
+        extras = {}
+        unknown = []
+
+        for i, task in enumerate(tasks):
+            for dependency in task.get("dependencies", []):
+                dep, kind, lag = parse_dependency(dependency)
+                j = index.get(dep)
+                if j is None:
+                    unknown.append({"task": task["name"], "dependency": dep})
+                else:
+                    dep_indices.append(j)
+                    dep_kinds.append(kind)
+                    dep_lags.append(lag)
+            dep_indptr[i + 1] = len(dep_indices)
+            if "trade" in task:
+                trades[i] = code(task["trade"])
+            for trade, count in task.get("required_resources", {}).items():
+                res_trade.append(code(trade))
+                res_count.append(count)
+            res_indptr[i + 1] = len(res_trade)
+            other = {k: v for k, v in task.items() if k not in CORE_FIELDS}
+            if other:
+                extras[str(i)] = other
+
+        columns = {
+            "durations": np.array([task["duration_days"] for task in tasks], dtype=np.float64),
+            "name_offsets": name_offsets,
+            "dep_indptr": dep_indptr,
+            "dep_indices": np.array(dep_indices, dtype=np.int32),
+            "dep_kinds": np.array(dep_kinds, dtype=np.int8),
+            "dep_lags": np.array(dep_lags, dtype=np.float64),
+            "trade_codes": trades,
+            "res_indptr": res_indptr,
+            "res_trade": np.array(res_trade, dtype=np.int32),
+            "res_count": np.array(res_count, dtype=np.float64),
+        }
+        meta = dict(meta or {})
+        meta.update({
+            "tasks_count": len(tasks),
+            "links_count": len(dep_indices),
+            "trade_table": trade_table,
+            "unknown_dependencies": unknown[:100],
+            "created_at": meta.get("created_at", datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        })
+        return cls(schedule_id, meta, columns, b"".join(encoded), extras)
+
+    @property
+    def names(self) -> List[str]:
+        if self._names is None:
+            offsets = self.columns["name_offsets"]
+            blob = self._names_blob
+            self._names = [
+                sys.intern(blob[offsets[i]:offsets[i + 1]].decode("utf-8"))
+                for i in range(len(offsets) - 1)
+            ]
+        return self._names
+
+    def tasks(self) -> list:
+        """Liste de tâches au format des outils (matérialisée une seule fois puis gardée en mémoire)."""
+        if self._tasks is None:
+            names = self.names
+            c = self.columns
+            trade_table = self.meta["trade_table"]
+            durations = c["durations"].tolist()
+            dep_indptr, dep_indices = c["dep_indptr"].tolist(), c["dep_indices"].tolist()
+            if "dep_kinds" in c:
+                dep_kinds, dep_lags = c["dep_kinds"].tolist(), c["dep_lags"].tolist()
+            else:
+                dep_kinds, dep_lags = [FS] * len(dep_indices), [0.0] * len(dep_indices)
+
+            def dependency(k: int):
+                if dep_kinds[k] == FS and not dep_lags[k]:
+                    return names[dep_indices[k]]
+                lag = dep_lags[k]
+                return {
+                    "task": names[dep_indices[k]],
+                    "type": LINK_TYPES[dep_kinds[k]],
+                    "lag": int(lag) if lag.is_integer() else lag
+                }
+
+            res_indptr, res_trade, res_count = c["res_indptr"].tolist(), c["res_trade"].tolist(), c["res_count"].tolist()
+            trade_codes = c["trade_codes"].tolist()
+            tasks = []
+            for i, name in enumerate(names):
+                duration = durations[i]
+                task = {
+                    "name": name,
+                    "duration_days": int(duration) if duration.is_integer() else duration,
+                    "dependencies": [dependency(k) for k in range(dep_indptr[i], dep_indptr[i + 1])],
+                }
+                if trade_codes[i] >= 0:
+                    task["trade"] = trade_table[trade_codes[i]]
+                if res_indptr[i + 1] > res_indptr[i]:
+                    task["required_resources"] = {
+                        trade_table[res_trade[k]]: (int(res_count[k]) if res_count[k].is_integer() else res_count[k])
+                        for k in range(res_indptr[i], res_indptr[i + 1])
+                    }
+                task.update(self.extras.get(str(i), {}))
+                tasks.append(task)
+            self._tasks = tasks
+        return self._tasks
+
+    @property
+    def digest(self) -> str:
+        """Empreinte du contenu (liste de tâches), calculée une fois par version stockée."""
+        if self._digest is None:
+            self._digest = canonical_hash(self.tasks())
+        return self._digest
+
+    def summary(self) -> dict:
+        return {
+            "schedule_id": self.schedule_id,
+            "project_name": self.meta.get("project_name"),
+            "tasks_count": self.meta["tasks_count"],
+            "links_count": self.meta["links_count"],
+            "trades": self.meta["trade_table"],
+            "created_at": self.meta["created_at"],
+        }
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+    def save(self, directory: str):
+        # Répertoire temporaire propre à cet enregistrement : deux écritures simultanées ne se l'effacent pas
+        tmp = tempfile.mkdtemp(prefix=os.path.basename(directory) + ".", suffix=".tmp", dir=os.path.dirname(directory))
+        try:
+            for key, array in self.columns.items():
+                np.save(os.path.join(tmp, f"{key}.npy"), np.ascontiguousarray(array))
+            with open(os.path.join(tmp, "names.bin"), "wb") as f:
+                f.write(self._names_blob)
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(self.meta, f, ensure_ascii=False)
+            if self.extras:
+                with open(os.path.join(tmp, "extras.json"), "w", encoding="utf-8") as f:
+                    json.dump(self.extras, f, ensure_ascii=False)
+            # Remplacement du répertoire précédent une fois l'écriture complète
+            shutil.rmtree(directory, ignore_errors=True)
+            os.replace(tmp, directory)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, schedule_id: str, directory: str) -> "StoredSchedule":
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        columns = {}
+        for filename in os.listdir(directory):
+            if filename.endswith(".npy"):
+                columns[filename[:-4]] = np.load(os.path.join(directory, filename), mmap_mode="r")
+        with open(os.path.join(directory, "names.bin"), "rb") as f:
+            names_blob = f.read()
+        extras = {}
+        extras_path = os.path.join(directory, "extras.json")
+        if os.path.exists(extras_path):
+            with open(extras_path, encoding="utf-8") as f:
+                extras = json.load(f)
+        return cls(schedule_id, meta, columns, names_blob, extras)
+
+
+class ScheduleStore:
+    """
+    Magasin de plannings : cache mémoire LRU devant un répertoire disque
+    (un sous-répertoire de colonnes .npy par planning). Les écritures et suppressions
+    d'un même identifiant sont sérialisées par un verrou choisi parmi SAVE_LOCKS.
+    """
+
+    SAVE_LOCKS = 16
+
+    def __init__(self, root: str, memory_slots: int = 32):
+        self.root = root
+        self.memory_slots = memory_slots
+        self._memory: "OrderedDict[str, StoredSchedule]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_locks = [threading.Lock() for _ in range(self.SAVE_LOCKS)]
+
+    def _save_lock(self, schedule_id: str) -> threading.Lock:
+        return self._save_locks[hash(schedule_id) % self.SAVE_LOCKS]
+
+    def _path(self, schedule_id: str) -> str:
+        if not schedule_id or not all(c.isalnum() or c in "-_" for c in schedule_id):
+            raise ValueError(f"Identifiant de planning invalide : '{schedule_id}'")
+        return os.path.join(self.root, schedule_id)
+
+    def _remember(self, schedule: StoredSchedule):
+        self._memory[schedule.schedule_id] = schedule
+        self._memory.move_to_end(schedule.schedule_id)
+        while len(self._memory) > self.memory_slots:
+            self._memory.popitem(last=False)
+
+    def put(self, tasks: list, schedule_id: Optional[str] = None, **meta) -> StoredSchedule:
+        schedule_id = schedule_id or uuid.uuid4().hex[:12]
+        path = self._path(schedule_id)
+        schedule = StoredSchedule.from_tasks(schedule_id, tasks, meta)
+        os.makedirs(self.root, exist_ok=True)
+        with self._save_lock(schedule_id):
+            schedule.save(path)
+            with self._lock:
+                self._remember(schedule)
+        return schedule
+
+    def put_content(self, tasks: list, digest: str, **meta) -> StoredSchedule:
+        """
+        Enregistre un planning sous un identifiant dérivé de l'empreinte de son contenu : un planning
+        identique déjà stocké, et non modifié depuis, est réutilisé sans nouvelle écriture.
+        """
+        schedule_id = "c" + canonical_hash(digest, meta)[:20]
+        try:
+            stored = self.get(schedule_id)
+            if stored.meta.get("content_digest") == digest:
+                return stored
+        except ValueError:
+            pass
+        return self.put(tasks, schedule_id=schedule_id, content_digest=digest, **meta)
+
+    def get(self, schedule_id: str) -> StoredSchedule:
+        with self._lock:
+            schedule = self._memory.get(schedule_id)
+            if schedule is not None:
+                self._memory.move_to_end(schedule_id)
+                return schedule
+        path = self._path(schedule_id)
+        if not os.path.isdir(path):
+            raise ValueError(f"Planning inconnu : '{schedule_id}'")
+        schedule = StoredSchedule.load(schedule_id, path)
+        with self._lock:
+            self._remember(schedule)
+        return schedule
+
+    def delete(self, schedule_id: str) -> bool:
+        path = self._path(schedule_id)
+        with self._save_lock(schedule_id):
+            with self._lock:
+                self._memory.pop(schedule_id, None)
+            if not os.path.isdir(path):
+                return False
+            shutil.rmtree(path)
+        return True
+
+    def list(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            entry for entry in os.listdir(self.root)
+            if not entry.endswith(".tmp") and os.path.isdir(os.path.join(self.root, entry))
+        )
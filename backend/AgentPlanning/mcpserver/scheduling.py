@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File  : scheduling.py
+# @Author: Assistant
+# @Desc  : Moteur CPM (méthode du chemin critique) en temps linéaire pour les outils de planning BTP
+
+import gc
+from collections import deque
+from contextlib import contextmanager
+from functools import cached_property
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class CycleError(ValueError):
+    """Levée lorsque le graphe des dépendances contient un cycle."""
+
+    def __init__(self, task_names: List[str]):
+        self.task_names = task_names
+        preview = ", ".join(task_names[:10])
+        if len(task_names) > 10:
+            preview += ", ..."
+        super().__init__(f"Dépendances circulaires détectées entre les tâches : {preview}")
+
+
+# Types de liens de précédence (codes entiers dans le graphe, FS par défaut)
+LINK_TYPES = ("FS", "SS", "FF", "SF")
+FS, SS, FF, SF = range(4)
+
+
+def parse_dependency(dependency) -> Tuple[str, int, float]:
+    """
+    Dépendance au format des outils : nom de la tâche prédécesseur (fin-début sans décalage)
+    ou {"task": nom, "type": "FS"|"SS"|"FF"|"SF", "lag": jours ouvrés, éventuellement négatif}.
+
+    :return: (nom, code du type, décalage)
+    """
+    if isinstance(dependency, str):
+        return dependency, FS, 0
+    if not isinstance(dependency, dict) or "task" not in dependency:
+        raise ValueError(f"Dépendance invalide : {dependency!r} (attendu : nom de tâche ou {{task, type, lag}})")
+    kind = str(dependency.get("type", "FS")).upper()
+    if kind not in LINK_TYPES:
+        raise ValueError(f"Type de lien inconnu : '{kind}' (disponibles : {', '.join(LINK_TYPES)})")
+    lag = dependency.get("lag", 0)
+    if not isinstance(lag, (int, float)):
+        raise ValueError(f"Décalage invalide pour la dépendance vers '{dependency['task']}' : {lag!r}")
+    return dependency["task"], LINK_TYPES.index(kind), lag
+
+
+LINK_CODES = {label: code for code, label in enumerate(LINK_TYPES)}
+
+
+def parse_dependencies(dependencies: list) -> Tuple[list, List[int], list]:
+    """
+    Dépendances à plat -> (noms, codes de type, décalages), par colonnes. Les cas usuels (nom seul,
+    ou {task, type en majuscules, lag numérique}) sont lus en bloc ; sinon chaque dépendance passe par
+    parse_dependency, qui normalise le type ou signale l'entrée invalide.
+    """
+    try:
+        names = [d if d.__class__ is str else d["task"] for d in dependencies]
+        labels = ["FS" if d.__class__ is str else d.get("type", "FS") for d in dependencies]
+        lags = [0 if d.__class__ is str else d.get("lag", 0) for d in dependencies]
+        if set(labels) <= LINK_CODES.keys() and set(map(type, lags)) <= {int, float}:
+            return names, list(map(LINK_CODES.__getitem__, labels)), lags
+    except (TypeError, KeyError, AttributeError):
+        pass
+    parsed = [parse_dependency(d) for d in dependencies]
+    return [d[0] for d in parsed], [d[1] for d in parsed], [d[2] for d in parsed]
+
+
+@contextmanager
+def gc_paused():
+    """
+    Suspend le ramasse-miettes cyclique pendant la création en masse de listes acycliques :
+    sans cela, chaque collection reparcourt toutes les tâches déjà en mémoire.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _split(values: list, groups: np.ndarray, n: int) -> List[list]:
+    """Découpe `values`, rangées par groupe croissant (`groups`), en n listes (une par groupe)."""
+    bounds = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(groups, minlength=n), out=bounds[1:])
+    bounds = bounds.tolist()
+    with gc_paused():
+        return [values[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+class TaskGraph:
+    """
+    Graphe de précédences indexé.
+
+    Les index prédécesseurs/successeurs et l'ordre topologique sont construits
+    une seule fois, en O(V+E), puis partagés par toutes les passes de calcul.
+    Les dépendances vers des tâches inconnues sont ignorées et listées dans
+    `unknown_dependencies`.
+
+    Chaque lien porte un type (FS, SS, FF, SF) et un décalage, rangés dans
+    `pred_kinds`/`pred_lags` (parallèles à `preds`) et `succ_kinds`/`succ_lags`
+    (parallèles à `succs`). `typed` est faux lorsque tous les liens sont
+    fin-début sans décalage : les passes empruntent alors le chemin simple.
+    """
+
+    def __init__(self, tasks: list):
+        self.tasks = tasks
+        self.names: List[str] = [task["name"] for task in tasks]
+        self.index: Dict[str, int] = dict(zip(self.names, range(len(self.names))))
+        if len(self.index) < len(self.names):
+            seen = set()
+            for name in self.names:
+                if name in seen:
+                    raise ValueError(f"Tâche en double : '{name}'")
+                seen.add(name)
+        self.durations: list = [task["duration_days"] for task in tasks]
+
+        # Liens à plat (ordre de saisie), puis index des prédécesseurs par dictionnaire en bloc
+        n = len(self.names)
+        dependencies = [task.get("dependencies", []) for task in tasks]
+        flat = list(chain.from_iterable(dependencies))
+        self.typed = False
+        if set(map(type, flat)) <= {str}:
+            dep_names, kinds, lags = flat, None, None
+        else:
+            dep_names, kinds, lags = parse_dependencies(flat)
+            self.typed = any(kind != FS or lag for kind, lag in zip(kinds, lags))
+        targets = list(map(self.index.get, dep_names))
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.fromiter(map(len, dependencies), np.int64, n))
+
+        self.unknown_dependencies: List[Dict[str, str]] = []
+        if None in targets:
+            known = [t is not None for t in targets]
+            self.unknown_dependencies = [
+                {"task": self.names[i], "dependency": name}
+                for i, name, ok in zip(sources.tolist(), dep_names, known) if not ok
+            ]
+            sources = sources[np.array(known, dtype=bool)]
+            targets = [t for t in targets if t is not None]
+            if kinds is not None:
+                kinds = [k for k, ok in zip(kinds, known) if ok]
+                lags = [lag for lag, ok in zip(lags, known) if ok]
+        if kinds is None:
+            kinds, lags = [FS] * len(targets), [0] * len(targets)
+
+        # Listes d'adjacence par découpage de tableaux triés (successeurs : tri stable par prédécesseur).
+        # Types et décalages ne sont découpés qu'au premier accès : les passes ne les lisent que si `typed`
+        preds_of = np.array(targets, dtype=np.int64)
+        by_pred = np.argsort(preds_of, kind="stable")
+        grouped = preds_of[by_pred]
+        self.preds: List[List[int]] = _split(targets, sources, n)
+        self.succs: List[List[int]] = _split(sources[by_pred].tolist(), grouped, n)
+        self._links = (kinds, lags, sources, by_pred, grouped)
+
+        self.order = self._topological_order()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @cached_property
+    def pred_kinds(self) -> List[List[int]]:
+        kinds, _, sources, _, _ = self._links
+        return _split(kinds, sources, len(self))
+
+    @cached_property
+    def pred_lags(self) -> List[list]:
+        _, lags, sources, _, _ = self._links
+        return _split(lags, sources, len(self))
+
+    @cached_property
+    def succ_kinds(self) -> List[List[int]]:
+        kinds, _, _, by_pred, grouped = self._links
+        return _split([kinds[k] for k in by_pred.tolist()], grouped, len(self))
+
+    @cached_property
+    def succ_lags(self) -> List[list]:
+        _, lags, _, by_pred, grouped = self._links
+        return _split([lags[k] for k in by_pred.tolist()], grouped, len(self))
+
+    def _topological_order(self) -> List[int]:
+        """Ordre topologique par l'algorithme de Kahn ; lève CycleError si le graphe n'est pas acyclique."""
+        in_degree = [len(p) for p in self.preds]
+        queue = deque(i for i, d in enumerate(in_degree) if d == 0)
+        order = []
+        succs = self.succs
+
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for s in succs[i]:
+                in_degree[s] -= 1
+                if in_degree[s] == 0:
+                    queue.append(s)
+
+        if len(order) < len(self.names):
+            raise CycleError([self.names[i] for i, d in enumerate(in_degree) if d > 0])
+
+        return order
+
+
+def start_bound(kind: int, lag, pred_start, pred_finish, duration):
+    """Début au plus tôt imposé à une tâche de durée `duration` par un lien depuis un prédécesseur daté."""
+    if kind == FS:
+        return pred_finish + lag
+    if kind == SS:
+        return pred_start + lag
+    if kind == FF:
+        return pred_finish + lag - duration
+    return pred_start + lag - duration
+
+
+def finish_bound(kind: int, lag, succ_start, succ_finish, duration):
+    """Fin au plus tard imposée à une tâche de durée `duration` par un lien vers un successeur daté."""
+    if kind == FS:
+        return succ_start - lag
+    if kind == SS:
+        return succ_start - lag + duration
+    if kind == FF:
+        return succ_finish - lag
+    return succ_finish - lag + duration
+
+
+def forward_pass(graph: TaskGraph, durations: Optional[Sequence] = None) -> Tuple[list, list]:
+    """
+    Dates au plus tôt (début, fin) en jours ouvrés, chaque tâche étant calculée une seule fois.
+    Aucune tâche ne commence avant le début du projet (jour 0), même avec un décalage négatif.
+    """
+    n = len(graph)
+    durations = graph.durations if durations is None else durations
+    preds = graph.preds
+    es = [0] * n
+    ef = [0] * n
+    if not graph.typed:
+        for i in graph.order:
+            start = 0
+            for p in preds[i]:
+                if ef[p] > start:
+                    start = ef[p]
+            es[i] = start
+            ef[i] = start + durations[i]
+        return es, ef
+
+    pred_kinds, pred_lags = graph.pred_kinds, graph.pred_lags
+    for i in graph.order:
+        duration = durations[i]
+        start = 0
+        for p, kind, lag in zip(preds[i], pred_kinds[i], pred_lags[i]):
+            bound = start_bound(kind, lag, es[p], ef[p], duration)
+            if bound > start:
+                start = bound
+        es[i] = start
+        ef[i] = start + duration
+    return es, ef
+
+
+def tail_lengths(graph: TaskGraph, durations: Sequence[int]) -> List[int]:
+    """Longueur du plus long chemin depuis le début de chaque tâche jusqu'à la fin du projet."""
+    tail = [0] * len(graph)
+    succs = graph.succs
+    if not graph.typed:
+        for i in reversed(graph.order):
+            longest = 0
+            for s in succs[i]:
+                if tail[s] > longest:
+                    longest = tail[s]
+            tail[i] = durations[i] + longest
+        return tail
+
+    # Passe arrière avec une fin de projet au jour 0 : tail = -(début au plus tard)
+    succ_kinds, succ_lags = graph.succ_kinds, graph.succ_lags
+    for i in reversed(graph.order):
+        duration = durations[i]
+        finish = 0
+        for s, kind, lag in zip(succs[i], succ_kinds[i], succ_lags[i]):
+            bound = finish_bound(kind, lag, -tail[s], durations[s] - tail[s], duration)
+            if bound < finish:
+                finish = bound
+        tail[i] = duration - finish
+    return tail
+
+
+class CriticalPathAnalysis:
+    """
+    Résultat d'une analyse CPM (passes avant et arrière) sur un TaskGraph.
+
+    Les dates sont exprimées en jours ouvrés depuis le début du projet.
+    """
+
+    def __init__(self, graph: TaskGraph, forward: Optional[Tuple[list, list]] = None):
+        self.graph = graph
+        n = len(graph)
+        durations = graph.durations
+        succs = graph.succs
+        order = graph.order
+
+        # Passe avant : dates au plus tôt (réutilisée si déjà calculée)
+        es, ef = forward if forward is not None else forward_pass(graph)
+
+        project_duration = max(ef) if n else 0
+
+        # Passe arrière : dates au plus tard
+        lf = [project_duration] * n
+        ls = [0] * n
+        if not graph.typed:
+            for i in reversed(order):
+                finish = project_duration
+                for s in succs[i]:
+                    if ls[s] < finish:
+                        finish = ls[s]
+                lf[i] = finish
+                ls[i] = finish - durations[i]
+        else:
+            succ_kinds, succ_lags = graph.succ_kinds, graph.succ_lags
+            for i in reversed(order):
+                duration = durations[i]
+                finish = project_duration
+                for s, kind, lag in zip(succs[i], succ_kinds[i], succ_lags[i]):
+                    bound = finish_bound(kind, lag, ls[s], lf[s], duration)
+                    if bound < finish:
+                        finish = bound
+                lf[i] = finish
+                ls[i] = finish - duration
+
+        # Marges totale et libre
+        total_float = [ls[i] - es[i] for i in range(n)]
+        free_float = [0] * n
+        if not graph.typed:
+            for i in range(n):
+                earliest_successor = project_duration
+                for s in succs[i]:
+                    if es[s] < earliest_successor:
+                        earliest_successor = es[s]
+                free_float[i] = earliest_successor - ef[i]
+        else:
+            # Retard possible de la tâche sans décaler le début au plus tôt d'aucun successeur
+            # ni la fin du projet (un lien SS/SF peut laisser la tâche finir après ses successeurs)
+            for i in range(n):
+                slack = project_duration - ef[i]
+                for s, kind, lag in zip(succs[i], succ_kinds[i], succ_lags[i]):
+                    link_slack = es[s] - start_bound(kind, lag, es[i], ef[i], durations[s])
+                    if link_slack < slack:
+                        slack = link_slack
+                free_float[i] = slack
+
+        self.project_duration = project_duration
+        self.earliest_start = es
+        self.earliest_finish = ef
+        self.latest_start = ls
+        self.latest_finish = lf
+        self.total_float = total_float
+        self.free_float = free_float
+
+    def is_critical(self, i: int) -> bool:
+        return self.total_float[i] == 0
+
+    def critical_indices(self) -> List[int]:
+        """Tâches critiques dans l'ordre du chemin (date au plus tôt, puis ordre topologique)."""
+        critical = [i for i in self.graph.order if self.total_float[i] == 0]
+        critical.sort(key=lambda i: self.earliest_start[i])
+        return critical